@@ -4,6 +4,8 @@ Industry-level Flask application with modular architecture
 """
 from flask import Flask
 from config import config
+from utils import check_db_settings
+from query_stats import init_query_stats
 import os
 
 # Import blueprints
@@ -38,6 +40,9 @@ def create_app(config_name='development'):
     app.register_blueprint(patient_bp)
     app.register_blueprint(admin_bp)
 
+    # Per-request query counts and timings (Server-Timing header)
+    init_query_stats(app, app_config)
+
     # Context processor for global template variables
     @app.context_processor
     def inject_user():
@@ -60,6 +65,23 @@ def create_app(config_name='development'):
         from flask import render_template
         return render_template('errors/500.html'), 500
 
+    # Verify the SQLite PRAGMA profile once at startup
+    try:
+        check_db_settings(app_config)
+    except Exception as e:
+        print(f"Could not verify database settings: {e}")
+
+    # Background jobs inside the web workers (one worker leads at a time).
+    # Started on the first request rather than here: under gunicorn --preload
+    # this runs in the master, whose threads the forked workers don't get
+    # (gunicorn.conf.py starts it earlier, in post_fork)
+    if getattr(app_config, 'SCHEDULER_IN_APP', False):
+        from scheduler import start_scheduler
+
+        @app.before_request
+        def ensure_scheduler():
+            start_scheduler(app_config)
+
     # Create upload folder if it doesn't exist
     upload_folder = os.path.join(app.root_path, app.config['UPLOAD_FOLDER'])
     os.makedirs(upload_folder, exist_ok=True)
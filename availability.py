@@ -0,0 +1,140 @@
+"""
+Doctor Availability Engine
+Computes free, bookable appointment times from weekly time slots minus
+existing bookings
+"""
+import hashlib
+from datetime import date, datetime, time, timedelta
+from models import TimeSlot, Appointment
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday',
+             'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Keep IN (...) lists well under SQLite's bound-parameter limit
+_ID_CHUNK = 500
+
+
+def _minutes(value):
+    """Minutes since midnight for a time (or 'HH:MM[:SS]' string)"""
+    if isinstance(value, str):
+        value = time.fromisoformat(value)
+    return value.hour * 60 + value.minute
+
+
+def format_minutes(minutes):
+    """Format minutes since midnight as 'HH:MM' (the booking form's format)"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _weekly_templates(slots):
+    """
+    Expand weekly slots into bookable start minutes per (doctor, weekday)
+    Each template is built once and shared by every matching date.
+    """
+    expanded = {}
+    for slot in slots:
+        start = _minutes(slot['start_time'])
+        end = _minutes(slot['end_time'])
+        step = slot['slot_duration'] or 30
+        key = (slot['doctor_id'], DAY_NAMES.index(slot['day_of_week']))
+        instants = expanded.setdefault(key, {})
+        # A slot is bookable only if the whole consultation fits
+        for minute in range(start, end - step + 1, step):
+            instants[minute] = step
+    return {key: (tuple(sorted(instants)), instants)
+            for key, instants in expanded.items()}
+
+
+def _bookings_by_day(bookings):
+    """Group booked intervals by (doctor, date)"""
+    booked = {}
+    for appt in bookings:
+        appt_date = appt['appointment_date']
+        if isinstance(appt_date, str):
+            appt_date = date.fromisoformat(appt_date)
+        start = _minutes(appt['appointment_time'])
+        booked.setdefault((appt['doctor_id'], appt_date), []).append(
+            (start, start + (appt['duration'] or 30)))
+    return booked
+
+
+def get_bulk_availability(cursor, doctor_ids, start_date, end_date, now=None):
+    """
+    Free start times for many doctors over [start_date, end_date]
+    Returns {doctor_id: {date: (minute, ...)}} with minutes since midnight.
+    Dates without any free time are left out. Two queries per chunk of
+    doctors: one for weekly templates, one range query for bookings.
+    """
+    now = now or datetime.now()
+    doctor_ids = list(dict.fromkeys(doctor_ids))
+    result = {doctor_id: {} for doctor_id in doctor_ids}
+    if end_date < start_date:
+        return result
+
+    days = [start_date + timedelta(days=i)
+            for i in range((end_date - start_date).days + 1)]
+
+    for offset in range(0, len(doctor_ids), _ID_CHUNK):
+        chunk = doctor_ids[offset:offset + _ID_CHUNK]
+        templates = _weekly_templates(
+            TimeSlot.get_active_for_doctors(cursor, chunk))
+        if not templates:
+            continue
+        booked = _bookings_by_day(Appointment.get_booked_in_range(
+            cursor, chunk, start_date, end_date))
+
+        for doctor_id in chunk:
+            free_days = result[doctor_id]
+            for day in days:
+                template = templates.get((doctor_id, day.weekday()))
+                if template is None:
+                    continue
+                instants, lengths = template
+
+                taken = booked.get((doctor_id, day))
+                if day == now.date():
+                    cutoff = now.hour * 60 + now.minute
+                    instants = tuple(m for m in instants if m > cutoff)
+                if taken:
+                    instants = tuple(
+                        m for m in instants
+                        if not any(m < end and start < m + lengths[m]
+                                   for start, end in taken))
+                if instants:
+                    free_days[day] = instants
+    return result
+
+
+def get_availability(cursor, doctor_id, start_date, end_date, now=None):
+    """Free start times for one doctor: {date: (minute, ...)}"""
+    return get_bulk_availability(
+        cursor, [doctor_id], start_date, end_date, now=now)[doctor_id]
+
+
+def is_available(cursor, doctor_id, appointment_date, appointment_time, now=None):
+    """Check that a date/time is one of the doctor's free start times"""
+    if isinstance(appointment_date, str):
+        appointment_date = date.fromisoformat(appointment_date)
+    free = get_availability(
+        cursor, doctor_id, appointment_date, appointment_date, now=now)
+    return _minutes(appointment_time) in free.get(appointment_date, ())
+
+
+def to_json(free_days):
+    """Serialize {date: (minute, ...)} as {'YYYY-MM-DD': ['HH:MM', ...]}"""
+    return {day.isoformat(): [format_minutes(minute) for minute in minutes]
+            for day, minutes in sorted(free_days.items())}
+
+
+def availability_etag(doctor_id, version, start_date, end_date, now=None):
+    """
+    Strong ETag for a doctor's availability over [start_date, end_date]
+    version is Doctor.get_schedule_version(); when the range includes today
+    the current minute is mixed in too, since past times drop out.
+    """
+    now = now or datetime.now()
+    parts = [str(doctor_id), str(version),
+             start_date.isoformat(), end_date.isoformat()]
+    if start_date <= now.date() <= end_date:
+        parts.append(now.strftime('%Y-%m-%dT%H:%M'))
+    return hashlib.sha256('|'.join(parts).encode()).hexdigest()[:32]
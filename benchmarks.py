@@ -0,0 +1,754 @@
+#!/usr/bin/env python3
+"""
+Performance Benchmarks
+Builds synthetic SQLite databases and measures the data-access layer
+
+Usage:
+    python3 benchmarks.py records [appointments]
+    python3 benchmarks.py doctor_search [doctors...]
+    python3 benchmarks.py availability [doctors] [days]
+    python3 benchmarks.py smtp [messages] [workers]
+    python3 benchmarks.py email_render [reminders]
+    python3 benchmarks.py broadcast [recipients]
+    python3 benchmarks.py export [appointments]
+    python3 benchmarks.py indexes [appointments]
+"""
+import contextlib
+import io
+import os
+import random
+import socketserver
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import date, datetime, time as datetime_time, timedelta
+
+from models import (register_sqlite_types, record_type, fetchall_records, Doctor,
+                    Notification, Appointment)
+from availability import get_availability, get_bulk_availability
+from email_service import EmailService
+from email_templates import EmailTemplates
+from broadcast import broadcast
+from exports import open_export
+from migrate import load_migrations, MigrationContext
+
+SPECIALIZATIONS = [
+    'Cardiologist', 'Dermatologist', 'Neurologist', 'Pediatrician',
+    'Orthopedic Surgeon', 'Psychiatrist', 'General Physician', 'Oncologist',
+    'Gynecologist', 'ENT Specialist', 'Ophthalmologist', 'Urologist'
+]
+FIRST_NAMES = [
+    'John', 'Priya', 'Maria', 'Wei', 'Ahmed', 'Sara', 'Lucas', 'Aisha',
+    'Kenji', 'Olga', 'David', 'Fatima', 'Rahul', 'Emma', 'Noah', 'Chen'
+]
+LAST_NAMES = [
+    'Smith', 'Patel', 'Garcia', 'Zhang', 'Khan', 'Johnson', 'Silva', 'Kim',
+    'Tanaka', 'Ivanova', 'Brown', 'Singh', 'Müller', 'Rossi', 'Lopez', 'Nair'
+]
+STATUSES = ['scheduled', 'confirmed', 'completed', 'cancelled', 'no_show']
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+
+
+def open_database(path):
+    """Open a connection the way utils.get_db_connection does"""
+    register_sqlite_types()
+    connection = sqlite3.connect(
+        path, detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA foreign_keys = ON")
+    return connection
+
+
+def create_schema(connection):
+    """Load database_schema.sql into an empty database"""
+    schema_file = os.path.join(os.path.dirname(__file__), 'database_schema.sql')
+    with open(schema_file) as f:
+        connection.executescript(f.read())
+
+
+def build_synthetic_database(path, doctors=200, patients=5000,
+                             appointments=100000, seed=42):
+    """
+    Create a database at path filled with generated doctors, patients,
+    weekly time slots and appointments. Returns an open connection.
+    """
+    rng = random.Random(seed)
+    if os.path.exists(path):
+        os.remove(path)
+    connection = open_database(path)
+    create_schema(connection)
+    cursor = connection.cursor()
+
+    # Leave the seed rows (ids 1-3) in place and generate the rest after them
+    next_user = 100
+    doctor_rows, doctor_users = [], []
+    for i in range(doctors):
+        user_id = next_user + i
+        name = f"Dr. {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}"
+        specialization = rng.choice(SPECIALIZATIONS)
+        doctor_users.append((user_id, f"doctor{i}@bench.test", 'x', 'doctor'))
+        doctor_rows.append((
+            user_id, name, specialization,
+            f"MBBS, MD ({specialization})", f"BENCH{i:07d}",
+            f"+1-555-{i:07d}", rng.randint(1, 35),
+            float(rng.randrange(100, 1000, 50)),
+            f"{name} is an experienced {specialization.lower()} "
+            f"focusing on {rng.choice(['preventive', 'acute', 'chronic', 'pediatric'])} care.",
+            1 if rng.random() < 0.9 else 0
+        ))
+    cursor.executemany(
+        "INSERT INTO users (id, email, password, role) VALUES (?, ?, ?, ?)",
+        doctor_users)
+    cursor.executemany("""
+        INSERT INTO doctors (user_id, full_name, specialization, qualification,
+            registration_number, phone, experience_years, consultation_fee,
+            bio, is_verified)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, doctor_rows)
+    doctor_ids = [row[0] for row in cursor.execute(
+        "SELECT id FROM doctors WHERE registration_number LIKE 'BENCH%'")]
+
+    next_user += doctors
+    patient_users, patient_rows = [], []
+    for i in range(patients):
+        user_id = next_user + i
+        patient_users.append((user_id, f"patient{i}@bench.test", 'x', 'patient'))
+        patient_rows.append((
+            user_id, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            date(1950, 1, 1) + timedelta(days=rng.randrange(365 * 55)),
+            rng.choice(['male', 'female', 'other']), f"+1-666-{i:07d}",
+            rng.choice(['A+', 'B+', 'O+', 'AB-', 'O-'])
+        ))
+    cursor.executemany(
+        "INSERT INTO users (id, email, password, role) VALUES (?, ?, ?, ?)",
+        patient_users)
+    cursor.executemany("""
+        INSERT INTO patients (user_id, full_name, date_of_birth, gender, phone, blood_group)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, patient_rows)
+    patient_ids = [row[0] for row in cursor.execute(
+        "SELECT id FROM patients WHERE phone LIKE '+1-666-%'")]
+
+    slot_rows = []
+    for doctor_id in doctor_ids:
+        for day in rng.sample(DAYS, 3):
+            slot_rows.append((doctor_id, day, '09:00:00', '12:00:00', 30))
+            slot_rows.append((doctor_id, day, '14:00:00', '17:00:00', 30))
+    cursor.executemany("""
+        INSERT INTO time_slots (doctor_id, day_of_week, start_time, end_time, slot_duration)
+        VALUES (?, ?, ?, ?, ?)
+    """, slot_rows)
+
+    # Appointments: unique (doctor, date, time) across a two-year window
+    start = date.today() - timedelta(days=365)
+    times = [f"{h:02d}:{m:02d}:00" for h in (9, 10, 11, 14, 15, 16) for m in (0, 30)]
+    seen = set()
+    batch = []
+    while len(seen) < appointments:
+        doctor_id = rng.choice(doctor_ids)
+        appt_date = start + timedelta(days=rng.randrange(730))
+        appt_time = rng.choice(times)
+        key = (doctor_id, appt_date, appt_time)
+        if key in seen:
+            continue
+        seen.add(key)
+        batch.append((
+            rng.choice(patient_ids), doctor_id, appt_date, appt_time,
+            rng.choice(STATUSES), 'Routine checkup',
+            f"{appt_date - timedelta(days=rng.randrange(1, 30))} 10:00:00"
+        ))
+        if len(batch) >= 10000:
+            _insert_appointments(cursor, batch)
+            batch = []
+    if batch:
+        _insert_appointments(cursor, batch)
+
+    connection.commit()
+    cursor.execute("ANALYZE")
+    return connection
+
+
+def _insert_appointments(cursor, rows):
+    cursor.executemany("""
+        INSERT INTO appointments (patient_id, doctor_id, appointment_date,
+            appointment_time, status, reason_for_visit, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+
+
+def _measure(label, build):
+    """Time build(), then re-run it under tracemalloc for memory figures"""
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    rows = len(result)
+    del result
+
+    tracemalloc.start()
+    result = build()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<24} {elapsed * 1000:8.1f} ms  "
+          f"{elapsed / rows * 1e6:6.2f} us/row  "
+          f"retained {current / 1024 / 1024:6.1f} MB  "
+          f"peak {peak / 1024 / 1024:6.1f} MB")
+    return result
+
+
+# =============================================
+# BENCHMARKS
+# =============================================
+
+def bench_records(appointments=100000):
+    """Compare dict copies of sqlite3.Row with models record types"""
+    query = """
+        SELECT a.*, p.full_name as patient_name, d.full_name as doctor_name,
+               d.specialization
+        FROM appointments a
+        JOIN patients p ON a.patient_id = p.id
+        JOIN doctors d ON a.doctor_id = d.id
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        connection = build_synthetic_database(
+            os.path.join(tmp, 'bench.db'), appointments=appointments)
+        cursor = connection.cursor()
+
+        print(f"\n{'='*60}")
+        print(f"RECORD TYPES vs DICT ROWS - {appointments:,} appointments")
+        print(f"{'='*60}")
+
+        def as_rows():
+            cursor.execute(query)
+            return cursor.fetchall()
+
+        def as_dicts():
+            cursor.execute(query)
+            return [dict(row) for row in cursor.fetchall()]
+
+        def as_records():
+            cursor.execute(query)
+            return fetchall_records(cursor, 'Appointment')
+
+        print("Fetch + build (query and type decoding included):")
+        _measure('sqlite3.Row', as_rows)
+        _measure('dict(row) copies', as_dicts)
+        records = _measure('Appointment records', as_records)
+        sample = records[0]
+        assert sample.appointment_date == sample['appointment_date']
+        del records
+
+        # Construction cost alone, from rows that are already in memory
+        cursor.execute(query)
+        rows = cursor.fetchall()
+        cls = record_type('Appointment', rows[0].keys())
+        tuples = [tuple(row) for row in rows]
+        print("\nPer-row construction only:")
+        for label, build in (
+                ('dict(row)', lambda: [dict(row) for row in rows]),
+                ('record', lambda: [tuple.__new__(cls, t) for t in tuples])):
+            started = time.perf_counter()
+            built = build()
+            elapsed = time.perf_counter() - started
+            print(f"  {label:<24} {elapsed * 1000:8.1f} ms  "
+                  f"{elapsed / len(built) * 1e6:6.2f} us/row  "
+                  f"{sys.getsizeof(built[0]):4d} bytes/row container")
+        connection.close()
+        print()
+
+
+def _median_ms(run, repeat=20):
+    """Median wall time of run() in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def bench_doctor_search(*sizes):
+    """Compare the old LIKE scan with the FTS5 index used by Doctor.search"""
+    sizes = sizes or (10000, 100000)
+    terms = ['cardio', 'smith', 'priya patel', 'pediatric care', 'neuro']
+    like_query = """
+        SELECT d.*, u.email, u.id as user_id
+        FROM doctors d
+        JOIN users u ON d.user_id = u.id
+        WHERE d.is_verified = 1 AND u.is_active = 1
+        AND (d.full_name LIKE ? OR d.specialization LIKE ?)
+        ORDER BY d.full_name
+    """
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            connection = build_synthetic_database(
+                os.path.join(tmp, 'bench.db'), doctors=size, patients=10,
+                appointments=0)
+            cursor = connection.cursor()
+
+            print(f"\n{'='*60}")
+            print(f"DOCTOR SEARCH - {size:,} doctors (median of 20 runs)")
+            print(f"{'='*60}")
+            print(f"  {'term':<16} {'LIKE all':>10} {'FTS all':>10} "
+                  f"{'LIKE top12':>11} {'FTS top12':>10} {'LIKE/FTS hits':>14}")
+            for term in terms:
+                def like(limit=None):
+                    query = like_query + (f" LIMIT {limit}" if limit else "")
+                    cursor.execute(query, [f"%{term}%", f"%{term}%"])
+                    return cursor.fetchall()
+
+                def fts(limit=None):
+                    return Doctor.search(cursor, search_term=term, limit=limit)
+
+                print(f"  {term:<16} {_median_ms(like):7.2f} ms {_median_ms(fts):7.2f} ms "
+                      f"{_median_ms(lambda: like(12)):8.2f} ms "
+                      f"{_median_ms(lambda: fts(12)):7.2f} ms "
+                      f"{len(like()):7d}/{len(fts()):<6d}")
+            connection.close()
+    print()
+
+
+def bench_availability(doctors=500, days=90):
+    """Time the availability engine for one doctor and for a whole listing"""
+    with tempfile.TemporaryDirectory() as tmp:
+        connection = build_synthetic_database(
+            os.path.join(tmp, 'bench.db'), doctors=doctors)
+        cursor = connection.cursor()
+        doctor_ids = [row[0] for row in cursor.execute("SELECT id FROM doctors")]
+        start = date.today()
+        end = start + timedelta(days=days - 1)
+
+        print(f"\n{'='*60}")
+        print(f"AVAILABILITY - {len(doctor_ids):,} doctors, {days} days (median of 20 runs)")
+        print(f"{'='*60}")
+        single = _median_ms(lambda: get_availability(cursor, doctor_ids[-1], start, end))
+        bulk = _median_ms(lambda: get_bulk_availability(cursor, doctor_ids, start, end))
+        result = get_bulk_availability(cursor, doctor_ids, start, end)
+        free_days = sum(len(days_free) for days_free in result.values())
+        print(f"  one doctor               {single:8.2f} ms")
+        print(f"  all doctors (bulk)       {bulk:8.2f} ms  {free_days:,} free doctor-days")
+        connection.close()
+    print()
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    Minimal SMTP stand-in: accepts AUTH and every message, counts connections
+    Each reply is delayed by latency seconds to mimic a network round trip;
+    drop_after hangs up after that many messages on a connection.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency=0.002, drop_after=None):
+        super().__init__(('127.0.0.1', 0), _SMTPHandler)
+        self.latency = latency
+        self.drop_after = drop_after
+        self.connections = 0
+        self.logins = 0
+        self.messages = 0
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        time.sleep(self.server.latency)
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        received = 0
+        self.reply("220 localhost stand-in ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply("250-localhost\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME")
+            elif command.startswith('AUTH'):
+                with server.lock:
+                    server.logins += 1
+                self.reply("235 2.7.0 Authentication successful")
+            elif command.startswith('DATA'):
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                received += 1
+                with server.lock:
+                    server.messages += 1
+                self.reply("250 2.0.0 Ok: queued")
+                if server.drop_after and received >= server.drop_after:
+                    return
+            elif command.startswith('QUIT'):
+                self.reply("221 2.0.0 Bye")
+                return
+            else:
+                self.reply("250 2.0.0 Ok")
+
+
+def bench_smtp(messages=500, workers=4):
+    """Send through EmailService against a local SMTP stand-in"""
+    print(f"\n{'='*60}")
+    print(f"SMTP DELIVERY - {messages:,} messages, {workers} workers, 2 ms/reply")
+    print(f"{'='*60}")
+    for label, max_messages, drop_after in (
+            ('login per message', 1, None),
+            ('reused sessions', 100, None),
+            ('reused, server drops /25', 100, 25)):
+        smtp = LocalSMTPServer(drop_after=drop_after)
+
+        class BenchConfig:
+            MAIL_SERVER = '127.0.0.1'
+            MAIL_PORT = smtp.port
+            MAIL_USE_TLS = False
+            MAIL_USERNAME = 'bench'
+            MAIL_PASSWORD = 'bench'
+            MAIL_DEFAULT_SENDER = 'noreply@bench.test'
+            MAIL_WORKERS = workers
+            MAIL_SMTP_MAX_MESSAGES = max_messages
+
+        service = EmailService(BenchConfig)
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(messages):
+                service.send_email(f"patient{i}@bench.test", "Reminder",
+                                   "<p>See you tomorrow</p>", "See you tomorrow")
+            service.shutdown(timeout=300)
+        elapsed = time.perf_counter() - started
+        stats = service.stats()
+        smtp.stop()
+        print(f"  {label:<26} {elapsed * 1000:8.1f} ms  {messages / elapsed:7.1f} msg/s  "
+              f"{smtp.connections:4d} connections  {stats['smtp']['reconnects']:3d} reconnects  "
+              f"{smtp.messages}/{messages} delivered")
+    print()
+
+
+def _legacy_reminder(patient_name, doctor_name, appointment_date, appointment_time, when):
+    """The f-string reminder EmailService built before templates (for comparison)"""
+    subject = f"Appointment Reminder - {when.capitalize()}"
+    html_content = f"""
+        <html>
+        <head>
+            <style>
+                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+                .header {{ background: #ffc107; color: #333; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }}
+                .content {{ background: #f9f9f9; padding: 30px; border: 1px solid #ddd; }}
+                .reminder-box {{ background: #fff3cd; padding: 20px; margin: 20px 0; border-left: 4px solid #ffc107; }}
+                .detail-row {{ margin: 10px 0; }}
+                .label {{ font-weight: bold; color: #333; }}
+                .footer {{ background: #f0f0f0; padding: 15px; text-align: center; font-size: 12px; color: #666; border-radius: 0 0 8px 8px; }}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>⏰ Appointment Reminder</h1>
+                </div>
+                <div class="content">
+                    <p>Dear {patient_name},</p>
+                    <p>This is a friendly reminder about your upcoming appointment:</p>
+                    <div class="reminder-box">
+                        <div class="detail-row">
+                            <span class="label">Doctor:</span> Dr. {doctor_name}
+                        </div>
+                        <div class="detail-row">
+                            <span class="label">Date:</span> <strong>{appointment_date.strftime('%B %d, %Y')}</strong>
+                        </div>
+                        <div class="detail-row">
+                            <span class="label">Time:</span> <strong>{appointment_time.strftime('%I:%M %p')}</strong>
+                        </div>
+                    </div>
+                    <p><strong>Preparation:</strong></p>
+                    <ul>
+                        <li>Arrive 10 minutes early</li>
+                        <li>Bring identification and insurance card</li>
+                        <li>Bring list of current medications</li>
+                        <li>Note any questions or concerns</li>
+                    </ul>
+                    <p>See you {when}!</p>
+                </div>
+                <div class="footer">
+                    <p>HealthCare+ | Professional Healthcare Management</p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+    text_content = f"""
+        APPOINTMENT REMINDER - HealthCare+
+
+        Dear {patient_name},
+
+        This is a reminder about your appointment {when.upper()}:
+
+        - Doctor: Dr. {doctor_name}
+        - Date: {appointment_date.strftime('%B %d, %Y')}
+        - Time: {appointment_time.strftime('%I:%M %p')}
+
+        Please arrive 10 minutes early and bring necessary documents.
+
+        See you {when}!
+        HealthCare+ Team
+        """
+    return subject, html_content, text_content
+
+
+def bench_email_render(reminders=10000):
+    """Render reminder emails: old f-strings vs the Jinja templates"""
+    print(f"\n{'='*60}")
+    print(f"EMAIL RENDERING - {reminders:,} appointment reminders")
+    print(f"{'='*60}")
+    rng = random.Random(42)
+    start = date.today() + timedelta(days=1)
+    recipients = [dict(EmailService.reminder_context(
+        f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        start + timedelta(days=i % 3), datetime_time(9 + i % 8, 30 * (i % 2))),
+        to_email=f"patient{i}@bench.test") for i in range(reminders)]
+
+    templates = EmailTemplates()
+
+    runs = (
+        ('f-strings (before)', lambda: [_legacy_reminder(
+            r['patient_name'], r['doctor_name'], r['appointment_date'],
+            r['appointment_time'], r['when']) for r in recipients]),
+        ('jinja, render_many', lambda: templates.render_many(
+            'appointment_reminder', recipients)),
+    )
+    for label, run in runs:
+        timings = []
+        for _ in range(3):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        best = min(timings)
+        print(f"  {label:<22} {best * 1000:8.1f} ms  {reminders / best:9.0f} msg/s")
+    print()
+
+
+def bench_broadcast(recipients=100000):
+    """Fan an announcement out to every patient: per-row inserts vs the bulk paths"""
+    class BenchConfig:
+        MAIL_SERVER = '127.0.0.1'
+        MAIL_PORT = 25
+        MAIL_USE_TLS = False
+        MAIL_USERNAME = 'bench'
+        MAIL_PASSWORD = 'bench'
+        MAIL_DEFAULT_SENDER = 'noreply@bench.test'
+        BROADCAST_BATCH_SIZE = 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        BenchConfig.DB_PATH = os.path.join(tmp, 'bench.db')
+        connection = build_synthetic_database(
+            BenchConfig.DB_PATH, doctors=10, patients=recipients, appointments=0)
+        cursor = connection.cursor()
+        cursor.execute("SELECT id FROM users WHERE role = 'patient' AND is_active = 1")
+        user_ids = [row['id'] for row in cursor.fetchall()]
+
+        print(f"\n{'='*60}")
+        print(f"BROADCAST - {len(user_ids):,} patients, one transaction each")
+        print(f"{'='*60}")
+
+        def timed(label, run):
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = run()
+            elapsed = time.perf_counter() - started
+            print(f"  {label:<34} {elapsed * 1000:9.1f} ms  {len(user_ids) / elapsed:9.0f} users/s")
+            return result
+
+        def one_by_one():
+            for user_id in user_ids:
+                Notification.create(cursor, user_id, 'Notice', 'Clinic closed Friday')
+
+        runs = (
+            ('Notification.create per user', one_by_one),
+            ('Notification.bulk_create', lambda: Notification.bulk_create(
+                cursor, user_ids, 'Notice', 'Clinic closed Friday')),
+            ('create_for_roles (INSERT..SELECT)', lambda: Notification.create_for_roles(
+                cursor, ['patient'], 'Notice', 'Clinic closed Friday')),
+        )
+        for label, run in runs:
+            timed(label, run)
+            connection.rollback()
+
+        # Commits a transaction per BROADCAST_BATCH_SIZE users
+        result = timed('broadcast + emails to outbox', lambda: broadcast(
+            BenchConfig, ['patient'], 'Notice', 'Clinic closed Friday'))
+        cursor.execute("SELECT COUNT(*) FROM email_outbox")
+        queued = cursor.fetchone()[0]
+        cursor.execute("SELECT SUM(unread) FROM notification_counters")
+        unread = cursor.fetchone()[0]
+        assert result['notifications'] == result['emails'] == queued == unread == len(user_ids)
+
+        started = time.perf_counter()
+        changed = Notification.mark_all_read(cursor, user_ids[0])
+        connection.commit()
+        print(f"  mark_all_read (1 user, {changed} row)        "
+              f"{(time.perf_counter() - started) * 1000:9.3f} ms")
+        print(f"  {queued:,} emails queued, unread counters consistent")
+        connection.close()
+    print()
+
+
+def bench_export(appointments=200000):
+    """Admin appointment export: buffering every row vs streaming in chunks"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        build_synthetic_database(path, doctors=200, patients=20000,
+                                 appointments=appointments).close()
+
+        class BenchConfig:
+            DB_PATH = path
+            EXPORT_CHUNK_SIZE = 1000
+
+        print(f"\n{'='*60}")
+        print(f"ADMIN EXPORT - {appointments:,} appointments")
+        print(f"{'='*60}")
+
+        def stream(fmt):
+            started = time.perf_counter()
+            body = open_export(BenchConfig, Appointment.select_for_export, fmt)
+            first = next(body)
+            first_chunk = time.perf_counter() - started
+            size = len(first) + sum(len(chunk) for chunk in body)
+            return first_chunk, time.perf_counter() - started, size
+
+        for fmt in ('csv', 'ndjson'):
+            first_chunk, elapsed, size = stream(fmt)
+            print(f"  stream {fmt:<17} {elapsed * 1000:8.1f} ms  "
+                  f"{elapsed / appointments * 1e6:6.2f} us/row  "
+                  f"first chunk {first_chunk * 1000:5.1f} ms  {size / 1024 / 1024:6.1f} MB out")
+
+        # Tracing slows the run down several times, so memory gets its own pass
+        tracemalloc.start()
+        stream('csv')
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  stream csv peak memory {peak / 1024 / 1024:6.1f} MB")
+
+        def buffered():
+            # What the list views do: every row as a record, in one list
+            connection = open_database(path)
+            cursor = connection.cursor()
+            Appointment.select_for_export(cursor)
+            rows = fetchall_records(cursor, 'Appointment')
+            connection.close()
+            return rows
+
+        _measure('fetchall (buffered)', buffered)
+    print()
+
+
+def bench_indexes(appointments=1000000):
+    """Appointment queries on the previous indexes, then after the appointment_indexes migration"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        connection = build_synthetic_database(path, doctors=200, patients=20000,
+                                              appointments=appointments)
+        cursor = connection.cursor()
+        indexes = next(migration.module for migration in load_migrations()
+                       if migration.name == 'appointment_indexes')
+        migration = MigrationContext(connection, step_pause=0, report=False)
+        indexes.downgrade(migration)
+
+        rng = random.Random(7)
+        doctor_ids = rng.sample([row[0] for row in cursor.execute("SELECT id FROM doctors")], 20)
+        patient_ids = rng.sample([row[0] for row in cursor.execute("SELECT id FROM patients")], 20)
+        today = date.today()
+        now = datetime.now()
+
+        def each(ids, query):
+            return lambda: [query(item) for item in ids]
+
+        queries = [
+            ('patient upcoming (5)', each(patient_ids, lambda pid: Appointment.get_by_patient(
+                cursor, pid, status='scheduled', limit=5))),
+            ('patient recent (5)', each(patient_ids, lambda pid: Appointment.get_by_patient(
+                cursor, pid, limit=5))),
+            ('patient stats', each(patient_ids, lambda pid: Appointment.get_patient_stats(
+                cursor, pid))),
+            ('doctor today', each(doctor_ids, lambda did: Appointment.get_by_doctor(
+                cursor, did, date_filter=today))),
+            ('doctor upcoming (5)', each(doctor_ids, lambda did: Appointment.get_by_doctor(
+                cursor, did, status='scheduled', limit=5))),
+            ('doctor stats', each(doctor_ids, lambda did: Appointment.get_doctor_stats(
+                cursor, did))),
+            ('doctor page (completed)', each(doctor_ids, lambda did: Appointment.get_page_by_doctor(
+                cursor, did, status='completed'))),
+            ('admin page (cancelled)', each(range(20), lambda _: Appointment.get_page(
+                cursor, status='cancelled'))),
+            ('export first row', each(range(20), lambda _: (
+                Appointment.select_for_export(cursor, 'completed'), cursor.fetchone()))),
+            ('reminders due (24h)', each(range(20), lambda _: Appointment.get_due_for_reminder(
+                cursor, '24h', now, now + timedelta(days=1)))),
+        ]
+
+        def book_and_cancel():
+            # Index upkeep on writes: 1000 bookings, rolled back
+            cursor.executemany("""
+                INSERT INTO appointments (patient_id, doctor_id, appointment_date,
+                    appointment_time, status)
+                VALUES (?, ?, ?, '08:00:00', 'scheduled')
+            """, [(patient_ids[i % 20], doctor_ids[i % 20], today + timedelta(days=800 + i))
+                  for i in range(1000)])
+            connection.rollback()
+
+        def run_all():
+            timings = {label: _median_ms(run, repeat=5) / 20 for label, run in queries}
+            timings['1000 bookings'] = _median_ms(book_and_cancel, repeat=5)
+            return timings
+
+        before = run_all()
+        started = time.perf_counter()
+        indexes.upgrade(migration)
+        migrated = time.perf_counter() - started
+        after = run_all()
+
+        print(f"\n{'='*60}")
+        print(f"APPOINTMENT INDEXES - {appointments:,} appointments "
+              f"(ms per call, median of 5 rounds over 20 ids)")
+        print(f"{'='*60}")
+        print(f"  {'query':<26} {'before':>10} {'after':>10} {'speedup':>9}")
+        for label in before:
+            print(f"  {label:<26} {before[label]:7.3f} ms {after[label]:7.3f} ms "
+                  f"{before[label] / after[label]:8.1f}x")
+        print(f"  migration took {migrated:.1f}s")
+        connection.close()
+    print()
+
+
+BENCHMARKS = {
+    'records': bench_records,
+    'doctor_search': bench_doctor_search,
+    'availability': bench_availability,
+    'smtp': bench_smtp,
+    'email_render': bench_email_render,
+    'broadcast': bench_broadcast,
+    'export': bench_export,
+    'indexes': bench_indexes,
+}
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(f"Usage: python3 benchmarks.py [{'|'.join(BENCHMARKS)}] [args...]")
+        sys.exit(1)
+    BENCHMARKS[sys.argv[1]](*(int(arg) for arg in sys.argv[2:]))
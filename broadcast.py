@@ -0,0 +1,72 @@
+"""
+Broadcast Announcements
+Sends an admin announcement to every active user with a role: one
+notification each plus an email each, added to the email outbox.
+
+Recipients are handled BROADCAST_BATCH_SIZE at a time. Each batch is read
+and its emails rendered first, then its notifications and emails are
+inserted in one short transaction, so other writers wait for one batch's
+inserts (milliseconds), not the whole fan-out (seconds at 100k users). If a
+batch fails, the batches before it stay sent; the error says how many users
+were reached.
+"""
+from models import Notification, User
+from email_service import get_email_service
+from utils import get_db_cursor
+
+# Audience choices offered on the admin broadcast form
+BROADCAST_AUDIENCES = {
+    'patient': ('patient',),
+    'doctor': ('doctor',),
+    'all': ('patient', 'doctor'),
+}
+
+
+class BroadcastError(Exception):
+    """A batch failed part way through a broadcast; counts has what was sent"""
+
+    def __init__(self, error, counts):
+        super().__init__(f"{error} (after notifying {counts['notifications']} user(s))")
+        self.counts = counts
+
+
+def broadcast(cfg, roles, title, message, send_email=True, batch_size=None):
+    """Notify (and optionally email) every active user in roles; returns counts"""
+    email_service = get_email_service(cfg) if send_email else None
+    if email_service is not None and not email_service.enabled:
+        print(f"📧 [Email Service Disabled] Broadcast emails not sent: {title}")
+        email_service = None
+    batch_size = batch_size or getattr(cfg, 'BROADCAST_BATCH_SIZE', 1000)
+
+    counts = {'notifications': 0, 'emails': 0}
+    after_id = 0
+    while True:
+        try:
+            with get_db_cursor(cfg) as cursor:
+                recipients = User.get_recipients(cursor, roles, after_id, batch_size)
+            if not recipients:
+                break
+            through_id = recipients[-1]['id']
+            # Render before taking the write lock, so writers only wait for the inserts
+            messages = []
+            if email_service is not None:
+                messages = email_service.render_bulk('broadcast', [{
+                    'to_email': recipient['email'],
+                    'name': recipient['name'],
+                    'title': title,
+                    'message': message,
+                } for recipient in recipients])
+            with get_db_cursor(cfg) as cursor:
+                notified = Notification.create_for_roles(
+                    cursor, roles, title, message, after_id=after_id, through_id=through_id)
+                if email_service is not None:
+                    email_service.send_bulk(messages, cursor=cursor)
+        except Exception as e:
+            raise BroadcastError(e, counts) from e
+        counts['notifications'] += notified
+        counts['emails'] += len(messages)
+        after_id = through_id
+        if len(recipients) < batch_size:
+            break
+
+    return counts
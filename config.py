@@ -18,6 +18,27 @@ class Config:
         os.path.dirname(__file__), 'hospital.db'
     )
 
+    # Connection Pool (per process)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 5)
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT') or 30)  # seconds
+    DB_POOL_MAX_USES = int(os.environ.get('DB_POOL_MAX_USES') or 1000)
+
+    # SQLite PRAGMA profile (applied once per new connection)
+    DB_PRAGMAS = {
+        'journal_mode': 'WAL',          # readers no longer block writers
+        'synchronous': 'NORMAL',        # safe with WAL, fewer fsyncs
+        'busy_timeout': 5000,           # ms to wait on a locked database
+        'cache_size': -16000,           # negative = KiB (~16MB page cache)
+        'mmap_size': 64 * 1024 * 1024,  # bytes of memory-mapped I/O
+        'temp_store': 'MEMORY',
+        'wal_autocheckpoint': 1000,     # pages before an automatic checkpoint
+        'foreign_keys': 'ON',
+    }
+
+    # Periodic WAL checkpoint run from the connection pool
+    DB_WAL_CHECKPOINT_MODE = 'PASSIVE'  # PASSIVE, FULL, RESTART or TRUNCATE
+    DB_WAL_CHECKPOINT_INTERVAL = 300    # seconds, 0 disables
+
     # Session Configuration
     SESSION_TYPE = 'filesystem'
     PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
@@ -47,6 +68,26 @@ class Config:
     MAIL_DEFAULT_SENDER = os.environ.get(
         "MAIL_DEFAULT_SENDER") or MAIL_USERNAME
 
+    # Email worker pool (per process)
+    MAIL_WORKERS = int(os.environ.get('MAIL_WORKERS') or 4)
+    MAIL_QUEUE_SIZE = int(os.environ.get('MAIL_QUEUE_SIZE') or 1000)
+    MAIL_QUEUE_TIMEOUT = float(os.environ.get('MAIL_QUEUE_TIMEOUT') or 5)    # seconds a full queue blocks senders
+    MAIL_DRAIN_TIMEOUT = float(os.environ.get('MAIL_DRAIN_TIMEOUT') or 30)   # seconds to flush the queue on shutdown
+
+    # SMTP connection reuse (one logged-in session per email worker)
+    MAIL_SMTP_TIMEOUT = 30          # seconds per socket operation
+    MAIL_SMTP_IDLE_TIMEOUT = 60     # seconds idle before the session is recycled
+    MAIL_SMTP_MAX_MESSAGES = 100    # messages per login before reconnecting
+
+    # Email outbox (email_dispatcher.py)
+    MAIL_OUTBOX_BATCH_SIZE = 50
+    MAIL_OUTBOX_POLL_INTERVAL = 5       # seconds between polls when idle
+    MAIL_OUTBOX_MAX_ATTEMPTS = 6        # then the message is marked dead
+    MAIL_OUTBOX_BACKOFF_BASE = 30       # seconds before the first retry, doubling
+    MAIL_OUTBOX_BACKOFF_MAX = 3600      # longest wait between retries
+    MAIL_OUTBOX_CLAIM_TIMEOUT = 300     # seconds before a stuck claim is retried
+    MAIL_OUTBOX_RETENTION_DAYS = 30     # sent messages are purged after this
+
     # Pagination
     APPOINTMENTS_PER_PAGE = 10
     DOCTORS_PER_PAGE = 12
@@ -56,11 +97,93 @@ class Config:
     BOOKING_ADVANCE_DAYS = 30
     CANCELLATION_HOURS = 24
 
+    # Appointment reminders (send_reminders.py): type -> hours before the visit
+    REMINDER_WINDOWS = {'24h': 24, '2h': 2}
+    REMINDER_CHUNK_SIZE = 200       # appointments read per query
+    REMINDER_WORKERS = 4            # concurrent sends
+    REMINDER_CLAIM_TIMEOUT = 900    # seconds before an unfinished claim is retried
+
+    # Background scheduler (python -m scheduler, or inside the web workers)
+    SCHEDULER_IN_APP = os.environ.get('SCHEDULER_IN_APP', '').lower() in ('1', 'true', 'yes')
+    SCHEDULER_TICK = 5              # seconds between checks for due jobs
+    SCHEDULER_LEASE_SECONDS = 60    # leader lease, renewed every tick
+    SCHEDULER_INTERVALS = {         # seconds between runs of each job
+        'reminders': 300,
+        'outbox': 10,
+        'maintenance': 3600,
+    }
+    # Browsers reuse availability responses this long, then revalidate by ETag
+    AVAILABILITY_MAX_AGE = 30  # seconds
+
+    # Threads per gunicorn gthread worker; the Procfile passes the same value
+    WEB_THREADS = int(os.environ.get('WEB_THREADS') or 32)
+
+    # Live notifications over Server-Sent Events (/notifications/stream).
+    # Under gthread each open stream holds one of its worker's WEB_THREADS
+    # threads for up to NOTIFICATION_STREAM_MAX_AGE, so a worker serves at
+    # most WEB_THREADS minus the reserved threads and answers the rest with
+    # 503. Under gevent set NOTIFICATION_STREAM_MAX_CLIENTS instead.
+    NOTIFICATION_STREAM_POLL_INTERVAL = 1.0   # seconds between change-feed reads
+    NOTIFICATION_STREAM_QUEUE_SIZE = 100      # events buffered per connection
+    NOTIFICATION_STREAM_RESERVED_THREADS = 8  # threads per worker kept for page requests
+    NOTIFICATION_STREAM_MAX_CLIENTS = int(
+        os.environ.get('NOTIFICATION_STREAM_MAX_CLIENTS')
+        or max(WEB_THREADS - NOTIFICATION_STREAM_RESERVED_THREADS, 0))
+    NOTIFICATION_STREAM_RETRY_AFTER = 30      # seconds a rejected browser waits
+    NOTIFICATION_STREAM_BACKFILL = 50         # missed events replayed on reconnect
+    NOTIFICATION_STREAM_HEARTBEAT = 15        # seconds between keepalive comments
+    NOTIFICATION_STREAM_MAX_AGE = 300         # seconds before a stream is recycled
+    # Admin broadcasts notify and email this many users per transaction
+    BROADCAST_BATCH_SIZE = 1000
+    # Admin CSV/NDJSON exports read and send this many rows at a time
+    EXPORT_CHUNK_SIZE = 1000
+
+    # Per-request query instrumentation (query_stats.py): a Server-Timing
+    # header with the query count and time, per-endpoint totals in
+    # /admin/metrics and a log line for statements repeated this many times
+    # in one request (N+1 queries; 0 disables)
+    QUERY_STATS_ENABLED = True
+    QUERY_STATS_REPEAT_WARNING = 5
+    QUERY_STATS_SLOWEST = 3              # slowest statements listed in the header...
+    QUERY_STATS_SQL_IN_HEADERS = False   # ...when SQL text may be shown to clients
+
+    # Slow query log (slow_queries.py): statements slower than the threshold
+    # are logged with their EXPLAIN QUERY PLAN; None disables it.
+    # Report: python3 slow_queries.py
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS') or 100)
+    SLOW_QUERY_LOG_PATH = os.environ.get('SLOW_QUERY_LOG_PATH') or os.path.join(
+        os.path.dirname(__file__), 'logs', 'slow_queries.log')
+    SLOW_QUERY_LOG_MAX_BYTES = 5 * 1024 * 1024   # rotated at this size...
+    SLOW_QUERY_LOG_BACKUPS = 5                   # ...keeping this many old files
+    SLOW_QUERY_LOG_BIND_PARAMS = True            # write parameter values into the SQL
+
+    # Notification retention (run by the scheduler's maintenance job): read
+    # notifications older than their type's TTL move to notifications_archive
+    NOTIFICATION_RETENTION_DAYS = {   # days per type; 0 or missing keeps forever
+        'reminder': 30,
+        'appointment': 90,
+        'cancellation': 90,
+        'system': 180,
+    }
+    NOTIFICATION_ARCHIVE_DAYS = 365     # archived rows are deleted after this (0 keeps)
+    NOTIFICATION_RETENTION_BATCH = 1000 # ids per transaction
+    NOTIFICATION_RETENTION_PAUSE = 0.01 # seconds between batches, lets writers in
+
+    # Schema migrations (python3 migrate.py): backfills update this many
+    # rows per transaction, pausing between batches and after each schema
+    # step so the app's writers get in; the runner's lease lets one process
+    # migrate at a time
+    MIGRATION_BATCH_SIZE = 1000
+    MIGRATION_BATCH_PAUSE = 0.01
+    MIGRATION_STEP_PAUSE = 0.25
+    MIGRATION_LOCK_SECONDS = 300
+
 
 class DevelopmentConfig(Config):
     """Development environment configuration"""
     DEBUG = True
     TESTING = False
+    QUERY_STATS_SQL_IN_HEADERS = True
 
 
 class ProductionConfig(Config):
@@ -68,6 +191,8 @@ class ProductionConfig(Config):
     DEBUG = False
     TESTING = False
     SESSION_COOKIE_SECURE = True  # HTTPS only
+    # Bound parameters are patient data; log statements with placeholders
+    SLOW_QUERY_LOG_BIND_PARAMS = False
 
 
 class TestingConfig(Config):
@@ -0,0 +1,47 @@
+"""
+Shared test fixtures: a Flask test client on a freshly initialized
+database (seed data from database_schema.sql), one per test module.
+"""
+import contextlib
+import io
+
+import pytest
+
+import init_db
+from config import config
+
+# Seed accounts from database_schema.sql
+ADMIN = {'user_id': 1, 'role': 'admin', 'email': 'admin@hospital.com'}
+PATIENT = {'user_id': 3, 'profile_id': 1, 'role': 'patient', 'email': 'patient@example.com'}
+DOCTOR = {'user_id': 2, 'profile_id': 1, 'role': 'doctor', 'email': 'dr.smith@hospital.com'}
+
+
+@pytest.fixture(scope='module')
+def app_config(tmp_path_factory):
+    """The development config, pointed at a new seeded database for this module"""
+    app_config = config['development']
+    db_path = app_config.DB_PATH
+    app_config.DB_PATH = str(tmp_path_factory.mktemp('app') / 'hospital.db')
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert init_db.init_database() is not False
+        yield app_config
+    finally:
+        app_config.DB_PATH = db_path
+
+
+@pytest.fixture(scope='module')
+def client(app_config):
+    """Test client for an app on app_config's database"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Importing app builds the module-level app, which opens DB_PATH
+        from app import create_app
+        app = create_app('development')
+    app.config['TESTING'] = True
+    return app.test_client()
+
+
+def log_in(client, account):
+    with client.session_transaction() as session:
+        session.clear()
+        session.update(account, full_name='Test User')
@@ -5,6 +5,15 @@
 PRAGMA foreign_keys = ON;
 
 -- Drop existing tables to allow clean re-creation
+DROP TABLE IF EXISTS doctors_fts;
+DROP TABLE IF EXISTS appointment_stats;
+DROP TABLE IF EXISTS admin_stats;
+DROP TABLE IF EXISTS doctor_schedule_versions;
+DROP TABLE IF EXISTS scheduler_locks;
+DROP TABLE IF EXISTS email_outbox;
+DROP TABLE IF EXISTS appointment_reminders;
+DROP TABLE IF EXISTS notifications_archive;
+DROP TABLE IF EXISTS notification_counters;
 DROP TABLE IF EXISTS notifications;
 DROP TABLE IF EXISTS reviews;
 DROP TABLE IF EXISTS appointments;
@@ -48,6 +57,37 @@ CREATE TABLE doctors (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
+-- =============================================
+-- DOCTOR SEARCH INDEX (FTS5, kept in sync by triggers)
+-- =============================================
+CREATE VIRTUAL TABLE doctors_fts USING fts5(
+    full_name,
+    specialization,
+    qualification,
+    bio,
+    content='doctors',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+CREATE TRIGGER doctors_fts_ai AFTER INSERT ON doctors BEGIN
+    INSERT INTO doctors_fts (rowid, full_name, specialization, qualification, bio)
+    VALUES (new.id, new.full_name, new.specialization, new.qualification, new.bio);
+END;
+
+CREATE TRIGGER doctors_fts_ad AFTER DELETE ON doctors BEGIN
+    INSERT INTO doctors_fts (doctors_fts, rowid, full_name, specialization, qualification, bio)
+    VALUES ('delete', old.id, old.full_name, old.specialization, old.qualification, old.bio);
+END;
+
+CREATE TRIGGER doctors_fts_au AFTER UPDATE OF full_name, specialization, qualification, bio ON doctors BEGIN
+    INSERT INTO doctors_fts (doctors_fts, rowid, full_name, specialization, qualification, bio)
+    VALUES ('delete', old.id, old.full_name, old.specialization, old.qualification, old.bio);
+    INSERT INTO doctors_fts (rowid, full_name, specialization, qualification, bio)
+    VALUES (new.id, new.full_name, new.specialization, new.qualification, new.bio);
+END;
+
 -- =============================================
 -- PATIENTS TABLE
 -- =============================================
@@ -109,6 +149,134 @@ CREATE TABLE appointments (
     UNIQUE (doctor_id, appointment_date, appointment_time)
 );
 
+-- =============================================
+-- SCHEDULE VERSIONS (bumped whenever a doctor's availability can change;
+-- used as the ETag of the availability API)
+-- =============================================
+CREATE TABLE doctor_schedule_versions (
+    doctor_id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (doctor_id) REFERENCES doctors(id) ON DELETE CASCADE
+);
+
+CREATE TRIGGER time_slots_version_ai AFTER INSERT ON time_slots BEGIN
+    INSERT INTO doctor_schedule_versions (doctor_id, version) VALUES (new.doctor_id, 1)
+    ON CONFLICT (doctor_id) DO UPDATE SET version = version + 1;
+END;
+
+-- Skipped when the doctor itself is being deleted (cascade)
+CREATE TRIGGER time_slots_version_ad AFTER DELETE ON time_slots
+WHEN EXISTS (SELECT 1 FROM doctors WHERE id = old.doctor_id) BEGIN
+    INSERT INTO doctor_schedule_versions (doctor_id, version) VALUES (old.doctor_id, 1)
+    ON CONFLICT (doctor_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER time_slots_version_au AFTER UPDATE ON time_slots BEGIN
+    INSERT INTO doctor_schedule_versions (doctor_id, version) VALUES (old.doctor_id, 1)
+    ON CONFLICT (doctor_id) DO UPDATE SET version = version + 1;
+    INSERT INTO doctor_schedule_versions (doctor_id, version) VALUES (new.doctor_id, 1)
+    ON CONFLICT (doctor_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER appointments_version_ai AFTER INSERT ON appointments BEGIN
+    INSERT INTO doctor_schedule_versions (doctor_id, version) VALUES (new.doctor_id, 1)
+    ON CONFLICT (doctor_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER appointments_version_ad AFTER DELETE ON appointments
+WHEN EXISTS (SELECT 1 FROM doctors WHERE id = old.doctor_id) BEGIN
+    INSERT INTO doctor_schedule_versions (doctor_id, version) VALUES (old.doctor_id, 1)
+    ON CONFLICT (doctor_id) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER appointments_version_au
+AFTER UPDATE OF doctor_id, appointment_date, appointment_time, duration, status ON appointments BEGIN
+    INSERT INTO doctor_schedule_versions (doctor_id, version) VALUES (old.doctor_id, 1)
+    ON CONFLICT (doctor_id) DO UPDATE SET version = version + 1;
+    INSERT INTO doctor_schedule_versions (doctor_id, version) VALUES (new.doctor_id, 1)
+    ON CONFLICT (doctor_id) DO UPDATE SET version = version + 1;
+END;
+
+-- =============================================
+-- ADMIN STATISTICS (kept current by triggers so the admin dashboard reads
+-- a few rows instead of counting whole tables; AdminStats.rebuild()
+-- recomputes them from scratch). appointment_stats rows whose count drops
+-- to 0 are deleted, as rebuild() would never create them.
+-- =============================================
+CREATE TABLE admin_stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TABLE appointment_stats (
+    day DATE NOT NULL,
+    doctor_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, doctor_id, status)
+) WITHOUT ROWID;
+
+CREATE TRIGGER users_stats_ai AFTER INSERT ON users
+WHEN new.role IN ('doctor', 'patient') BEGIN
+    INSERT INTO admin_stats (name, value) VALUES (new.role || 's', 1)
+    ON CONFLICT (name) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER users_stats_ad AFTER DELETE ON users
+WHEN old.role IN ('doctor', 'patient') BEGIN
+    UPDATE admin_stats SET value = value - 1 WHERE name = old.role || 's';
+END;
+
+CREATE TRIGGER doctors_stats_ai AFTER INSERT ON doctors BEGIN
+    INSERT INTO admin_stats (name, value)
+    VALUES (CASE WHEN new.is_verified = 1 THEN 'verified_doctors' ELSE 'pending_doctors' END, 1)
+    ON CONFLICT (name) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER doctors_stats_ad AFTER DELETE ON doctors BEGIN
+    UPDATE admin_stats SET value = value - 1
+    WHERE name = CASE WHEN old.is_verified = 1 THEN 'verified_doctors' ELSE 'pending_doctors' END;
+END;
+
+CREATE TRIGGER doctors_stats_au AFTER UPDATE OF is_verified ON doctors
+WHEN (old.is_verified IS 1) != (new.is_verified IS 1) BEGIN
+    UPDATE admin_stats SET value = value - 1
+    WHERE name = CASE WHEN old.is_verified = 1 THEN 'verified_doctors' ELSE 'pending_doctors' END;
+    INSERT INTO admin_stats (name, value)
+    VALUES (CASE WHEN new.is_verified = 1 THEN 'verified_doctors' ELSE 'pending_doctors' END, 1)
+    ON CONFLICT (name) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER appointments_stats_ai AFTER INSERT ON appointments BEGIN
+    INSERT INTO admin_stats (name, value) VALUES ('appointments', 1)
+    ON CONFLICT (name) DO UPDATE SET value = value + 1;
+    INSERT INTO appointment_stats (day, doctor_id, status, count)
+    VALUES (new.appointment_date, new.doctor_id, new.status, 1)
+    ON CONFLICT (day, doctor_id, status) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER appointments_stats_ad AFTER DELETE ON appointments BEGIN
+    UPDATE admin_stats SET value = value - 1 WHERE name = 'appointments';
+    UPDATE appointment_stats SET count = count - 1
+    WHERE day = old.appointment_date AND doctor_id = old.doctor_id AND status = old.status;
+    DELETE FROM appointment_stats
+    WHERE day = old.appointment_date AND doctor_id = old.doctor_id AND status = old.status
+      AND count <= 0;
+END;
+
+CREATE TRIGGER appointments_stats_au AFTER UPDATE OF appointment_date, doctor_id, status ON appointments
+WHEN old.appointment_date IS NOT new.appointment_date OR old.doctor_id IS NOT new.doctor_id
+  OR old.status IS NOT new.status BEGIN
+    UPDATE appointment_stats SET count = count - 1
+    WHERE day = old.appointment_date AND doctor_id = old.doctor_id AND status = old.status;
+    DELETE FROM appointment_stats
+    WHERE day = old.appointment_date AND doctor_id = old.doctor_id AND status = old.status
+      AND count <= 0;
+    INSERT INTO appointment_stats (day, doctor_id, status, count)
+    VALUES (new.appointment_date, new.doctor_id, new.status, 1)
+    ON CONFLICT (day, doctor_id, status) DO UPDATE SET count = count + 1;
+END;
+
 -- =============================================
 -- NOTIFICATIONS TABLE
 -- =============================================
@@ -123,6 +291,52 @@ CREATE TABLE notifications (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
+-- =============================================
+-- NOTIFICATIONS ARCHIVE (read notifications past their retention TTL,
+-- moved out of the hot table by retention.py; purged after
+-- NOTIFICATION_ARCHIVE_DAYS)
+-- =============================================
+CREATE TABLE notifications_archive (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    title TEXT NOT NULL,
+    message TEXT NOT NULL,
+    created_at DATETIME NOT NULL,
+    archived_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- =============================================
+-- NOTIFICATION COUNTERS (unread total per user, kept by triggers so the
+-- dashboard badge is a primary-key lookup instead of a COUNT(*))
+-- =============================================
+CREATE TABLE notification_counters (
+    user_id INTEGER PRIMARY KEY,
+    unread INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE TRIGGER notifications_unread_ai AFTER INSERT ON notifications
+WHEN new.is_read = 0 BEGIN
+    INSERT INTO notification_counters (user_id, unread) VALUES (new.user_id, 1)
+    ON CONFLICT (user_id) DO UPDATE SET unread = unread + 1;
+END;
+
+CREATE TRIGGER notifications_unread_ad AFTER DELETE ON notifications
+WHEN old.is_read = 0 BEGIN
+    UPDATE notification_counters SET unread = unread - 1 WHERE user_id = old.user_id;
+END;
+
+CREATE TRIGGER notifications_unread_au AFTER UPDATE OF user_id, is_read ON notifications
+WHEN (old.is_read = 0) != (new.is_read = 0) OR old.user_id != new.user_id BEGIN
+    UPDATE notification_counters SET unread = unread - 1
+    WHERE user_id = old.user_id AND old.is_read = 0;
+    INSERT INTO notification_counters (user_id, unread)
+    SELECT new.user_id, 1 WHERE new.is_read = 0
+    ON CONFLICT (user_id) DO UPDATE SET unread = unread + 1;
+END;
+
 -- =============================================
 -- REVIEWS TABLE (Optional - for patient feedback)
 -- =============================================
@@ -140,19 +354,78 @@ CREATE TABLE reviews (
     UNIQUE (appointment_id)
 );
 
+-- =============================================
+-- APPOINTMENT REMINDERS (one row per appointment and reminder type;
+-- claimed_at is set before sending, sent_at once the email went out)
+-- =============================================
+CREATE TABLE appointment_reminders (
+    appointment_id INTEGER NOT NULL,
+    reminder_type TEXT NOT NULL,
+    claimed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    sent_at DATETIME,
+    PRIMARY KEY (appointment_id, reminder_type),
+    FOREIGN KEY (appointment_id) REFERENCES appointments(id) ON DELETE CASCADE
+);
+
+-- =============================================
+-- EMAIL OUTBOX (written in the request's transaction,
+-- sent by email_dispatcher.py)
+-- =============================================
+CREATE TABLE email_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    to_email TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    html_content TEXT NOT NULL,
+    text_content TEXT NOT NULL,
+    status TEXT DEFAULT 'pending' CHECK (status IN ('pending', 'sending', 'sent', 'dead')),
+    attempts INTEGER DEFAULT 0,
+    next_attempt_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    claimed_by TEXT,
+    claimed_at DATETIME,
+    last_error TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    sent_at DATETIME
+);
+
+-- =============================================
+-- SCHEDULER LOCKS (lease held by the process running background jobs)
+-- =============================================
+CREATE TABLE scheduler_locks (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at DATETIME NOT NULL
+);
+
 -- =============================================
 -- INDEXES
 -- =============================================
-CREATE INDEX idx_users_email ON users(email);
+-- users.email, doctors.user_id and patients.user_id are UNIQUE, which
+-- already indexes them
 CREATE INDEX idx_users_role ON users(role);
 CREATE INDEX idx_doctors_specialization ON doctors(specialization);
-CREATE INDEX idx_patients_user ON patients(user_id);
 CREATE INDEX idx_time_slots_doctor_day ON time_slots(doctor_id, day_of_week);
-CREATE INDEX idx_appointments_patient ON appointments(patient_id);
-CREATE INDEX idx_appointments_doctor ON appointments(doctor_id);
-CREATE INDEX idx_appointments_date ON appointments(appointment_date);
-CREATE INDEX idx_appointments_status ON appointments(status);
-CREATE INDEX idx_notifications_user_read ON notifications(user_id, is_read);
+-- A doctor's appointments by date come from the UNIQUE (doctor_id,
+-- appointment_date, appointment_time) index. The composites below give the
+-- other model queries their rows in ORDER BY order (no sort step) and
+-- carry status, so dashboard counts and status filters stay in the index:
+--   patient_date: a patient's history, newest first, any status
+--   doctor_status: a doctor's appointments in one status, by date
+--   status_date: the admin list by status, reminders, exports
+CREATE INDEX idx_appointments_patient_date ON appointments(patient_id, appointment_date, appointment_time, status);
+CREATE INDEX idx_appointments_doctor_status ON appointments(doctor_id, status, appointment_date, appointment_time);
+CREATE INDEX idx_appointments_status_date ON appointments(status, appointment_date, appointment_time);
+CREATE INDEX idx_appointments_date ON appointments(appointment_date, appointment_time);
+CREATE INDEX idx_appointments_created ON appointments(created_at);
+-- Child side of ON DELETE CASCADE: without these, deleting a user or a
+-- doctor scans the table
+CREATE INDEX idx_reviews_doctor ON reviews(doctor_id);
+CREATE INDEX idx_reviews_patient ON reviews(patient_id);
+CREATE INDEX idx_notifications_archive_user ON notifications_archive(user_id);
+-- Both orderings of Notification.get_by_user (all / unread only) read
+-- straight from an index instead of sorting the user's history
+CREATE INDEX idx_notifications_user_created ON notifications(user_id, created_at);
+CREATE INDEX idx_notifications_user_read ON notifications(user_id, is_read, created_at);
+CREATE INDEX idx_email_outbox_due ON email_outbox(status, next_attempt_at);
 
 -- =============================================
 -- SAMPLE DATA FOR TESTING
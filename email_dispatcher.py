@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Email Outbox Dispatcher
+Sends the messages the web app writes to email_outbox. Run it as its own
+process next to the web workers (see Procfile).
+
+Usage:
+    python3 email_dispatcher.py          # poll forever
+    python3 email_dispatcher.py --once   # send everything that is due, then exit
+"""
+import os
+import random
+import signal
+import smtplib
+import socket
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from config import config
+from utils import get_db_cursor
+from models import EmailOutbox
+from email_service import get_email_service
+
+
+def is_permanent_failure(error):
+    """5xx replies and refused recipients will not succeed on a retry"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        # Bad credentials are fixed by an operator, not by the message
+        return False
+    return isinstance(error, smtplib.SMTPResponseException) and \
+        500 <= error.smtp_code < 600
+
+
+def backoff_seconds(attempts, base=30, cap=3600):
+    """Exponential backoff (base, 2*base, 4*base ... cap) with +/-20% jitter"""
+    delay = min(cap, base * 2 ** max(0, attempts - 1))
+    return max(1, int(delay * random.uniform(0.8, 1.2)))
+
+
+class OutboxDispatcher:
+    """Claims outbox messages in batches and sends them concurrently"""
+
+    def __init__(self, cfg, worker_id=None):
+        self.cfg = cfg
+        self.email_service = get_email_service(cfg)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.batch_size = getattr(cfg, 'MAIL_OUTBOX_BATCH_SIZE', 50)
+        self.max_attempts = getattr(cfg, 'MAIL_OUTBOX_MAX_ATTEMPTS', 6)
+        self.backoff_base = getattr(cfg, 'MAIL_OUTBOX_BACKOFF_BASE', 30)
+        self.backoff_max = getattr(cfg, 'MAIL_OUTBOX_BACKOFF_MAX', 3600)
+        self.claim_timeout = getattr(cfg, 'MAIL_OUTBOX_CLAIM_TIMEOUT', 300)
+        # Executor threads keep their SMTP sessions between batches
+        self.executor = ThreadPoolExecutor(
+            max_workers=getattr(cfg, 'MAIL_WORKERS', 4),
+            thread_name_prefix='outbox')
+        self.stopping = False
+
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+        self.batches = 0
+
+    def _send(self, message):
+        """Send one claimed message; returns (message, error or None)"""
+        try:
+            self.email_service.deliver(
+                message['to_email'], message['subject'],
+                message['html_content'], message['text_content'])
+            return message, None
+        except Exception as e:
+            return message, e
+
+    def dispatch_batch(self):
+        """Claim, send and record one batch; returns how many were claimed"""
+        with get_db_cursor(self.cfg) as cursor:
+            batch = EmailOutbox.claim_batch(
+                cursor, self.worker_id, self.batch_size, self.claim_timeout)
+        if not batch:
+            return 0
+
+        sent, retries, dead = [], [], []
+        for message, error in self.executor.map(self._send, batch):
+            if error is None:
+                sent.append(message['id'])
+                continue
+            reason = f"{type(error).__name__}: {error}"[:500]
+            if is_permanent_failure(error) or message['attempts'] >= self.max_attempts:
+                print(f"❌ Outbox #{message['id']} to {message['to_email']} dead: {reason}")
+                dead.append((reason, message['id']))
+            else:
+                delay = backoff_seconds(
+                    message['attempts'], self.backoff_base, self.backoff_max)
+                print(f"⚠️  Outbox #{message['id']} retry in {delay}s: {reason}")
+                retries.append((delay, reason, message['id']))
+
+        with get_db_cursor(self.cfg) as cursor:
+            recorded = EmailOutbox.mark_sent(cursor, self.worker_id, sent)
+            recorded += EmailOutbox.reschedule(cursor, self.worker_id, retries)
+            recorded += EmailOutbox.mark_dead(cursor, self.worker_id, dead)
+        if recorded < len(batch):
+            # The batch outlived MAIL_OUTBOX_CLAIM_TIMEOUT and another
+            # dispatcher claimed those messages; its result stands
+            print(f"⚠️  Outbox: {len(batch) - recorded} message(s) were re-claimed "
+                  f"by another dispatcher before this batch finished")
+
+        self.sent += len(sent)
+        self.retried += len(retries)
+        self.dead += len(dead)
+        self.batches += 1
+        print(f"📧 [Outbox] batch of {len(batch)}: {len(sent)} sent, "
+              f"{len(retries)} retrying, {len(dead)} dead")
+        return len(batch)
+
+    def run_once(self):
+        """Send batches until nothing is due; returns messages claimed"""
+        total = 0
+        while not self.stopping:
+            claimed = self.dispatch_batch()
+            total += claimed
+            if claimed < self.batch_size:
+                break
+        return total
+
+    def run_forever(self, poll_interval=None):
+        """Poll the outbox until stop() (SIGTERM/SIGINT)"""
+        if poll_interval is None:
+            poll_interval = getattr(self.cfg, 'MAIL_OUTBOX_POLL_INTERVAL', 5)
+        while not self.stopping:
+            try:
+                claimed = self.dispatch_batch()
+            except Exception as e:
+                print(f"❌ Outbox dispatch error: {e}")
+                claimed = 0
+            # A full batch means more is probably waiting
+            if claimed < self.batch_size:
+                time.sleep(poll_interval)
+
+    def stop(self, *args):
+        """Finish the current batch, then return from run_forever()"""
+        self.stopping = True
+
+    def close(self):
+        """Wait for in-flight sends and log out of the SMTP server"""
+        self.executor.shutdown(wait=True)
+        self.email_service.close_finished_sessions()
+
+
+def main(argv):
+    cfg = config['default']()
+    dispatcher = OutboxDispatcher(cfg)
+    if not dispatcher.email_service.enabled:
+        print("⚠️  MAIL_USERNAME/MAIL_PASSWORD not set - outbox messages cannot be sent")
+
+    signal.signal(signal.SIGTERM, dispatcher.stop)
+    signal.signal(signal.SIGINT, dispatcher.stop)
+
+    print(f"\n{'='*60}")
+    print(f"EMAIL OUTBOX DISPATCHER - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"{'='*60}")
+    started = time.monotonic()
+    try:
+        if '--once' in argv:
+            dispatcher.run_once()
+        else:
+            dispatcher.run_forever()
+    finally:
+        dispatcher.close()
+
+    elapsed = time.monotonic() - started
+    print(f"\nSummary: {dispatcher.sent} sent, {dispatcher.retried} retrying, "
+          f"{dispatcher.dead} dead in {dispatcher.batches} batch(es), {elapsed:.1f}s")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -2,11 +2,267 @@
 Email Notification Service
 Industry-level email notifications for appointments
 """
+import atexit
+import os
+import queue
 import smtplib
+from collections import deque
+from datetime import date
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from datetime import datetime, timedelta
 import threading
+import time
+
+from models import EmailOutbox
+from email_templates import get_email_templates
+
+
+class EmailQueueFull(Exception):
+    """Raised when the email queue stays full for longer than the put timeout"""
+
+
+class SMTPSession:
+    """
+    One authenticated SMTP connection reused for many messages
+    Reconnects when the server drops it and recycles it after idle_timeout
+    seconds without use or max_messages messages. Not thread-safe: each
+    email worker owns its own session.
+    """
+
+    def __init__(self, host, port, username=None, password=None, use_tls=True,
+                 timeout=30, idle_timeout=60, max_messages=100, smtp_class=smtplib.SMTP):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.max_messages = max_messages
+        self.smtp_class = smtp_class
+
+        self.server = None
+        self.messages = 0
+        self.last_used = 0.0
+
+        # Lifetime counters
+        self.connects = 0
+        self.reconnects = 0
+        self.sent = 0
+
+    def _connect(self):
+        """Open, secure and authenticate a new connection"""
+        print(f"📧 [SMTP] Connecting to {self.host}:{self.port}...")
+        server = self.smtp_class(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self.server = server
+        self.messages = 0
+        self.last_used = time.monotonic()
+        self.connects += 1
+
+    def _expired(self):
+        """Whether the open connection should be recycled before the next send"""
+        if self.max_messages and self.messages >= self.max_messages:
+            return True
+        return bool(self.idle_timeout) and \
+            time.monotonic() - self.last_used > self.idle_timeout
+
+    def send(self, msg):
+        """Send a message, reconnecting once if the server hung up"""
+        if self.server is not None and self._expired():
+            self.close()
+
+        for attempt in (1, 2):
+            if self.server is None:
+                self._connect()
+            try:
+                self.server.send_message(msg)
+                break
+            except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                # Idle connections are often dropped server-side
+                self.close()
+                if attempt == 2:
+                    raise
+                print(f"📧 [SMTP] Connection lost ({e}), reconnecting...")
+                self.reconnects += 1
+            except smtplib.SMTPResponseException as e:
+                # 421: the server is closing the channel
+                if e.smtp_code != 421:
+                    raise
+                self.close()
+                if attempt == 2:
+                    raise
+                self.reconnects += 1
+            except smtplib.SMTPRecipientsRefused:
+                # The session is still in sync; only this message failed
+                raise
+            except Exception:
+                # Timeouts etc. leave the protocol state unknown
+                self.close()
+                raise
+
+        self.messages += 1
+        self.sent += 1
+        self.last_used = time.monotonic()
+
+    def close(self):
+        """QUIT the connection (or drop it if the server is already gone)"""
+        server, self.server = self.server, None
+        if server is None:
+            return
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+
+# Tells a worker thread to exit once everything queued before it is sent
+_STOP = object()
+
+
+class EmailWorkerPool:
+    """
+    Fixed number of worker threads sending messages from a bounded queue
+    A full queue blocks senders for up to put_timeout seconds, then rejects.
+    """
+
+    def __init__(self, send, workers=4, max_queue=1000, put_timeout=5, sample_size=1000,
+                 on_exit=None):
+        self.send = send
+        self.on_exit = on_exit
+        self.workers = max(1, int(workers))
+        self.max_queue = max(1, int(max_queue))
+        self.put_timeout = put_timeout
+        self.pid = os.getpid()
+
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Counters and recent samples for stats()
+        self._submitted = 0
+        self._sent = 0
+        self._failed = 0
+        self._rejected = 0
+        self._max_depth = 0
+        self._waits = deque(maxlen=sample_size)
+        self._latencies = deque(maxlen=sample_size)
+
+    def _start_workers(self):
+        """Start worker threads on first use"""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._work, name=f"email-worker-{i + 1}")
+                # Daemon so a hung SMTP server cannot block exit; shutdown() drains
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, *args):
+        """Queue one message for sending, blocking while the queue is full"""
+        if self._closed:
+            raise RuntimeError("Email worker pool is shut down")
+        self._start_workers()
+        try:
+            self._queue.put((time.monotonic(), args), timeout=self.put_timeout)
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            raise EmailQueueFull(
+                f"Email queue full ({self.max_queue} messages waiting)")
+        with self._lock:
+            self._submitted += 1
+            self._max_depth = max(self._max_depth, self._queue.qsize())
+
+    def _work(self):
+        """Worker loop: send queued messages until told to stop"""
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    if self.on_exit is not None:
+                        self.on_exit()
+                    return
+                queued_at, args = item
+                started = time.monotonic()
+                try:
+                    ok = self.send(*args) is not False
+                except Exception as e:
+                    print(f"❌ Email worker error: {e}")
+                    ok = False
+                finished = time.monotonic()
+                with self._lock:
+                    if ok:
+                        self._sent += 1
+                    else:
+                        self._failed += 1
+                    self._waits.append(started - queued_at)
+                    self._latencies.append(finished - started)
+            finally:
+                self._queue.task_done()
+
+    def shutdown(self, timeout=30):
+        """Stop accepting mail, send what is queued, and stop the workers"""
+        with self._lock:
+            if self._closed:
+                return True
+            self._closed = True
+            threads = list(self._threads)
+
+        deadline = time.monotonic() + timeout
+        for _ in threads:
+            try:
+                self._queue.put(_STOP, timeout=max(0, deadline - time.monotonic()))
+            except queue.Full:
+                break
+        for thread in threads:
+            thread.join(max(0, deadline - time.monotonic()))
+
+        remaining = self._queue.qsize()
+        drained = not any(thread.is_alive() for thread in threads)
+        if not drained:
+            print(f"⚠️  Email pool shutdown timed out with {remaining} message(s) queued")
+        return drained
+
+    @staticmethod
+    def _summary(samples):
+        """avg/p95/max in milliseconds over recent samples"""
+        if not samples:
+            return {'avg_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+        ordered = sorted(samples)
+        return {
+            'avg_ms': round(sum(ordered) * 1000 / len(ordered), 3),
+            'p95_ms': round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 3),
+            'max_ms': round(ordered[-1] * 1000, 3),
+        }
+
+    def stats(self):
+        """Snapshot of queue depth and send latency to see if mail keeps up"""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'alive_workers': sum(thread.is_alive() for thread in self._threads),
+                'queue_depth': self._queue.qsize(),
+                'max_queue': self.max_queue,
+                'max_depth_seen': self._max_depth,
+                'submitted': self._submitted,
+                'sent': self._sent,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'queue_wait': self._summary(self._waits),
+                'send_latency': self._summary(self._latencies),
+            }
 
 
 class EmailService:
@@ -15,38 +271,123 @@ class EmailService:
     def __init__(self, config):
         self.config = config
         self.enabled = bool(config.MAIL_USERNAME and config.MAIL_PASSWORD)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._local = threading.local()
+        # {thread: its SMTP session}
+        self._sessions = {}
+        self.templates = get_email_templates()
+
+    @property
+    def pool(self):
+        """Worker pool for this process (recreated after fork)"""
+        with self._pool_lock:
+            if self._pool is None or self._pool.pid != os.getpid():
+                self._pool = EmailWorkerPool(
+                    self._send_email_async,
+                    workers=getattr(self.config, 'MAIL_WORKERS', 4),
+                    max_queue=getattr(self.config, 'MAIL_QUEUE_SIZE', 1000),
+                    put_timeout=getattr(self.config, 'MAIL_QUEUE_TIMEOUT', 5),
+                    on_exit=self._close_session
+                )
+                self._local = threading.local()
+                self._sessions = {}
+            return self._pool
+
+    def _session(self):
+        """SMTP session owned by the current worker thread"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = SMTPSession(
+                self.config.MAIL_SERVER,
+                self.config.MAIL_PORT,
+                username=self.config.MAIL_USERNAME,
+                password=self.config.MAIL_PASSWORD,
+                use_tls=self.config.MAIL_USE_TLS,
+                timeout=getattr(self.config, 'MAIL_SMTP_TIMEOUT', 30),
+                idle_timeout=getattr(self.config, 'MAIL_SMTP_IDLE_TIMEOUT', 60),
+                max_messages=getattr(self.config, 'MAIL_SMTP_MAX_MESSAGES', 100)
+            )
+            self._local.session = session
+            # Threads come and go (a reminder run has its own executor):
+            # drop the sessions of finished ones before adding this one
+            self.close_finished_sessions()
+            with self._pool_lock:
+                self._sessions[threading.current_thread()] = session
+        return session
+
+    def _close_session(self):
+        """Close the current worker thread's SMTP session"""
+        session = getattr(self._local, 'session', None)
+        if session is not None:
+            session.close()
+
+    def stats(self):
+        """Queue depth, latency and SMTP reuse of this process's email workers"""
+        stats = self.pool.stats()
+        with self._pool_lock:
+            sessions = list(self._sessions.values())
+        stats['smtp'] = {
+            'sessions': len(sessions),
+            'connects': sum(session.connects for session in sessions),
+            'reconnects': sum(session.reconnects for session in sessions),
+            'messages': sum(session.sent for session in sessions),
+        }
+        return stats
+
+    def shutdown(self, timeout=None):
+        """Drain queued mail before the process exits"""
+        if timeout is None:
+            timeout = getattr(self.config, 'MAIL_DRAIN_TIMEOUT', 30)
+        with self._pool_lock:
+            pool = self._pool
+        if pool is None or pool.pid != os.getpid():
+            return True
+        return pool.shutdown(timeout)
+
+    def close_sessions(self):
+        """Close every SMTP session (only when no thread is sending)"""
+        with self._pool_lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            session.close()
+
+    def close_finished_sessions(self):
+        """
+        Close and forget the sessions of threads that have exited, e.g. an
+        executor's after shutdown(wait=True); live threads keep theirs.
+        Returns how many were closed.
+        """
+        with self._pool_lock:
+            finished = [thread for thread in self._sessions if not thread.is_alive()]
+            sessions = [self._sessions.pop(thread) for thread in finished]
+        for session in sessions:
+            session.close()
+        return len(sessions)
+
+    def deliver(self, to_email, subject, html_content, text_content):
+        """Send one email now on the calling thread's SMTP session; raises on failure"""
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['From'] = self.config.MAIL_DEFAULT_SENDER
+        msg['To'] = to_email
+
+        # Attach both text and HTML versions
+        part1 = MIMEText(text_content, 'plain')
+        part2 = MIMEText(html_content, 'html')
+        msg.attach(part1)
+        msg.attach(part2)
+
+        # Reuses this thread's logged-in connection when it has one
+        self._session().send(msg)
 
     def _send_email_async(self, to_email, subject, html_content, text_content):
-        """Send email in background thread"""
+        """Send one email on a worker thread; returns True if it was sent"""
         try:
-            print(f"📧 [Email Thread] Starting email send to {to_email}")
-            print(f"📧 [Email Thread] Server: {self.config.MAIL_SERVER}:{self.config.MAIL_PORT}")
-            print(f"📧 [Email Thread] Username: {self.config.MAIL_USERNAME}")
-            
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = self.config.MAIL_DEFAULT_SENDER
-            msg['To'] = to_email
-
-            # Attach both text and HTML versions
-            part1 = MIMEText(text_content, 'plain')
-            part2 = MIMEText(html_content, 'html')
-            msg.attach(part1)
-            msg.attach(part2)
-
-            # Send email
-            print(f"📧 [Email Thread] Connecting to SMTP server...")
-            with smtplib.SMTP(self.config.MAIL_SERVER, self.config.MAIL_PORT, timeout=30) as server:
-                print(f"📧 [Email Thread] Starting TLS...")
-                if self.config.MAIL_USE_TLS:
-                    server.starttls()
-                print(f"📧 [Email Thread] Logging in...")
-                server.login(self.config.MAIL_USERNAME,
-                             self.config.MAIL_PASSWORD)
-                print(f"📧 [Email Thread] Sending message...")
-                server.send_message(msg)
-
+            print(f"📧 [Email Thread] Sending email to {to_email}")
+            self.deliver(to_email, subject, html_content, text_content)
             print(f"✅ Email sent successfully to {to_email}: {subject}")
+            return True
         except smtplib.SMTPAuthenticationError as e:
             print(f"❌ SMTP Authentication Error: {str(e)}")
             print(f"   Check your MAIL_USERNAME and MAIL_PASSWORD")
@@ -56,529 +397,139 @@ class EmailService:
             print(f"❌ Email failed to {to_email}: {str(e)}")
             import traceback
             traceback.print_exc()
+        return False
 
-    def send_email(self, to_email, subject, html_content, text_content):
-        """Send email (async if enabled, else log only)"""
-        if self.enabled:
-            # Send in background thread to not block request
+    def send_email(self, to_email, subject, html_content, text_content, cursor=None):
+        """
+        Send email (queued if enabled, else log only)
+        With a cursor the message goes to email_outbox in the caller's
+        transaction for email_dispatcher.py; otherwise to the worker pool.
+        """
+        if self.enabled and cursor is not None:
+            EmailOutbox.enqueue(cursor, to_email, subject, html_content, text_content)
+            print(f"📧 [Email Service] Added to outbox for {to_email}: {subject}")
+        elif self.enabled:
+            # Workers send in the background so requests are not blocked;
+            # raises EmailQueueFull if the queue stays full
             print(f"📧 [Email Service] Queuing email to {to_email}: {subject}")
-            thread = threading.Thread(
-                target=self._send_email_async,
-                args=(to_email, subject, html_content, text_content)
-            )
-            thread.daemon = True
-            thread.start()
-            print(f"📧 [Email Service] Email thread started for {to_email}")
+            self.pool.submit(to_email, subject, html_content, text_content)
         else:
             print(
                 f"📧 [Email Service Disabled] Would send to {to_email}: {subject}")
             print(f"   MAIL_USERNAME: {self.config.MAIL_USERNAME or 'NOT SET'}")
             print(f"   MAIL_PASSWORD: {'SET' if self.config.MAIL_PASSWORD else 'NOT SET'}")
 
+    def send_bulk(self, messages, cursor=None):
+        """
+        Send many rendered messages (EmailTemplates.render_many)
+        With a cursor they are added to email_outbox in one statement.
+        """
+        if not messages:
+            return
+        if self.enabled and cursor is not None:
+            EmailOutbox.enqueue_many(cursor, messages)
+            print(f"📧 [Email Service] Added {len(messages)} email(s) to outbox")
+        elif self.enabled:
+            for message in messages:
+                self.send_email(*message)
+        else:
+            print(f"📧 [Email Service Disabled] Would send {len(messages)} email(s): "
+                  f"{messages[0].subject}")
+
+    def render_bulk(self, template, recipients):
+        """Render one email for many recipients; see EmailTemplates.render_many"""
+        return self.templates.render_many(template, recipients)
+
     # =============================================
     # APPOINTMENT NOTIFICATIONS
     # =============================================
 
     def send_appointment_confirmation(self, patient_email, patient_name, doctor_name,
-                                      appointment_date, appointment_time, specialization):
+                                      appointment_date, appointment_time, specialization, cursor=None):
         """Send appointment booking confirmation to patient"""
-        subject = "Appointment Confirmed - HealthCare+"
-
-        html_content = f"""
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: #4f7cff; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }}
-                .content {{ background: #f9f9f9; padding: 30px; border: 1px solid #ddd; }}
-                .details {{ background: white; padding: 20px; margin: 20px 0; border-left: 4px solid #4f7cff; }}
-                .detail-row {{ margin: 10px 0; }}
-                .label {{ font-weight: bold; color: #4f7cff; }}
-                .footer {{ background: #f0f0f0; padding: 15px; text-align: center; font-size: 12px; color: #666; border-radius: 0 0 8px 8px; }}
-                .btn {{ display: inline-block; padding: 12px 30px; background: #4f7cff; color: white; text-decoration: none; border-radius: 5px; margin: 20px 0; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🏥 Appointment Confirmed!</h1>
-                </div>
-                <div class="content">
-                    <p>Dear {patient_name},</p>
-                    <p>Your appointment has been successfully booked. Here are the details:</p>
-                    
-                    <div class="details">
-                        <div class="detail-row">
-                            <span class="label">Doctor:</span> Dr. {doctor_name}
-                        </div>
-                        <div class="detail-row">
-                            <span class="label">Specialization:</span> {specialization}
-                        </div>
-                        <div class="detail-row">
-                            <span class="label">Date:</span> {appointment_date.strftime('%B %d, %Y')}
-                        </div>
-                        <div class="detail-row">
-                            <span class="label">Time:</span> {appointment_time.strftime('%I:%M %p')}
-                        </div>
-                    </div>
-                    
-                    <p><strong>Important Notes:</strong></p>
-                    <ul>
-                        <li>Please arrive 10 minutes before your scheduled time</li>
-                        <li>Bring any previous medical records if applicable</li>
-                        <li>You can cancel up to 24 hours before the appointment</li>
-                    </ul>
-                    
-                    <p>If you need to reschedule or cancel, please login to your account.</p>
-                </div>
-                <div class="footer">
-                    <p>HealthCare+ | Professional Healthcare Management</p>
-                    <p>This is an automated message, please do not reply to this email.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-
-        text_content = f"""
-        APPOINTMENT CONFIRMED - HealthCare+
-        
-        Dear {patient_name},
-        
-        Your appointment has been successfully booked.
-        
-        APPOINTMENT DETAILS:
-        - Doctor: Dr. {doctor_name}
-        - Specialization: {specialization}
-        - Date: {appointment_date.strftime('%B %d, %Y')}
-        - Time: {appointment_time.strftime('%I:%M %p')}
-        
-        Important Notes:
-        - Please arrive 10 minutes before your scheduled time
-        - Bring any previous medical records if applicable
-        - You can cancel up to 24 hours before the appointment
-        
-        Thank you,
-        HealthCare+ Team
-        """
-
-        self.send_email(patient_email, subject, html_content, text_content)
+        subject, html_content, text_content = self.templates.render(
+            'appointment_confirmation', patient_name=patient_name, doctor_name=doctor_name,
+            appointment_date=appointment_date, appointment_time=appointment_time,
+            specialization=specialization)
+        self.send_email(patient_email, subject, html_content, text_content, cursor=cursor)
 
     def send_appointment_notification_to_doctor(self, doctor_email, doctor_name, patient_name,
-                                                appointment_date, appointment_time, reason):
+                                                appointment_date, appointment_time, reason, cursor=None):
         """Notify doctor of new appointment booking"""
-        subject = f"New Appointment Booked - {appointment_date.strftime('%B %d')}"
-
-        html_content = f"""
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: #4f7cff; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }}
-                .content {{ background: #f9f9f9; padding: 30px; border: 1px solid #ddd; }}
-                .details {{ background: white; padding: 20px; margin: 20px 0; border-left: 4px solid #2ecc71; }}
-                .detail-row {{ margin: 10px 0; }}
-                .label {{ font-weight: bold; color: #4f7cff; }}
-                .footer {{ background: #f0f0f0; padding: 15px; text-align: center; font-size: 12px; color: #666; border-radius: 0 0 8px 8px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>📅 New Appointment Booked</h1>
-                </div>
-                <div class="content">
-                    <p>Dear Dr. {doctor_name},</p>
-                    <p>A new appointment has been booked with you:</p>
-                    
-                    <div class="details">
-                        <div class="detail-row">
-                            <span class="label">Patient:</span> {patient_name}
-                        </div>
-                        <div class="detail-row">
-                            <span class="label">Date:</span> {appointment_date.strftime('%B %d, %Y')}
-                        </div>
-                        <div class="detail-row">
-                            <span class="label">Time:</span> {appointment_time.strftime('%I:%M %p')}
-                        </div>
-                        <div class="detail-row">
-                            <span class="label">Reason:</span> {reason or 'General checkup'}
-                        </div>
-                    </div>
-                    
-                    <p>Login to your dashboard to view more details and patient information.</p>
-                </div>
-                <div class="footer">
-                    <p>HealthCare+ | Professional Healthcare Management</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-
-        text_content = f"""
-        NEW APPOINTMENT BOOKED - HealthCare+
-        
-        Dear Dr. {doctor_name},
-        
-        A new appointment has been booked with you:
-        
-        DETAILS:
-        - Patient: {patient_name}
-        - Date: {appointment_date.strftime('%B %d, %Y')}
-        - Time: {appointment_time.strftime('%I:%M %p')}
-        - Reason: {reason or 'General checkup'}
-        
-        Login to your dashboard to view more details.
-        
-        HealthCare+ Team
-        """
-
-        self.send_email(doctor_email, subject, html_content, text_content)
+        subject, html_content, text_content = self.templates.render(
+            'appointment_notification_to_doctor', doctor_name=doctor_name,
+            patient_name=patient_name, appointment_date=appointment_date,
+            appointment_time=appointment_time, reason=reason)
+        self.send_email(doctor_email, subject, html_content, text_content, cursor=cursor)
 
     def send_appointment_reminder(self, patient_email, patient_name, doctor_name,
-                                  appointment_date, appointment_time):
-        """Send reminder 24 hours before appointment"""
-        subject = "Appointment Reminder - Tomorrow"
-
-        html_content = f"""
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: #ffc107; color: #333; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }}
-                .content {{ background: #f9f9f9; padding: 30px; border: 1px solid #ddd; }}
-                .reminder-box {{ background: #fff3cd; padding: 20px; margin: 20px 0; border-left: 4px solid #ffc107; }}
-                .detail-row {{ margin: 10px 0; }}
-                .label {{ font-weight: bold; color: #333; }}
-                .footer {{ background: #f0f0f0; padding: 15px; text-align: center; font-size: 12px; color: #666; border-radius: 0 0 8px 8px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>⏰ Appointment Reminder</h1>
-                </div>
-                <div class="content">
-                    <p>Dear {patient_name},</p>
-                    <p>This is a friendly reminder about your upcoming appointment:</p>
-                    
-                    <div class="reminder-box">
-                        <div class="detail-row">
-                            <span class="label">Doctor:</span> Dr. {doctor_name}
-                        </div>
-                        <div class="detail-row">
-                            <span class="label">Date:</span> <strong>{appointment_date.strftime('%B %d, %Y')}</strong>
-                        </div>
-                        <div class="detail-row">
-                            <span class="label">Time:</span> <strong>{appointment_time.strftime('%I:%M %p')}</strong>
-                        </div>
-                    </div>
-                    
-                    <p><strong>Preparation:</strong></p>
-                    <ul>
-                        <li>Arrive 10 minutes early</li>
-                        <li>Bring identification and insurance card</li>
-                        <li>Bring list of current medications</li>
-                        <li>Note any questions or concerns</li>
-                    </ul>
-                    
-                    <p>See you tomorrow!</p>
-                </div>
-                <div class="footer">
-                    <p>HealthCare+ | Professional Healthcare Management</p>
-                </div>
-            </div>
-        </body>
-        </html>
+                                  appointment_date, appointment_time, cursor=None):
+        """Send a reminder before the appointment"""
+        subject, html_content, text_content = self.render_appointment_reminder(
+            patient_name, doctor_name, appointment_date, appointment_time)
+        self.send_email(patient_email, subject, html_content, text_content, cursor=cursor)
+
+    @staticmethod
+    def reminder_context(patient_name, doctor_name, appointment_date, appointment_time,
+                         today=None):
         """
-
-        text_content = f"""
-        APPOINTMENT REMINDER - HealthCare+
-        
-        Dear {patient_name},
-        
-        This is a reminder about your appointment TOMORROW:
-        
-        - Doctor: Dr. {doctor_name}
-        - Date: {appointment_date.strftime('%B %d, %Y')}
-        - Time: {appointment_time.strftime('%I:%M %p')}
-        
-        Please arrive 10 minutes early and bring necessary documents.
-        
-        See you tomorrow!
-        HealthCare+ Team
+        Template variables for the appointment_reminder email; 'when' is
+        today, tomorrow or the weekday of appointment_date as seen from today
         """
-
-        self.send_email(patient_email, subject, html_content, text_content)
+        days = (appointment_date - (today or date.today())).days
+        if days == 0:
+            when = 'today'
+        elif days == 1:
+            when = 'tomorrow'
+        else:
+            when = f"on {appointment_date.strftime('%A')}"
+        return {
+            'patient_name': patient_name,
+            'doctor_name': doctor_name,
+            'appointment_date': appointment_date,
+            'appointment_time': appointment_time,
+            'when': when,
+        }
+
+    def render_appointment_reminder(self, patient_name, doctor_name,
+                                    appointment_date, appointment_time, today=None):
+        """Build (subject, html, text) for an appointment reminder"""
+        return self.templates.render('appointment_reminder', **self.reminder_context(
+            patient_name, doctor_name, appointment_date, appointment_time, today))
 
     def send_cancellation_notification(self, patient_email, patient_name, doctor_name,
-                                       appointment_date, appointment_time, cancelled_by, reason):
+                                       appointment_date, appointment_time, cancelled_by, reason, cursor=None):
         """Notify patient about appointment cancellation"""
-        subject = "Appointment Cancelled"
-
-        html_content = f"""
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: #ff6b6b; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }}
-                .content {{ background: #f9f9f9; padding: 30px; border: 1px solid #ddd; }}
-                .cancel-box {{ background: #ffe0e0; padding: 20px; margin: 20px 0; border-left: 4px solid #ff6b6b; }}
-                .detail-row {{ margin: 10px 0; }}
-                .label {{ font-weight: bold; color: #333; }}
-                .footer {{ background: #f0f0f0; padding: 15px; text-align: center; font-size: 12px; color: #666; border-radius: 0 0 8px 8px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>❌ Appointment Cancelled</h1>
-                </div>
-                <div class="content">
-                    <p>Dear {patient_name},</p>
-                    <p>Your appointment has been cancelled.</p>
-                    
-                    <div class="cancel-box">
-                        <div class="detail-row">
-                            <span class="label">Doctor:</span> Dr. {doctor_name}
-                        </div>
-                        <div class="detail-row">
-                            <span class="label">Date:</span> {appointment_date.strftime('%B %d, %Y')}
-                        </div>
-                        <div class="detail-row">
-                            <span class="label">Time:</span> {appointment_time.strftime('%I:%M %p')}
-                        </div>
-                        <div class="detail-row">
-                            <span class="label">Cancelled by:</span> {cancelled_by.title()}
-                        </div>
-                        {f'<div class="detail-row"><span class="label">Reason:</span> {reason}</div>' if reason else ''}
-                    </div>
-                    
-                    <p>You can book a new appointment anytime through your dashboard.</p>
-                </div>
-                <div class="footer">
-                    <p>HealthCare+ | Professional Healthcare Management</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-
-        text_content = f"""
-        APPOINTMENT CANCELLED - HealthCare+
-        
-        Dear {patient_name},
-        
-        Your appointment has been cancelled:
-        
-        - Doctor: Dr. {doctor_name}
-        - Date: {appointment_date.strftime('%B %d, %Y')}
-        - Time: {appointment_time.strftime('%I:%M %p')}
-        - Cancelled by: {cancelled_by.title()}
-        {f'- Reason: {reason}' if reason else ''}
-        
-        You can book a new appointment anytime.
-        
-        HealthCare+ Team
-        """
-
-        self.send_email(patient_email, subject, html_content, text_content)
+        subject, html_content, text_content = self.templates.render(
+            'cancellation_notification', patient_name=patient_name, doctor_name=doctor_name,
+            appointment_date=appointment_date, appointment_time=appointment_time,
+            cancelled_by=cancelled_by, reason=reason)
+        self.send_email(patient_email, subject, html_content, text_content, cursor=cursor)
 
     def send_doctor_cancellation_notification(self, doctor_email, doctor_name, patient_name,
-                                              appointment_date, appointment_time):
+                                              appointment_date, appointment_time, cursor=None):
         """Notify doctor about patient cancellation"""
-        subject = f"Appointment Cancelled by Patient - {appointment_date.strftime('%B %d')}"
-
-        html_content = f"""
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: #ff6b6b; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }}
-                .content {{ background: #f9f9f9; padding: 30px; border: 1px solid #ddd; }}
-                .footer {{ background: #f0f0f0; padding: 15px; text-align: center; font-size: 12px; color: #666; border-radius: 0 0 8px 8px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>Appointment Cancelled</h1>
-                </div>
-                <div class="content">
-                    <p>Dear Dr. {doctor_name},</p>
-                    <p>The following appointment has been cancelled by the patient:</p>
-                    <p><strong>Patient:</strong> {patient_name}<br>
-                    <strong>Date:</strong> {appointment_date.strftime('%B %d, %Y')}<br>
-                    <strong>Time:</strong> {appointment_time.strftime('%I:%M %p')}</p>
-                    <p>This time slot is now available for new bookings.</p>
-                </div>
-                <div class="footer">
-                    <p>HealthCare+ | Professional Healthcare Management</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-
-        text_content = f"""
-        APPOINTMENT CANCELLED - HealthCare+
-        
-        Dear Dr. {doctor_name},
-        
-        Appointment cancelled by patient:
-        - Patient: {patient_name}
-        - Date: {appointment_date.strftime('%B %d, %Y')}
-        - Time: {appointment_time.strftime('%I:%M %p')}
-        
-        This slot is now available.
-        
-        HealthCare+ Team
-        """
-
-        self.send_email(doctor_email, subject, html_content, text_content)
+        subject, html_content, text_content = self.templates.render(
+            'doctor_cancellation_notification', doctor_name=doctor_name,
+            patient_name=patient_name, appointment_date=appointment_date,
+            appointment_time=appointment_time)
+        self.send_email(doctor_email, subject, html_content, text_content, cursor=cursor)
 
     # =============================================
     # ACCOUNT NOTIFICATIONS
     # =============================================
 
-    def send_welcome_email(self, email, name, role):
+    def send_welcome_email(self, email, name, role, cursor=None):
         """Send welcome email after registration"""
-        subject = f"🎉 Successfully Registered on MediFlow - Welcome {name}!"
-
-        html_content = f"""
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: #4f7cff; color: white; padding: 30px; text-align: center; border-radius: 8px 8px 0 0; }}
-                .content {{ background: #f9f9f9; padding: 30px; border: 1px solid #ddd; }}
-                .welcome-box {{ background: white; padding: 20px; margin: 20px 0; border-left: 4px solid #4f7cff; }}
-                .success-badge {{ background: #2ecc71; color: white; padding: 10px 20px; border-radius: 5px; display: inline-block; margin: 10px 0; }}
-                .footer {{ background: #f0f0f0; padding: 15px; text-align: center; font-size: 12px; color: #666; border-radius: 0 0 8px 8px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🎉 Welcome to MediFlow!</h1>
-                </div>
-                <div class="content">
-                    <p>Dear {name},</p>
-                    <p><strong>You have successfully registered on MediFlow!</strong></p>
-                    <p>Your {role} account has been created and is ready to use.</p>
-                    
-                    <div class="success-badge">
-                        ✅ Registration Successful
-                    </div>
-                    
-                    <div class="welcome-box">
-                        {'<p><strong>What you can do now:</strong></p><ul><li>Login to your account</li><li>Browse our verified doctors</li><li>Book your first appointment</li><li>Manage your health records</li></ul>' if role == 'patient' else '<p><strong>What happens next:</strong></p><ul><li>Your account is under review for verification</li><li>Once verified by admin, you can set your schedule</li><li>Start accepting patient appointments</li><li>Manage your consultations</li></ul>'}
-                    </div>
-                    
-                    <p><strong>Ready to get started?</strong> Login to your MediFlow account now!</p>
-                    
-                    <p>If you have any questions, feel free to reach out to our support team.</p>
-                    
-                    <p>Best regards,<br>The MediFlow Team</p>
-                </div>
-                <div class="footer">
-                    <p>MediFlow | Professional Healthcare Management System</p>
-                    <p>This is an automated message, please do not reply to this email.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-
-        text_content = f"""
-        SUCCESSFULLY REGISTERED ON MEDIFLOW
-        
-        Dear {name},
-        
-        You have successfully registered on MediFlow!
-        Your {role} account has been created and is ready to use.
-        
-        ✅ Registration Successful
-        
-        {'What you can do now:' if role == 'patient' else 'What happens next:'}
-        {'- Login to your account' if role == 'patient' else '- Your account is under review'}
-        {'- Browse our verified doctors' if role == 'patient' else '- Once verified, set your schedule'}
-        {'- Book your first appointment' if role == 'patient' else '- Start accepting appointments'}
-        {'- Manage your health records' if role == 'patient' else '- Manage your consultations'}
-        
-        Ready to get started? Login to your MediFlow account now!
-        
-        Best regards,
-        The MediFlow Team
-        
-        ---
-        MediFlow | Professional Healthcare Management System
-        This is an automated message, please do not reply to this email.
-        """
-
-        self.send_email(email, subject, html_content, text_content)
+        subject, html_content, text_content = self.templates.render(
+            'welcome', name=name, role=role)
+        self.send_email(email, subject, html_content, text_content, cursor=cursor)
 
-    def send_doctor_verification_email(self, doctor_email, doctor_name):
+    def send_doctor_verification_email(self, doctor_email, doctor_name, cursor=None):
         """Notify doctor when account is verified"""
-        subject = "Your Doctor Account Has Been Verified!"
-
-        html_content = f"""
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: #2ecc71; color: white; padding: 30px; text-align: center; border-radius: 8px 8px 0 0; }}
-                .content {{ background: #f9f9f9; padding: 30px; border: 1px solid #ddd; }}
-                .footer {{ background: #f0f0f0; padding: 15px; text-align: center; font-size: 12px; color: #666; border-radius: 0 0 8px 8px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>✅ Account Verified!</h1>
-                </div>
-                <div class="content">
-                    <p>Dear Dr. {doctor_name},</p>
-                    <p>Great news! Your doctor account has been verified and approved.</p>
-                    <p>You can now:</p>
-                    <ul>
-                        <li>Set your availability schedule</li>
-                        <li>Accept patient appointments</li>
-                        <li>Manage patient consultations</li>
-                        <li>Update medical records</li>
-                    </ul>
-                    <p>Login to your dashboard to get started!</p>
-                </div>
-                <div class="footer">
-                    <p>HealthCare+ | Professional Healthcare Management</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-
-        text_content = f"""
-        ACCOUNT VERIFIED - HealthCare+
-        
-        Dear Dr. {doctor_name},
-        
-        Your doctor account has been verified!
-        
-        You can now set your schedule and accept appointments.
-        
-        Login to get started!
-        HealthCare+ Team
-        """
-
-        self.send_email(doctor_email, subject, html_content, text_content)
+        subject, html_content, text_content = self.templates.render(
+            'doctor_verification', doctor_name=doctor_name)
+        self.send_email(doctor_email, subject, html_content, text_content, cursor=cursor)
 
 
 # Global email service instance
@@ -591,3 +542,10 @@ def get_email_service(config):
     if _email_service is None:
         _email_service = EmailService(config)
     return _email_service
+
+
+@atexit.register
+def _drain_email_queue():
+    """Send mail still queued when the interpreter exits"""
+    if _email_service is not None:
+        _email_service.shutdown()
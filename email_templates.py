@@ -0,0 +1,76 @@
+"""
+Email Templates
+Jinja2 templates for notification emails (templates/email). Each email is a
+NAME.html template extending base.html plus a NAME.txt plain-text version.
+The HTML template sets the subject with {% set subject %}...{% endset %}.
+
+Jinja compiles each template once and keeps it until its file changes, so
+a message costs one render of each version.
+"""
+import functools
+import os
+from collections import namedtuple
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, select_autoescape
+from markupsafe import Markup
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'email')
+
+RenderedEmail = namedtuple(
+    'RenderedEmail', ('to_email', 'subject', 'html_content', 'text_content'))
+
+
+@functools.lru_cache(maxsize=1024)
+def _strftime(value, fmt):
+    """strftime filter; a reminder batch shares a handful of dates and times"""
+    return value.strftime(fmt)
+
+
+class EmailTemplates:
+    """Compiled, cached email templates"""
+
+    def __init__(self, path=TEMPLATE_DIR, auto_reload=True):
+        self.env = Environment(
+            loader=FileSystemLoader(path),
+            # Names and reasons come from users; escape them in HTML only
+            autoescape=select_autoescape(['html']),
+            undefined=StrictUndefined,
+            auto_reload=auto_reload,
+            keep_trailing_newline=True,
+        )
+        self.env.filters['strftime'] = _strftime
+
+    def render(self, template, **variables):
+        """Render one email; returns (subject, html, text)"""
+        return self._render(template, variables)
+
+    def _render(self, template, variables):
+        html = self.env.get_template(f"{template}.html").make_module(variables)
+        subject = html.subject
+        return (
+            # Subjects are headers, not HTML: undo escaping, collapse whitespace
+            Markup(subject).striptags() if '&' in subject else ' '.join(subject.split()),
+            str(html),
+            self.env.get_template(f"{template}.txt").render(variables),
+        )
+
+    def render_many(self, template, recipients):
+        """
+        Render one email for many recipients
+        Each recipient is a dict of template variables plus 'to_email';
+        returns a list of RenderedEmail ready for EmailService.send_bulk().
+        """
+        return [RenderedEmail(variables['to_email'], *self._render(template, variables))
+                for variables in recipients]
+
+
+# Global templates instance
+_email_templates = None
+
+
+def get_email_templates():
+    """Get email templates singleton"""
+    global _email_templates
+    if _email_templates is None:
+        _email_templates = EmailTemplates()
+    return _email_templates
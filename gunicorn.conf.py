@@ -0,0 +1,16 @@
+"""
+Gunicorn settings (read from the working directory, see Procfile)
+
+With SCHEDULER_IN_APP each worker starts its scheduler right after it is
+forked, so jobs run even before the first request, with or without
+--preload. The master never starts one: threads don't survive the fork.
+"""
+import os
+
+
+def post_fork(server, worker):
+    from config import config
+    app_config = config[os.getenv('FLASK_ENV', 'development')]
+    if getattr(app_config, 'SCHEDULER_IN_APP', False):
+        from scheduler import start_scheduler
+        start_scheduler(app_config)
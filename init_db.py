@@ -1,16 +1,21 @@
 #!/usr/bin/env python3
 """
 Database initialization script for Hospital Management System
-Creates and initializes the SQLite database with schema and seed data
+Creates the SQLite database with schema and seed data, or brings an
+existing one up to date with the pending migrations (see migrate.py)
+
+    python init_db.py            # create, or migrate keeping the data
+    python init_db.py --reset    # delete the database and create it again
 """
 
-import sqlite3
 import os
+import sys
 from config import config
+from migrate import upgrade, MigrationError
 
 
-def init_database():
-    """Initialize the SQLite database with schema and seed data"""
+def init_database(reset=False):
+    """Create the database, or migrate an existing one (reset: delete it first)"""
     # Get the development configuration
     app_config = config['development']
 
@@ -19,73 +24,24 @@ def init_database():
 
     print(f"Initializing database at: {db_path}")
 
-    # Remove existing database if it exists
-    if os.path.exists(db_path):
-        os.remove(db_path)
+    if reset:
+        # Remove existing database if it exists (plus any WAL/shared-memory files)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
         print("Removed existing database")
 
-    # Create database connection
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    # Enable foreign key constraints
-    cursor.execute("PRAGMA foreign_keys = ON")
-
-    print("Creating database schema...")
+    created = not os.path.exists(db_path) or os.path.getsize(db_path) == 0
 
-    # Read and execute the schema file
-    schema_file = os.path.join(
-        os.path.dirname(__file__), 'database_schema.sql')
-
-    if not os.path.exists(schema_file):
-        print(f"Error: Schema file not found at {schema_file}")
+    try:
+        applied = upgrade(app_config)
+    except MigrationError as e:
+        print(f"Error: {e}")
         return False
 
-    with open(schema_file, 'r') as f:
-        schema_sql = f.read()
-
-    # Split the schema into individual statements and execute them
-    # We need to handle this carefully to ensure tables are created before indexes
-    statements = []
-    current_statement = ""
-
-    for line in schema_sql.split('\n'):
-        line = line.strip()
-        if line.startswith('--') or not line:
-            continue
-
-        current_statement += line + "\n"
-
-        if line.endswith(';'):
-            statements.append(current_statement.strip())
-            current_statement = ""
-
-    # Execute table creation statements first, then indexes
-    table_statements = [s for s in statements if s.startswith(
-        ('CREATE TABLE', 'INSERT'))]
-    index_statements = [s for s in statements if s.startswith('CREATE INDEX')]
-    view_statements = [s for s in statements if s.startswith('CREATE VIEW')]
-    pragma_statements = [s for s in statements if s.startswith('PRAGMA')]
-    drop_statements = [s for s in statements if s.startswith('DROP')]
-
-    # Order: PRAGMA, DROP, CREATE TABLE, INSERT, CREATE INDEX, CREATE VIEW
-    ordered_statements = pragma_statements + drop_statements + \
-        table_statements + index_statements + view_statements
-
-    for statement in ordered_statements:
-        if statement and not statement.startswith('--'):
-            try:
-                print(f"Executing: {statement[:50]}...")
-                cursor.execute(statement)
-            except sqlite3.Error as e:
-                print(f"Error executing statement: {statement[:50]}...")
-                print(f"Error: {e}")
-                conn.rollback()
-                return False
-
-    conn.commit()
-    conn.close()
+    if not created:
+        print(f"Database is up to date ({len(applied)} migration(s) applied)")
+        return True
 
     print("Database initialized successfully!")
     print("\nTest accounts available:")
@@ -97,4 +53,4 @@ def init_database():
 
 
 if __name__ == '__main__':
-    init_database()
+    sys.exit(0 if init_database(reset='--reset' in sys.argv[1:]) else 1)
@@ -0,0 +1,670 @@
+#!/usr/bin/env python3
+"""
+Schema Migrations
+Upgrades a database in place, while the app keeps running, instead of
+re-creating it.
+
+Migrations are numbered modules in migrations/ (0001_name.py, ...) with an
+upgrade(m) function and, where the change can be undone, downgrade(m); m is
+a MigrationContext whose steps each commit on their own (see
+migrations/__init__.py for writing one). schema_version lists the versions
+applied.
+
+A new database is created from database_schema.sql, which always matches
+the latest migration, and stamped with every version. Version 0 is the
+schema from before migrations (migrations/baseline.sql): a database with
+tables but no schema_version is adopted at version 0 if it has the
+baseline's tables, views and indexes, then brought forward. After the
+last migration the schema is compared with database_schema.sql, and any
+drift (missing, extra or different tables, indexes, triggers, views) is
+an error.
+
+    python3 migrate.py status
+    python3 migrate.py upgrade [--to N]
+    python3 migrate.py downgrade --to N
+"""
+import argparse
+import importlib.util
+import os
+import re
+import socket
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+from config import config
+from utils import get_db_connection
+from models import SchedulerLock
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MIGRATIONS_DIR = os.path.join(BASE_DIR, 'migrations')
+SCHEMA_FILE = os.path.join(BASE_DIR, 'database_schema.sql')
+BASELINE_FILE = os.path.join(MIGRATIONS_DIR, 'baseline.sql')
+
+# Lease name in scheduler_locks while a runner works
+LOCK_NAME = 'schema_migrations'
+
+VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# The runner's own tables (same definitions as database_schema.sql); made
+# before the lock is taken, so they aren't part of any migration
+LOCK_TABLE = """
+    CREATE TABLE IF NOT EXISTS scheduler_locks (
+        name TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        expires_at DATETIME NOT NULL
+    )
+"""
+RUNNER_TABLES = ('schema_version', 'scheduler_locks')
+
+_MIGRATION_FILE = re.compile(r'^(\d{4})_(\w+)\.py$')
+_INDEX_ON = re.compile(r'^\s*(\w+)\s*\((.*)\)\s*$')
+
+Migration = namedtuple('Migration', ('version', 'name', 'module'))
+
+
+class MigrationError(Exception):
+    """A migration can't run: another runner holds the lock, the database is unknown, ..."""
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """[Migration] from the numbered files in directory, in order"""
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = _MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        spec = importlib.util.spec_from_file_location(
+            f"migrations.m{match[1]}", os.path.join(directory, filename))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        migrations.append(Migration(int(match[1]), match[2], module))
+    versions = [migration.version for migration in migrations]
+    if versions != list(range(1, len(versions) + 1)):
+        raise MigrationError(f"Migrations must be numbered from 0001 without gaps, found {versions}")
+    return migrations
+
+
+def schema_statements(path=SCHEMA_FILE):
+    """database_schema.sql as a list of statements (trigger bodies kept whole)"""
+    statements = []
+    current = ''
+    with open(path) as f:
+        for line in f:
+            if not current and (not line.strip() or line.lstrip().startswith('--')):
+                continue
+            current += line
+            if sqlite3.complete_statement(current):
+                statements.append(current.strip())
+                current = ''
+    return statements
+
+
+def _tables(connection):
+    return {row[0] for row in connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def _normalized(sql):
+    return ' '.join(sql.split())
+
+
+def schema_objects(connection):
+    """
+    {name: (type, definition)} for the tables, indexes, views and triggers
+    of a database, comparable between databases: tables by columns, keys
+    and constraints, indexes by table and columns, views, triggers and
+    virtual tables by their SQL (whitespace aside). FTS shadow tables and
+    SQLite's own tables are left out.
+    """
+    rows = connection.execute(
+        "SELECT type, name, tbl_name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'").fetchall()
+    virtual = {name for type_, name, _, sql in rows
+               if type_ == 'table' and sql.upper().startswith('CREATE VIRTUAL')}
+    objects = {}
+    for type_, name, table, sql in rows:
+        if type_ == 'table' and name in virtual:
+            objects[name] = (type_, _normalized(sql))
+        elif type_ == 'table':
+            if any(name.startswith(f"{owner}_") for owner in virtual):
+                continue
+            columns = sorted(tuple(row[1:]) for row in connection.execute(f"PRAGMA table_info({name})"))
+            foreign_keys = sorted(map(repr, (tuple(row[2:]) for row in connection.execute(
+                f"PRAGMA foreign_key_list({name})"))))
+            constraints = sorted(
+                (row[3], tuple(column[2] for column in connection.execute(f"PRAGMA index_info({row[1]})")))
+                for row in connection.execute(f"PRAGMA index_list({name})") if row[3] != 'c')
+            without_rowid = connection.execute(f"PRAGMA table_list({name})").fetchone()[4]
+            objects[name] = (type_, (columns, foreign_keys, constraints, without_rowid))
+        elif type_ == 'index':
+            unique, partial = next(row[2::2] for row in connection.execute(f"PRAGMA index_list({table})")
+                                   if row[1] == name)
+            columns = tuple(tuple(row[2:5]) for row in connection.execute(f"PRAGMA index_xinfo({name})")
+                            if row[5])
+            objects[name] = (type_, (table, unique, partial, columns))
+        else:
+            objects[name] = (type_, _normalized(sql))
+    return objects
+
+
+def reference_objects(path=SCHEMA_FILE):
+    """schema_objects() of a schema file, loaded into an in-memory database"""
+    reference = sqlite3.connect(':memory:')
+    try:
+        for statement in schema_statements(path):
+            reference.execute(statement)
+        reference.execute(VERSION_TABLE)
+        reference.execute(LOCK_TABLE)
+        return schema_objects(reference)
+    finally:
+        reference.close()
+
+
+def schema_drift(connection, path=SCHEMA_FILE):
+    """How connection's schema differs from the schema file's, as readable lines"""
+    expected, actual = reference_objects(path), schema_objects(connection)
+    drift = []
+    for name in sorted(expected.keys() | actual.keys()):
+        if name not in actual:
+            drift.append(f"missing {expected[name][0]} {name}")
+        elif name not in expected:
+            drift.append(f"unexpected {actual[name][0]} {name}")
+        elif actual[name] != expected[name]:
+            drift.append(f"{actual[name][0]} {name} differs")
+    return drift
+
+
+def adoption_problems(connection):
+    """
+    Why an unversioned database can't be adopted at version 0, as
+    readable lines. It needs the baseline's tables and views, and the
+    baseline indexes no migration changes, exactly as in baseline.sql.
+    Any other index, trigger or table must be one database_schema.sql
+    has (from a database made while those were being added): the
+    migrations create, replace or drop those, and upgrade() checks the
+    result against database_schema.sql.
+    """
+    baseline, latest = reference_objects(BASELINE_FILE), reference_objects()
+    actual = schema_objects(connection)
+    problems = []
+    for name, (type_, definition) in sorted(baseline.items()):
+        if name in RUNNER_TABLES:
+            continue
+        kept = type_ in ('table', 'view') or latest.get(name) == (type_, definition)
+        if kept and actual.get(name) != (type_, definition):
+            problems.append(f"{'missing' if name not in actual else 'different'} {type_} {name}")
+    for name, (type_, _) in sorted(actual.items()):
+        if name not in baseline and name not in latest:
+            problems.append(f"unexpected {type_} {name}")
+    return problems
+
+
+def applied_versions(connection):
+    """{version: name} from schema_version, or None if the table doesn't exist"""
+    if 'schema_version' not in _tables(connection):
+        return None
+    return dict(connection.execute("SELECT version, name FROM schema_version").fetchall())
+
+
+class MigrationContext:
+    """
+    Steps for a migration's upgrade() / downgrade(). Each step commits on
+    its own, so the write lock is held for one step at a time (readers are
+    never blocked under WAL; writers wait up to busy_timeout), and skips
+    work already done, so an interrupted migration can simply be re-run.
+    """
+
+    def __init__(self, connection, batch_size=1000, pause=0.01, step_pause=0.25,
+                 renew=None, report=True):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.pause = pause
+        self.step_pause = step_pause
+        self.report = report
+        # Called between steps to keep the runner's lease
+        self._renew = renew
+
+    def _done(self, started, message):
+        if self.report:
+            print(f"    {message} ({time.monotonic() - started:.2f}s)")
+        if self._renew:
+            self._renew()
+        # Writers that queued behind this step are asleep in their busy
+        # handler; going straight on to the next step would lock them out again
+        time.sleep(self.step_pause)
+
+    def has_index(self, name):
+        return self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)).fetchone() is not None
+
+    def has_column(self, table, column):
+        return any(row[1] == column for row in self.connection.execute(f"PRAGMA table_info({table})"))
+
+    def _sql(self, type_, name):
+        row = self.connection.execute(
+            "SELECT sql FROM sqlite_master WHERE type = ? AND name = ?", (type_, name)).fetchone()
+        return row and row[0]
+
+    @contextmanager
+    def _transaction(self):
+        """One step's statements in one IMMEDIATE transaction (the write lock up front)"""
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.connection
+        except BaseException:
+            self.connection.rollback()
+            raise
+        self.connection.commit()
+
+    def execute(self, sql, parameters=()):
+        """Run one statement in its own transaction"""
+        started = time.monotonic()
+        self.connection.execute(sql, parameters)
+        self.connection.commit()
+        self._done(started, ' '.join(sql.split())[:80])
+
+    def execute_all(self, statements, label=None):
+        """Run statements together in one IMMEDIATE transaction"""
+        started = time.monotonic()
+        with self._transaction() as connection:
+            for statement in statements:
+                connection.execute(statement)
+        self._done(started, label or ' '.join(statements[0].split())[:80])
+
+    def create_table(self, name, sql):
+        """Run sql (CREATE TABLE / CREATE VIRTUAL TABLE name ...) unless name exists"""
+        if name in _tables(self.connection):
+            return
+        started = time.monotonic()
+        self.connection.execute(sql)
+        self.connection.commit()
+        self._done(started, f"created table {name}")
+
+    def drop_table(self, name):
+        if name not in _tables(self.connection):
+            return
+        started = time.monotonic()
+        self.connection.execute(f"DROP TABLE IF EXISTS {name}")
+        self.connection.commit()
+        self._done(started, f"dropped table {name}")
+
+    def create_trigger(self, name, sql):
+        """
+        Run sql (CREATE TRIGGER name ...). A trigger of that name with
+        other SQL is replaced: dropped and created in one transaction, so
+        no write runs without it.
+        """
+        current = self._sql('trigger', name)
+        if current is not None and _normalized(current) == _normalized(sql):
+            return
+        started = time.monotonic()
+        with self._transaction() as connection:
+            connection.execute(f"DROP TRIGGER IF EXISTS {name}")
+            connection.execute(sql)
+        self._done(started, f"{'replaced' if current else 'created'} trigger {name}")
+
+    def drop_trigger(self, name):
+        if self._sql('trigger', name) is None:
+            return
+        started = time.monotonic()
+        self.connection.execute(f"DROP TRIGGER IF EXISTS {name}")
+        self.connection.commit()
+        self._done(started, f"dropped trigger {name}")
+
+    def _index_matches(self, name, table, columns, unique):
+        row = self.connection.execute(
+            "SELECT tbl_name FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)).fetchone()
+        if row is None or row[0] != table:
+            return False
+        current = [row[2] for row in self.connection.execute(f"PRAGMA index_xinfo({name})") if row[5]]
+        is_unique = any(row[1] == name and row[2] for row in self.connection.execute(
+            f"PRAGMA index_list({table})"))
+        return current == columns and is_unique == unique
+
+    def create_index(self, name, on, unique=False):
+        """
+        CREATE INDEX name ON on (e.g. "appointments(doctor_id, status)",
+        plain column names), then ANALYZE it so the planner weighs it
+        against the analyzed indexes at once. An index of that name on
+        other columns is replaced in the same transaction. SQLite builds an
+        index in one statement, so writers wait for the build (2-3 s per
+        million rows): keep that under busy_timeout, or migrate a large
+        table off-peak.
+        """
+        table, columns = _INDEX_ON.match(on).groups()
+        columns = [column.strip() for column in columns.split(',')]
+        if self._index_matches(name, table, columns, unique):
+            return
+        replaced = self.has_index(name)
+        started = time.monotonic()
+        # Sampled statistics: a full ANALYZE reads the whole new index again
+        limit = self.connection.execute("PRAGMA analysis_limit").fetchone()[0]
+        self.connection.execute("PRAGMA analysis_limit = 1000")
+        try:
+            with self._transaction() as connection:
+                connection.execute(f"DROP INDEX IF EXISTS {name}")
+                connection.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {on}")
+                connection.execute(f"ANALYZE {name}")
+        finally:
+            self.connection.execute(f"PRAGMA analysis_limit = {int(limit)}")
+        self._done(started, f"{'rebuilt' if replaced else 'created'} index {name}")
+
+    def drop_index(self, name):
+        if not self.has_index(name):
+            return
+        started = time.monotonic()
+        self.connection.execute(f"DROP INDEX IF EXISTS {name}")
+        self.connection.commit()
+        self._done(started, f"dropped index {name}")
+
+    def add_column(self, table, column, definition):
+        """
+        ALTER TABLE ADD COLUMN: only the schema changes, existing rows are
+        not rewritten; fill them with backfill()
+        """
+        if self.has_column(table, column):
+            return
+        started = time.monotonic()
+        self.connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        self.connection.commit()
+        self._done(started, f"added {table}.{column}")
+
+    def backfill(self, table, assignments, where='1', parameters=()):
+        """
+        UPDATE table SET assignments WHERE where, batch_size rowids per
+        transaction with a pause between batches. where should exclude rows
+        already done (e.g. "col IS NULL") so a re-run picks up where an
+        interrupted one stopped; parameters fill the ?s of assignments,
+        then of where. Returns the number of rows updated.
+        """
+        low, high = self.connection.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {table}").fetchone()
+        if low is None:
+            return 0
+        started = time.monotonic()
+        updated = 0
+        query = f"UPDATE {table} SET {assignments} WHERE ({where}) AND rowid >= ? AND rowid < ?"
+        for start in range(low, high + 1, self.batch_size):
+            cursor = self.connection.execute(query, (*parameters, start, start + self.batch_size))
+            updated += cursor.rowcount
+            self.connection.commit()
+            if self._renew:
+                self._renew()
+            time.sleep(self.pause)
+        self._done(started, f"backfilled {updated} {table} row(s)")
+        return updated
+
+    def in_batches(self, table, statements, key='rowid', size=None, label=None):
+        """
+        Run statements once per range of size (default batch_size) key
+        values of table, each range in one IMMEDIATE transaction with a
+        pause between ranges. A statement gets the range as :low
+        (inclusive) and :high (exclusive); it must be safe to run again
+        (recompute, or skip rows done), since an interrupted migration
+        restarts from the first range. Returns the rows the statements
+        changed.
+        """
+        low, high = self.connection.execute(f"SELECT MIN({key}), MAX({key}) FROM {table}").fetchone()
+        if low is None:
+            return 0
+        size = size or self.batch_size
+        started = time.monotonic()
+        changed = 0
+        for start in range(low, high + 1, size):
+            bounds = {'low': start, 'high': start + size}
+            with self._transaction() as connection:
+                for statement in statements:
+                    changed += max(connection.execute(statement, bounds).rowcount, 0)
+            if self._renew:
+                self._renew()
+            time.sleep(self.pause)
+        self._done(started, f"{label or table}: {changed} row(s) in batches of {size} {key}s")
+        return changed
+
+
+def _create_database(connection, migrations):
+    """
+    Load database_schema.sql into an empty database and stamp it with
+    every version, in one transaction; False if the database isn't empty
+    """
+    statements = schema_statements()
+    isolation_level = connection.isolation_level
+    connection.isolation_level = None
+    try:
+        # IMMEDIATE: of two runners racing on a new file, one creates it
+        # and the other then finds the tables
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            if _tables(connection):
+                connection.execute("ROLLBACK")
+                return False
+            for statement in statements:
+                connection.execute(statement)
+            connection.execute(VERSION_TABLE)
+            connection.executemany(
+                "INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                [(0, 'baseline')] + [(migration.version, migration.name) for migration in migrations])
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+    finally:
+        connection.isolation_level = isolation_level
+    return True
+
+
+def _adopt(connection):
+    """
+    Start versioning a database made before migrations at version 0 (see
+    adoption_problems()); False if it is versioned already
+    """
+    if applied_versions(connection) is not None:
+        return False
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        if applied_versions(connection) is not None:
+            connection.rollback()
+            return False
+        problems = adoption_problems(connection)
+        if problems:
+            raise MigrationError(
+                f"The database has no schema_version and doesn't match the version 0 "
+                f"baseline (migrations/baseline.sql): {'; '.join(problems)}. Re-create it "
+                f"(python3 init_db.py --reset) or bring it to the baseline by hand first")
+        connection.execute(VERSION_TABLE)
+        connection.execute("INSERT INTO schema_version (version, name) VALUES (0, 'baseline')")
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    return True
+
+
+def _check_versions(applied, migrations):
+    """Versions applied under another name mean the migrations were renumbered"""
+    renamed = [f"{migration.version:04d} is '{applied[migration.version]}' in the database, "
+               f"'{migration.name}' here" for migration in migrations
+               if applied.get(migration.version, migration.name) != migration.name]
+    if renamed:
+        raise MigrationError(f"schema_version doesn't match migrations/: {'; '.join(renamed)}")
+
+
+@contextmanager
+def _migration_lock(connection, cfg):
+    """Hold the migration lease while the block runs; yields a renew() for long steps"""
+    cursor = connection.cursor()
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    lease = getattr(cfg, 'MIGRATION_LOCK_SECONDS', 300)
+    renewed = [time.monotonic()]
+
+    if not SchedulerLock.acquire(cursor, LOCK_NAME, owner, lease):
+        connection.commit()
+        holder = cursor.execute("SELECT owner, expires_at FROM scheduler_locks WHERE name = ?",
+                                (LOCK_NAME,)).fetchone()
+        raise MigrationError(f"Another migration is running ({holder[0]}, lease until {holder[1]})")
+    connection.commit()
+
+    def renew():
+        # A write per step would be wasted; renew once a third of the lease is gone
+        if time.monotonic() - renewed[0] < lease / 3:
+            return
+        if not SchedulerLock.acquire(cursor, LOCK_NAME, owner, lease):
+            connection.commit()
+            raise MigrationError("Lost the migration lock (lease expired)")
+        connection.commit()
+        renewed[0] = time.monotonic()
+
+    try:
+        yield renew
+    finally:
+        connection.rollback()
+        SchedulerLock.release(cursor, LOCK_NAME, owner)
+        connection.commit()
+
+
+def _context(connection, cfg, renew, report):
+    return MigrationContext(
+        connection,
+        batch_size=getattr(cfg, 'MIGRATION_BATCH_SIZE', 1000),
+        pause=getattr(cfg, 'MIGRATION_BATCH_PAUSE', 0.01),
+        step_pause=getattr(cfg, 'MIGRATION_STEP_PAUSE', 0.25),
+        renew=renew, report=report)
+
+
+def upgrade(cfg, target=None, report=True):
+    """
+    Bring cfg's database up to version target (default: latest); returns
+    versions applied. At the latest version the schema must then match
+    database_schema.sql.
+    """
+    migrations = load_migrations()
+    connection = get_db_connection(cfg)
+    try:
+        if _create_database(connection, migrations):
+            if report:
+                print(f"✅ Created the database at version {len(migrations)}")
+            return []
+        if _adopt(connection) and report:
+            print("Adopted an unversioned database at version 0")
+        connection.execute(LOCK_TABLE)
+        connection.commit()
+
+        with _migration_lock(connection, cfg) as renew:
+            # Read after locking: another runner may have just finished
+            applied = applied_versions(connection)
+            _check_versions(applied, migrations)
+            pending = [migration for migration in migrations if migration.version not in applied
+                       and (target is None or migration.version <= target)]
+            context = _context(connection, cfg, renew, report)
+            for migration in pending:
+                if report:
+                    print(f"⏫ {migration.version:04d} {migration.name}")
+                started = time.monotonic()
+                migration.module.upgrade(context)
+                connection.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                                   (migration.version, migration.name))
+                connection.commit()
+                if report:
+                    print(f"   done in {time.monotonic() - started:.1f}s")
+
+            if set(applied_versions(connection)) == {0, *range(1, len(migrations) + 1)}:
+                drift = schema_drift(connection)
+                if drift:
+                    raise MigrationError(
+                        f"The schema at version {len(migrations)} doesn't match "
+                        f"database_schema.sql: {'; '.join(drift)}")
+        return [migration.version for migration in pending]
+    finally:
+        connection.close()
+
+
+def downgrade(cfg, target, report=True):
+    """Undo the migrations above version target, newest first; returns versions undone"""
+    migrations = load_migrations()
+    connection = get_db_connection(cfg)
+    try:
+        if applied_versions(connection) is None:
+            raise MigrationError("The database is not versioned; run upgrade first")
+        with _migration_lock(connection, cfg) as renew:
+            applied = applied_versions(connection)
+            undo = [migration for migration in reversed(migrations)
+                    if migration.version in applied and migration.version > target]
+            for migration in undo:
+                if not hasattr(migration.module, 'downgrade'):
+                    raise MigrationError(f"Migration {migration.version:04d} can't be undone")
+            context = _context(connection, cfg, renew, report)
+            for migration in undo:
+                if report:
+                    print(f"⏬ {migration.version:04d} {migration.name}")
+                migration.module.downgrade(context)
+                connection.execute("DELETE FROM schema_version WHERE version = ?", (migration.version,))
+                connection.commit()
+        return [migration.version for migration in undo]
+    finally:
+        connection.close()
+
+
+def status(cfg):
+    """
+    {'version': current version (None if unversioned), 'pending':
+    [(version, name)], 'drift': differences from database_schema.sql
+    (None unless every migration is applied)}
+    """
+    migrations = load_migrations()
+    connection = get_db_connection(cfg)
+    try:
+        applied = applied_versions(connection) or {}
+        pending = [(migration.version, migration.name) for migration in migrations
+                   if migration.version not in applied]
+        drift = None if pending or not applied else schema_drift(connection)
+    finally:
+        connection.close()
+    return {
+        'version': max(applied) if applied else None,
+        'pending': pending,
+        'drift': drift,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Versioned schema migrations')
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('status', help='show the current version and pending migrations')
+    upgrade_parser = commands.add_parser('upgrade', help='apply pending migrations')
+    upgrade_parser.add_argument('--to', type=int, help='stop at this version')
+    downgrade_parser = commands.add_parser('downgrade', help='undo migrations')
+    downgrade_parser.add_argument('--to', type=int, required=True, help='version to go back to')
+    args = parser.parse_args(argv)
+
+    cfg = config['default']()
+    print(f"Database: {cfg.DB_PATH}")
+    try:
+        if args.command == 'upgrade':
+            applied = upgrade(cfg, args.to)
+            print(f"Applied {len(applied)} migration(s)")
+        elif args.command == 'downgrade':
+            undone = downgrade(cfg, args.to)
+            print(f"Undid {len(undone)} migration(s)")
+        else:
+            current = status(cfg)
+            version = current['version']
+            print(f"Version: {'unversioned' if version is None else version}")
+            for version, name in current['pending']:
+                print(f"  pending {version:04d} {name}")
+            for difference in current['drift'] or ():
+                print(f"  drift: {difference}")
+    except MigrationError as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
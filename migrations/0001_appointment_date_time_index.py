@@ -0,0 +1,13 @@
+"""
+idx_appointments_date covers (appointment_date, appointment_time), so
+date listings come out of the index already in time order. The
+one-column index of the same name is replaced in one transaction.
+"""
+
+
+def upgrade(m):
+    m.create_index('idx_appointments_date', 'appointments(appointment_date, appointment_time)')
+
+
+def downgrade(m):
+    m.create_index('idx_appointments_date', 'appointments(appointment_date)')
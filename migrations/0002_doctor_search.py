@@ -0,0 +1,95 @@
+"""
+Full-text doctor search: the doctors_fts index (external content over
+doctors) and the triggers keeping it in sync.
+
+Existing doctors are indexed in batches while the app runs. Until then the
+triggers only remove a row from the index if it is in it ('delete' of a
+row never indexed corrupts an external content index); once every doctor
+is indexed they are replaced by the plain ones.
+"""
+
+DOCTORS_FTS = """
+CREATE VIRTUAL TABLE doctors_fts USING fts5(
+    full_name,
+    specialization,
+    qualification,
+    bio,
+    content='doctors',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+)
+"""
+
+# While doctors are being indexed
+INDEXING_TRIGGERS = [
+    ('doctors_fts_ai', """
+CREATE TRIGGER doctors_fts_ai AFTER INSERT ON doctors BEGIN
+    INSERT INTO doctors_fts (rowid, full_name, specialization, qualification, bio)
+    VALUES (new.id, new.full_name, new.specialization, new.qualification, new.bio);
+END
+"""),
+    ('doctors_fts_ad', """
+CREATE TRIGGER doctors_fts_ad AFTER DELETE ON doctors
+WHEN EXISTS (SELECT 1 FROM doctors_fts_docsize WHERE id = old.id) BEGIN
+    INSERT INTO doctors_fts (doctors_fts, rowid, full_name, specialization, qualification, bio)
+    VALUES ('delete', old.id, old.full_name, old.specialization, old.qualification, old.bio);
+END
+"""),
+    ('doctors_fts_au', """
+CREATE TRIGGER doctors_fts_au AFTER UPDATE OF full_name, specialization, qualification, bio ON doctors BEGIN
+    INSERT INTO doctors_fts (doctors_fts, rowid, full_name, specialization, qualification, bio)
+    SELECT 'delete', old.id, old.full_name, old.specialization, old.qualification, old.bio
+    WHERE EXISTS (SELECT 1 FROM doctors_fts_docsize WHERE id = old.id);
+    INSERT INTO doctors_fts (rowid, full_name, specialization, qualification, bio)
+    VALUES (new.id, new.full_name, new.specialization, new.qualification, new.bio);
+END
+"""),
+]
+
+TRIGGERS = [
+    ('doctors_fts_ai', """
+CREATE TRIGGER doctors_fts_ai AFTER INSERT ON doctors BEGIN
+    INSERT INTO doctors_fts (rowid, full_name, specialization, qualification, bio)
+    VALUES (new.id, new.full_name, new.specialization, new.qualification, new.bio);
+END
+"""),
+    ('doctors_fts_ad', """
+CREATE TRIGGER doctors_fts_ad AFTER DELETE ON doctors BEGIN
+    INSERT INTO doctors_fts (doctors_fts, rowid, full_name, specialization, qualification, bio)
+    VALUES ('delete', old.id, old.full_name, old.specialization, old.qualification, old.bio);
+END
+"""),
+    ('doctors_fts_au', """
+CREATE TRIGGER doctors_fts_au AFTER UPDATE OF full_name, specialization, qualification, bio ON doctors BEGIN
+    INSERT INTO doctors_fts (doctors_fts, rowid, full_name, specialization, qualification, bio)
+    VALUES ('delete', old.id, old.full_name, old.specialization, old.qualification, old.bio);
+    INSERT INTO doctors_fts (rowid, full_name, specialization, qualification, bio)
+    VALUES (new.id, new.full_name, new.specialization, new.qualification, new.bio);
+END
+"""),
+]
+
+# Doctors in the range not indexed yet (by the triggers or an earlier run)
+INDEX_DOCTORS = """
+    INSERT INTO doctors_fts (rowid, full_name, specialization, qualification, bio)
+    SELECT id, full_name, specialization, qualification, bio FROM doctors
+    WHERE id >= :low AND id < :high
+      AND id NOT IN (SELECT id FROM doctors_fts_docsize WHERE id >= :low AND id < :high)
+"""
+
+
+def upgrade(m):
+    m.create_table('doctors_fts', DOCTORS_FTS)
+    for name, sql in INDEXING_TRIGGERS:
+        m.create_trigger(name, sql)
+    m.in_batches('doctors', [INDEX_DOCTORS], key='id', label='indexed doctors')
+    for name, sql in TRIGGERS:
+        m.create_trigger(name, sql)
+
+
+def downgrade(m):
+    # Derived from doctors: nothing is lost
+    for name, _ in TRIGGERS:
+        m.drop_trigger(name)
+    m.drop_table('doctors_fts')
@@ -0,0 +1,81 @@
+"""
+doctor_schedule_versions: a version per doctor, bumped by triggers on
+time_slots and appointments whenever the doctor's availability can change
+(the ETag of the availability API). Existing doctors start at version 1.
+"""
+
+SCHEDULE_VERSIONS = """
+CREATE TABLE doctor_schedule_versions (
+    doctor_id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (doctor_id) REFERENCES doctors(id) ON DELETE CASCADE
+)
+"""
+
+TRIGGERS = [
+    ('time_slots_version_ai', """
+CREATE TRIGGER time_slots_version_ai AFTER INSERT ON time_slots BEGIN
+    INSERT INTO doctor_schedule_versions (doctor_id, version) VALUES (new.doctor_id, 1)
+    ON CONFLICT (doctor_id) DO UPDATE SET version = version + 1;
+END
+"""),
+    # Skipped when the doctor itself is being deleted (cascade)
+    ('time_slots_version_ad', """
+CREATE TRIGGER time_slots_version_ad AFTER DELETE ON time_slots
+WHEN EXISTS (SELECT 1 FROM doctors WHERE id = old.doctor_id) BEGIN
+    INSERT INTO doctor_schedule_versions (doctor_id, version) VALUES (old.doctor_id, 1)
+    ON CONFLICT (doctor_id) DO UPDATE SET version = version + 1;
+END
+"""),
+    ('time_slots_version_au', """
+CREATE TRIGGER time_slots_version_au AFTER UPDATE ON time_slots BEGIN
+    INSERT INTO doctor_schedule_versions (doctor_id, version) VALUES (old.doctor_id, 1)
+    ON CONFLICT (doctor_id) DO UPDATE SET version = version + 1;
+    INSERT INTO doctor_schedule_versions (doctor_id, version) VALUES (new.doctor_id, 1)
+    ON CONFLICT (doctor_id) DO UPDATE SET version = version + 1;
+END
+"""),
+    ('appointments_version_ai', """
+CREATE TRIGGER appointments_version_ai AFTER INSERT ON appointments BEGIN
+    INSERT INTO doctor_schedule_versions (doctor_id, version) VALUES (new.doctor_id, 1)
+    ON CONFLICT (doctor_id) DO UPDATE SET version = version + 1;
+END
+"""),
+    ('appointments_version_ad', """
+CREATE TRIGGER appointments_version_ad AFTER DELETE ON appointments
+WHEN EXISTS (SELECT 1 FROM doctors WHERE id = old.doctor_id) BEGIN
+    INSERT INTO doctor_schedule_versions (doctor_id, version) VALUES (old.doctor_id, 1)
+    ON CONFLICT (doctor_id) DO UPDATE SET version = version + 1;
+END
+"""),
+    ('appointments_version_au', """
+CREATE TRIGGER appointments_version_au
+AFTER UPDATE OF doctor_id, appointment_date, appointment_time, duration, status ON appointments BEGIN
+    INSERT INTO doctor_schedule_versions (doctor_id, version) VALUES (old.doctor_id, 1)
+    ON CONFLICT (doctor_id) DO UPDATE SET version = version + 1;
+    INSERT INTO doctor_schedule_versions (doctor_id, version) VALUES (new.doctor_id, 1)
+    ON CONFLICT (doctor_id) DO UPDATE SET version = version + 1;
+END
+"""),
+]
+
+# Doctors the triggers haven't given a version yet
+START_VERSIONS = """
+    INSERT INTO doctor_schedule_versions (doctor_id, version)
+    SELECT id, 1 FROM doctors WHERE id >= :low AND id < :high
+    ON CONFLICT (doctor_id) DO NOTHING
+"""
+
+
+def upgrade(m):
+    m.create_table('doctor_schedule_versions', SCHEDULE_VERSIONS)
+    for name, sql in TRIGGERS:
+        m.create_trigger(name, sql)
+    m.in_batches('doctors', [START_VERSIONS], key='id', label='schedule versions')
+
+
+def downgrade(m):
+    # Versions only need to change, not to last: nothing is lost
+    for name, _ in TRIGGERS:
+        m.drop_trigger(name)
+    m.drop_table('doctor_schedule_versions')
@@ -0,0 +1,27 @@
+"""
+email_outbox: emails queued in the request's transaction and sent by
+email_dispatcher.py. No downgrade: the table holds unsent email.
+"""
+
+EMAIL_OUTBOX = """
+CREATE TABLE email_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    to_email TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    html_content TEXT NOT NULL,
+    text_content TEXT NOT NULL,
+    status TEXT DEFAULT 'pending' CHECK (status IN ('pending', 'sending', 'sent', 'dead')),
+    attempts INTEGER DEFAULT 0,
+    next_attempt_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    claimed_by TEXT,
+    claimed_at DATETIME,
+    last_error TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    sent_at DATETIME
+)
+"""
+
+
+def upgrade(m):
+    m.create_table('email_outbox', EMAIL_OUTBOX)
+    m.create_index('idx_email_outbox_due', 'email_outbox(status, next_attempt_at)')
@@ -0,0 +1,20 @@
+"""
+appointment_reminders: one row per appointment and reminder type, so a
+reminder is sent once. No downgrade: dropping it would send every
+reminder again.
+"""
+
+APPOINTMENT_REMINDERS = """
+CREATE TABLE appointment_reminders (
+    appointment_id INTEGER NOT NULL,
+    reminder_type TEXT NOT NULL,
+    claimed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    sent_at DATETIME,
+    PRIMARY KEY (appointment_id, reminder_type),
+    FOREIGN KEY (appointment_id) REFERENCES appointments(id) ON DELETE CASCADE
+)
+"""
+
+
+def upgrade(m):
+    m.create_table('appointment_reminders', APPOINTMENT_REMINDERS)
@@ -0,0 +1,65 @@
+"""
+notification_counters: each user's unread total, kept by triggers on
+notifications. The triggers go in first; then each range of users is
+recounted from notifications in one transaction, which overwrites
+whatever the triggers counted for them before.
+"""
+
+NOTIFICATION_COUNTERS = """
+CREATE TABLE notification_counters (
+    user_id INTEGER PRIMARY KEY,
+    unread INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+)
+"""
+
+TRIGGERS = [
+    ('notifications_unread_ai', """
+CREATE TRIGGER notifications_unread_ai AFTER INSERT ON notifications
+WHEN new.is_read = 0 BEGIN
+    INSERT INTO notification_counters (user_id, unread) VALUES (new.user_id, 1)
+    ON CONFLICT (user_id) DO UPDATE SET unread = unread + 1;
+END
+"""),
+    ('notifications_unread_ad', """
+CREATE TRIGGER notifications_unread_ad AFTER DELETE ON notifications
+WHEN old.is_read = 0 BEGIN
+    UPDATE notification_counters SET unread = unread - 1 WHERE user_id = old.user_id;
+END
+"""),
+    ('notifications_unread_au', """
+CREATE TRIGGER notifications_unread_au AFTER UPDATE OF user_id, is_read ON notifications
+WHEN (old.is_read = 0) != (new.is_read = 0) OR old.user_id != new.user_id BEGIN
+    UPDATE notification_counters SET unread = unread - 1
+    WHERE user_id = old.user_id AND old.is_read = 0;
+    INSERT INTO notification_counters (user_id, unread)
+    SELECT new.user_id, 1 WHERE new.is_read = 0
+    ON CONFLICT (user_id) DO UPDATE SET unread = unread + 1;
+END
+"""),
+]
+
+# Same as Notification.rebuild_unread_counts(), for one range of users
+RECOUNT = [
+    "DELETE FROM notification_counters WHERE user_id >= :low AND user_id < :high",
+    """
+    INSERT INTO notification_counters (user_id, unread)
+    SELECT user_id, COUNT(*) FROM notifications
+    WHERE is_read = 0 AND user_id >= :low AND user_id < :high
+    GROUP BY user_id
+    """,
+]
+
+
+def upgrade(m):
+    m.create_table('notification_counters', NOTIFICATION_COUNTERS)
+    for name, sql in TRIGGERS:
+        m.create_trigger(name, sql)
+    m.in_batches('users', RECOUNT, key='id', label='unread counters')
+
+
+def downgrade(m):
+    # Derived from notifications: nothing is lost
+    for name, _ in TRIGGERS:
+        m.drop_trigger(name)
+    m.drop_table('notification_counters')
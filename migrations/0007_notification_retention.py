@@ -0,0 +1,25 @@
+"""
+notifications_archive, where retention.py moves read notifications past
+their TTL, and notification indexes for both orderings of
+Notification.get_by_user: idx_notifications_user_read gains created_at
+(replaced in one transaction). No downgrade: the archive holds data.
+"""
+
+NOTIFICATIONS_ARCHIVE = """
+CREATE TABLE notifications_archive (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    title TEXT NOT NULL,
+    message TEXT NOT NULL,
+    created_at DATETIME NOT NULL,
+    archived_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+)
+"""
+
+
+def upgrade(m):
+    m.create_table('notifications_archive', NOTIFICATIONS_ARCHIVE)
+    m.create_index('idx_notifications_user_created', 'notifications(user_id, created_at)')
+    m.create_index('idx_notifications_user_read', 'notifications(user_id, is_read, created_at)')
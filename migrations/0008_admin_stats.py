@@ -0,0 +1,139 @@
+"""
+admin_stats / appointment_stats: the admin dashboard's totals and
+per-day appointment counts, kept by triggers (AdminStats). The triggers
+go in first; then appointment_stats is recounted a range of doctors per
+transaction and admin_stats in one, each recount overwriting what the
+triggers counted before it.
+"""
+
+ADMIN_STATS = """
+CREATE TABLE admin_stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID
+"""
+
+APPOINTMENT_STATS = """
+CREATE TABLE appointment_stats (
+    day DATE NOT NULL,
+    doctor_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, doctor_id, status)
+) WITHOUT ROWID
+"""
+
+TRIGGERS = [
+    ('users_stats_ai', """
+CREATE TRIGGER users_stats_ai AFTER INSERT ON users
+WHEN new.role IN ('doctor', 'patient') BEGIN
+    INSERT INTO admin_stats (name, value) VALUES (new.role || 's', 1)
+    ON CONFLICT (name) DO UPDATE SET value = value + 1;
+END
+"""),
+    ('users_stats_ad', """
+CREATE TRIGGER users_stats_ad AFTER DELETE ON users
+WHEN old.role IN ('doctor', 'patient') BEGIN
+    UPDATE admin_stats SET value = value - 1 WHERE name = old.role || 's';
+END
+"""),
+    ('doctors_stats_ai', """
+CREATE TRIGGER doctors_stats_ai AFTER INSERT ON doctors BEGIN
+    INSERT INTO admin_stats (name, value)
+    VALUES (CASE WHEN new.is_verified = 1 THEN 'verified_doctors' ELSE 'pending_doctors' END, 1)
+    ON CONFLICT (name) DO UPDATE SET value = value + 1;
+END
+"""),
+    ('doctors_stats_ad', """
+CREATE TRIGGER doctors_stats_ad AFTER DELETE ON doctors BEGIN
+    UPDATE admin_stats SET value = value - 1
+    WHERE name = CASE WHEN old.is_verified = 1 THEN 'verified_doctors' ELSE 'pending_doctors' END;
+END
+"""),
+    ('doctors_stats_au', """
+CREATE TRIGGER doctors_stats_au AFTER UPDATE OF is_verified ON doctors
+WHEN (old.is_verified IS 1) != (new.is_verified IS 1) BEGIN
+    UPDATE admin_stats SET value = value - 1
+    WHERE name = CASE WHEN old.is_verified = 1 THEN 'verified_doctors' ELSE 'pending_doctors' END;
+    INSERT INTO admin_stats (name, value)
+    VALUES (CASE WHEN new.is_verified = 1 THEN 'verified_doctors' ELSE 'pending_doctors' END, 1)
+    ON CONFLICT (name) DO UPDATE SET value = value + 1;
+END
+"""),
+    ('appointments_stats_ai', """
+CREATE TRIGGER appointments_stats_ai AFTER INSERT ON appointments BEGIN
+    INSERT INTO admin_stats (name, value) VALUES ('appointments', 1)
+    ON CONFLICT (name) DO UPDATE SET value = value + 1;
+    INSERT INTO appointment_stats (day, doctor_id, status, count)
+    VALUES (new.appointment_date, new.doctor_id, new.status, 1)
+    ON CONFLICT (day, doctor_id, status) DO UPDATE SET count = count + 1;
+END
+"""),
+    ('appointments_stats_ad', """
+CREATE TRIGGER appointments_stats_ad AFTER DELETE ON appointments BEGIN
+    UPDATE admin_stats SET value = value - 1 WHERE name = 'appointments';
+    UPDATE appointment_stats SET count = count - 1
+    WHERE day = old.appointment_date AND doctor_id = old.doctor_id AND status = old.status;
+END
+"""),
+    ('appointments_stats_au', """
+CREATE TRIGGER appointments_stats_au AFTER UPDATE OF appointment_date, doctor_id, status ON appointments
+WHEN old.appointment_date IS NOT new.appointment_date OR old.doctor_id IS NOT new.doctor_id
+  OR old.status IS NOT new.status BEGIN
+    UPDATE appointment_stats SET count = count - 1
+    WHERE day = old.appointment_date AND doctor_id = old.doctor_id AND status = old.status;
+    INSERT INTO appointment_stats (day, doctor_id, status, count)
+    VALUES (new.appointment_date, new.doctor_id, new.status, 1)
+    ON CONFLICT (day, doctor_id, status) DO UPDATE SET count = count + 1;
+END
+"""),
+]
+
+# Same as AdminStats.rebuild(), appointment_stats for one range of doctors
+# (read through the UNIQUE (doctor_id, appointment_date, ...) index)
+RECOUNT_APPOINTMENTS = [
+    "DELETE FROM appointment_stats WHERE doctor_id >= :low AND doctor_id < :high",
+    """
+    INSERT INTO appointment_stats (day, doctor_id, status, count)
+    SELECT appointment_date, doctor_id, status, COUNT(*)
+    FROM appointments
+    WHERE doctor_id >= :low AND doctor_id < :high
+    GROUP BY appointment_date, doctor_id, status
+    """,
+]
+
+RECOUNT_TOTALS = [
+    "DELETE FROM admin_stats",
+    """
+    INSERT INTO admin_stats (name, value)
+    SELECT 'doctors', COUNT(*) FROM users WHERE role = 'doctor'
+    UNION ALL SELECT 'patients', COUNT(*) FROM users WHERE role = 'patient'
+    UNION ALL SELECT 'appointments', COUNT(*) FROM appointments
+    UNION ALL SELECT 'verified_doctors', COUNT(*) FROM doctors WHERE is_verified = 1
+    UNION ALL SELECT 'pending_doctors', COUNT(*) FROM doctors WHERE COALESCE(is_verified, 0) != 1
+    """,
+]
+
+# Doctors per appointment_stats recount: each range deletes by scanning
+# appointment_stats (keyed by day first), so keep the number of ranges low
+DOCTORS_PER_BATCH = 50
+
+
+def upgrade(m):
+    m.create_table('admin_stats', ADMIN_STATS)
+    m.create_table('appointment_stats', APPOINTMENT_STATS)
+    for name, sql in TRIGGERS:
+        m.create_trigger(name, sql)
+    m.create_index('idx_appointments_created', 'appointments(created_at)')
+    m.in_batches('doctors', RECOUNT_APPOINTMENTS, key='id', size=DOCTORS_PER_BATCH,
+                 label='appointment_stats')
+    m.execute_all(RECOUNT_TOTALS, label='recounted admin_stats')
+
+
+def downgrade(m):
+    # Derived from users, doctors and appointments: nothing is lost
+    for name, _ in TRIGGERS:
+        m.drop_trigger(name)
+    m.drop_index('idx_appointments_created')
+    m.drop_table('appointment_stats')
+    m.drop_table('admin_stats')
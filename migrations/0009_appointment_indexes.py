@@ -0,0 +1,45 @@
+"""
+Composite appointment indexes matching the model queries, indexes on the
+child side of ON DELETE CASCADE, and no copies of the indexes UNIQUE
+constraints already provide. New indexes are built before the ones they
+replace are dropped, so queries always have one to use.
+"""
+
+# (name, columns) of the indexes this migration adds
+INDEXES_ADDED = [
+    ('idx_appointments_patient_date',
+     'appointments(patient_id, appointment_date, appointment_time, status)'),
+    ('idx_appointments_doctor_status',
+     'appointments(doctor_id, status, appointment_date, appointment_time)'),
+    ('idx_appointments_status_date', 'appointments(status, appointment_date, appointment_time)'),
+    ('idx_reviews_doctor', 'reviews(doctor_id)'),
+    ('idx_reviews_patient', 'reviews(patient_id)'),
+    ('idx_notifications_archive_user', 'notifications_archive(user_id)'),
+]
+
+# (name, previous columns) of the indexes it drops
+INDEXES_DROPPED = [
+    # UNIQUE (email) / UNIQUE (user_id) already index these
+    ('idx_users_email', 'users(email)'),
+    ('idx_patients_user', 'patients(user_id)'),
+    # Leading columns of idx_appointments_patient_date, of the UNIQUE
+    # (doctor_id, appointment_date, appointment_time) index and of
+    # idx_appointments_status_date
+    ('idx_appointments_patient', 'appointments(patient_id)'),
+    ('idx_appointments_doctor', 'appointments(doctor_id)'),
+    ('idx_appointments_status', 'appointments(status)'),
+]
+
+
+def upgrade(m):
+    for name, on in INDEXES_ADDED:
+        m.create_index(name, on)
+    for name, _ in INDEXES_DROPPED:
+        m.drop_index(name)
+
+
+def downgrade(m):
+    for name, on in INDEXES_DROPPED:
+        m.create_index(name, on)
+    for name, _ in INDEXES_ADDED:
+        m.drop_index(name)
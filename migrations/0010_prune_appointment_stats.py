@@ -0,0 +1,68 @@
+"""
+appointment_stats rows whose count reaches 0 are deleted instead of kept
+(the 0008 triggers left one behind for every day, doctor and status an
+appointment ever moved out of). The triggers are replaced first, so the
+cleanup afterwards is the last time zero rows need removing.
+"""
+
+TRIGGERS = [
+    ('appointments_stats_ad', """
+CREATE TRIGGER appointments_stats_ad AFTER DELETE ON appointments BEGIN
+    UPDATE admin_stats SET value = value - 1 WHERE name = 'appointments';
+    UPDATE appointment_stats SET count = count - 1
+    WHERE day = old.appointment_date AND doctor_id = old.doctor_id AND status = old.status;
+    DELETE FROM appointment_stats
+    WHERE day = old.appointment_date AND doctor_id = old.doctor_id AND status = old.status
+      AND count <= 0;
+END
+"""),
+    ('appointments_stats_au', """
+CREATE TRIGGER appointments_stats_au AFTER UPDATE OF appointment_date, doctor_id, status ON appointments
+WHEN old.appointment_date IS NOT new.appointment_date OR old.doctor_id IS NOT new.doctor_id
+  OR old.status IS NOT new.status BEGIN
+    UPDATE appointment_stats SET count = count - 1
+    WHERE day = old.appointment_date AND doctor_id = old.doctor_id AND status = old.status;
+    DELETE FROM appointment_stats
+    WHERE day = old.appointment_date AND doctor_id = old.doctor_id AND status = old.status
+      AND count <= 0;
+    INSERT INTO appointment_stats (day, doctor_id, status, count)
+    VALUES (new.appointment_date, new.doctor_id, new.status, 1)
+    ON CONFLICT (day, doctor_id, status) DO UPDATE SET count = count + 1;
+END
+"""),
+]
+
+# The 0008 versions, for downgrade
+PREVIOUS_TRIGGERS = [
+    ('appointments_stats_ad', """
+CREATE TRIGGER appointments_stats_ad AFTER DELETE ON appointments BEGIN
+    UPDATE admin_stats SET value = value - 1 WHERE name = 'appointments';
+    UPDATE appointment_stats SET count = count - 1
+    WHERE day = old.appointment_date AND doctor_id = old.doctor_id AND status = old.status;
+END
+"""),
+    ('appointments_stats_au', """
+CREATE TRIGGER appointments_stats_au AFTER UPDATE OF appointment_date, doctor_id, status ON appointments
+WHEN old.appointment_date IS NOT new.appointment_date OR old.doctor_id IS NOT new.doctor_id
+  OR old.status IS NOT new.status BEGIN
+    UPDATE appointment_stats SET count = count - 1
+    WHERE day = old.appointment_date AND doctor_id = old.doctor_id AND status = old.status;
+    INSERT INTO appointment_stats (day, doctor_id, status, count)
+    VALUES (new.appointment_date, new.doctor_id, new.status, 1)
+    ON CONFLICT (day, doctor_id, status) DO UPDATE SET count = count + 1;
+END
+"""),
+]
+
+
+def upgrade(m):
+    for name, sql in TRIGGERS:
+        m.create_trigger(name, sql)
+    # One pass over appointment_stats (a doctor range would scan it anyway)
+    m.execute("DELETE FROM appointment_stats WHERE count <= 0")
+
+
+def downgrade(m):
+    # Zero rows are not restored: the dashboard skips them either way
+    for name, sql in PREVIOUS_TRIGGERS:
+        m.create_trigger(name, sql)
@@ -0,0 +1,31 @@
+"""
+Schema migrations, applied in order by migrate.py
+
+Each change to the schema of a deployed database is a module here named
+NNNN_short_description.py, numbered one past the last, with:
+
+    def upgrade(m):
+        m.add_column('appointments', 'checked_in_at', 'DATETIME')
+        m.backfill('appointments', "checked_in_at = updated_at",
+                   where="status = 'completed' AND checked_in_at IS NULL")
+        m.create_index('idx_appointments_checked_in', 'appointments(checked_in_at)')
+
+    def downgrade(m):          # optional
+        m.drop_index('idx_appointments_checked_in')
+
+m is a migrate.MigrationContext. Its steps commit one by one and skip
+work already done, so the app keeps serving during a migration and an
+interrupted one can be run again. Migrations run against a live database:
+add first (nullable columns, new indexes, backfills) and remove what the
+old code still reads only in a later migration, once that code is gone.
+
+A table kept by triggers (a counter, a summary, a search index) gets
+m.create_table() and m.create_trigger() first, then m.in_batches() to
+recount each range of keys in one transaction, so rows written meanwhile
+are counted once either way (see 0006_notification_counters.py).
+
+Apply the same change to database_schema.sql: new databases are created
+from it and stamped at the latest version, and upgrade() fails if a
+migrated database doesn't match it. baseline.sql is version 0, the schema
+before migrations; it never changes.
+"""
@@ -2,7 +2,262 @@
 Data models for the application
 Provides clean interface for database operations
 """
+import base64
+import binascii
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
 from datetime import datetime, date, time, timedelta
+from operator import itemgetter
+from time import monotonic
+
+
+# ============================================
+# TYPE DECODING
+# ============================================
+# Columns declared DATE, TIME or DATETIME come back from sqlite3 as native
+# objects (connections are opened with PARSE_DECLTYPES), so callers never
+# have to strptime row values themselves. The fromisoformat parsers are
+# implemented in C and accept the formats SQLite writes.
+
+def _decoder(parse):
+    """Wrap a fromisoformat parser so malformed legacy values pass through"""
+    def convert(value):
+        text = value.decode()
+        try:
+            return parse(text)
+        except ValueError:
+            return text
+    return convert
+
+
+def register_sqlite_types():
+    """Register sqlite3 adapters and converters for date/time columns"""
+    sqlite3.register_adapter(date, date.isoformat)
+    sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+    sqlite3.register_adapter(time, time.isoformat)
+
+    sqlite3.register_converter('DATE', _decoder(date.fromisoformat))
+    sqlite3.register_converter('TIME', _decoder(time.fromisoformat))
+    sqlite3.register_converter('DATETIME', _decoder(datetime.fromisoformat))
+    sqlite3.register_converter('TIMESTAMP', _decoder(datetime.fromisoformat))
+
+
+register_sqlite_types()
+
+
+# ============================================
+# RECORD TYPES
+# ============================================
+# Query results are returned as immutable tuple subclasses instead of
+# sqlite3.Row / dict copies. A record stores only its values; column names
+# live once on the (cached) class, so a listing of N rows costs N tuples.
+
+class Record(tuple):
+    """Immutable query result with attribute and key access"""
+    __slots__ = ()
+    _fields = ()
+    _index = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                key = self._index[key]
+            except KeyError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    def keys(self):
+        """Column names, so dict(record) works like dict(sqlite3.Row)"""
+        return list(self._index)
+
+    def get(self, key, default=None):
+        """Get a column value by name"""
+        index = self._index.get(key)
+        return default if index is None else tuple.__getitem__(self, index)
+
+    def _asdict(self):
+        return {name: tuple.__getitem__(self, index)
+                for name, index in self._index.items()}
+
+    def __repr__(self):
+        values = ', '.join(f"{name}={value!r}"
+                           for name, value in self._asdict().items())
+        return f"{type(self).__name__}({values})"
+
+
+_record_types = {}
+
+
+def record_type(model, fields):
+    """Get (or build and cache) the record class for a model's column set"""
+    fields = tuple(fields)
+    key = (model, fields)
+    cls = _record_types.get(key)
+    if cls is None:
+        index = {}
+        for position, name in enumerate(fields):
+            # Joined queries can repeat a column (d.*, u.id as user_id);
+            # like sqlite3.Row, the first occurrence wins.
+            index.setdefault(name, position)
+        namespace = {'__slots__': (), '_fields': fields, '_index': index}
+        for name, position in index.items():
+            if name.isidentifier() and not hasattr(Record, name):
+                namespace[name] = property(itemgetter(position))
+        cls = type(f"{model}Record", (Record,), namespace)
+        _record_types[key] = cls
+    return cls
+
+
+def fetchone_record(cursor, model):
+    """Fetch the next row of the last query as a record (or None)"""
+    factory = cursor.row_factory
+    cursor.row_factory = None
+    try:
+        row = cursor.fetchone()
+    finally:
+        cursor.row_factory = factory
+    if row is None:
+        return None
+    cls = record_type(model, [d[0] for d in cursor.description])
+    return tuple.__new__(cls, row)
+
+
+def fetchall_records(cursor, model):
+    """Fetch the remaining rows of the last query as records"""
+    if cursor.description is None:
+        return []
+    cls = record_type(model, [d[0] for d in cursor.description])
+    new = tuple.__new__
+    # Plain tuples from the cursor are wrapped one at a time, so the raw
+    # row and its record never both exist for the whole result set
+    factory = cursor.row_factory
+    cursor.row_factory = None
+    try:
+        return [new(cls, row) for row in cursor]
+    finally:
+        cursor.row_factory = factory
+
+
+def fetch_chunks(cursor, size=1000):
+    """
+    Yield the remaining rows of the last query in lists of up to size
+    plain tuples, so arbitrarily large results are read in constant memory
+    """
+    factory = cursor.row_factory
+    cursor.row_factory = None
+    try:
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                return
+            yield rows
+    finally:
+        cursor.row_factory = factory
+
+
+# ============================================
+# KEYSET PAGINATION
+# ============================================
+# Appointment lists are paged on (appointment_date, appointment_time, id)
+# instead of LIMIT/OFFSET, so page N costs the same as page 1: each query
+# seeks straight to the cursor position in the index and reads one page.
+
+class Page:
+    """One page of keyset-paginated records"""
+    __slots__ = ('items', 'next_cursor', 'prev_cursor')
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def encode_cursor(record):
+    """Opaque URL-safe cursor for an appointment's sort key"""
+    appt_date = record['appointment_date']
+    appt_time = record['appointment_time']
+    if isinstance(appt_date, (date, datetime)):
+        appt_date = appt_date.strftime('%Y-%m-%d')
+    if isinstance(appt_time, time):
+        appt_time = appt_time.strftime('%H:%M:%S')
+    raw = f"{appt_date}|{appt_time}|{record['id']}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a cursor back to (date, time, id); None if missing or invalid"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        appt_date, appt_time, appt_id = raw.split('|')
+        date.fromisoformat(appt_date)
+        time.fromisoformat(appt_time)
+        return appt_date, appt_time, int(appt_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        return None
+
+
+def keyset_page(cursor, query, params, per_page, descending=False,
+                after=None, before=None, model='Appointment'):
+    """
+    Run an appointment query one page at a time
+    query must select from appointments aliased as 'a' and end in a WHERE
+    clause (use WHERE 1 = 1 when there is no filter); ORDER BY and LIMIT
+    are added here. after/before are cursors from a previous Page.
+    """
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before) if after_key is None else None
+    params = list(params)
+
+    # Walking backwards means reading the index in the opposite direction
+    backwards = before_key is not None
+    key = before_key if backwards else after_key
+    read_descending = descending != backwards
+
+    if key is not None:
+        op = '<' if read_descending else '>'
+        query += f" AND (a.appointment_date, a.appointment_time, a.id) {op} (?, ?, ?)"
+        params.extend(key)
+
+    direction = 'DESC' if read_descending else 'ASC'
+    query += (f" ORDER BY a.appointment_date {direction},"
+              f" a.appointment_time {direction}, a.id {direction} LIMIT ?")
+    params.append(per_page + 1)
+
+    cursor.execute(query, params)
+    items = fetchall_records(cursor, model)
+    has_more = len(items) > per_page
+    items = items[:per_page]
+    if backwards:
+        items.reverse()
+
+    if not items:
+        return Page(items)
+
+    if backwards:
+        next_cursor = encode_cursor(items[-1])
+        prev_cursor = encode_cursor(items[0]) if has_more else None
+    else:
+        next_cursor = encode_cursor(items[-1]) if has_more else None
+        prev_cursor = encode_cursor(items[0]) if key is not None else None
+    return Page(items, next_cursor, prev_cursor)
 
 
 class User:
@@ -38,6 +293,34 @@ class User:
         query = "UPDATE users SET password = ? WHERE id = ?"
         cursor.execute(query, (new_password_hash, user_id))
 
+    @staticmethod
+    def delete(cursor, user_id):
+        """Delete a user; their profile, appointments and notifications cascade"""
+        cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
+        Notification._invalidate_unread(cursor, [user_id])
+        return cursor.rowcount
+
+    @staticmethod
+    def get_recipients(cursor, roles, after_id=0, limit=1000):
+        """
+        Get active users with the given roles, with their display names
+        Keyset-paged by user id: pass the last id seen as after_id.
+        """
+        roles = list(roles)
+        placeholders = ','.join('?' * len(roles))
+        query = f"""
+            SELECT u.id, u.email, u.role,
+                   COALESCE(p.full_name, d.full_name, u.email) AS name
+            FROM users u
+            LEFT JOIN patients p ON p.user_id = u.id
+            LEFT JOIN doctors d ON d.user_id = u.id
+            WHERE u.role IN ({placeholders}) AND u.is_active = 1 AND u.id > ?
+            ORDER BY u.id
+            LIMIT ?
+        """
+        cursor.execute(query, roles + [after_id, limit])
+        return cursor.fetchall()
+
 
 class Doctor:
     """Doctor model"""
@@ -65,7 +348,7 @@ class Doctor:
         """Get doctor by user ID"""
         query = "SELECT * FROM doctors WHERE user_id = ?"
         cursor.execute(query, (user_id,))
-        return cursor.fetchone()
+        return fetchone_record(cursor, 'Doctor')
 
     @staticmethod
     def get_by_id(cursor, doctor_id):
@@ -77,7 +360,7 @@ class Doctor:
             WHERE d.id = ?
         """
         cursor.execute(query, (doctor_id,))
-        return cursor.fetchone()
+        return fetchone_record(cursor, 'Doctor')
 
     @staticmethod
     def get_all_verified(cursor, limit=None, offset=0):
@@ -89,14 +372,60 @@ class Doctor:
             WHERE d.is_verified = 1 AND u.is_active = 1
             ORDER BY d.full_name
         """
+        params = []
         if limit:
-            query += f" LIMIT {limit} OFFSET {offset}"
-        cursor.execute(query)
-        return cursor.fetchall()
+            query += " LIMIT ? OFFSET ?"
+            params.extend([int(limit), int(offset)])
+        cursor.execute(query, params)
+        return fetchall_records(cursor, 'Doctor')
+
+    @staticmethod
+    def select_for_export(cursor, status=None):
+        """
+        Run the admin export query for doctors (status: verified or pending,
+        as in the admin list); read the rows with fetch_chunks()
+        """
+        query = """
+            SELECT d.id, d.full_name, u.email, d.specialization, d.qualification,
+                   d.registration_number, d.phone, d.experience_years,
+                   d.consultation_fee, d.is_verified, u.is_active, u.created_at
+            FROM doctors d
+            JOIN users u ON d.user_id = u.id
+        """
+        if status == 'verified':
+            query += " WHERE d.is_verified = 1 AND u.is_active = 1"
+        elif status == 'pending':
+            query += " WHERE d.is_verified = 0"
+        # Primary-key order streams straight off the table, with no sort
+        cursor.execute(query + " ORDER BY d.id")
+
+    # bm25 column weights: name, specialization, qualification, bio
+    SEARCH_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+    SEARCH_MAX_TERMS = 8
 
     @staticmethod
-    def search(cursor, search_term=None, specialization=None):
-        """Search doctors"""
+    def build_match_query(search_term):
+        """
+        Turn free text into an FTS5 MATCH expression
+        Every word becomes a quoted prefix term, so user input can never
+        inject FTS syntax and partial words ("cardi") still match.
+        """
+        words = re.findall(r'\w+', search_term or '')[:Doctor.SEARCH_MAX_TERMS]
+        return ' '.join(f'"{word}"*' for word in words)
+
+    @staticmethod
+    def search(cursor, search_term=None, specialization=None, limit=None):
+        """Search doctors, ranked by relevance when a search term is given"""
+        match = Doctor.build_match_query(search_term)
+        if match:
+            try:
+                return Doctor._search_fts(cursor, match, specialization, limit)
+            except sqlite3.OperationalError as e:
+                # Only a database created before the search index existed
+                # falls back to LIKE; bad MATCH input or a corrupt index raises
+                if 'no such table: doctors_fts' not in str(e):
+                    raise
+
         query = """
             SELECT d.*, u.email, u.id as user_id
             FROM doctors d
@@ -114,8 +443,54 @@ class Doctor:
             params.append(specialization)
 
         query += " ORDER BY d.full_name"
+
+        if limit:
+            query += " LIMIT ?"
+            params.append(int(limit))
+
         cursor.execute(query, params)
-        return cursor.fetchall()
+        return fetchall_records(cursor, 'Doctor')
+
+    @staticmethod
+    def _search_fts(cursor, match, specialization=None, limit=None):
+        """Full-text search over doctors_fts ordered by bm25 rank"""
+        query = """
+            SELECT d.*, u.email, u.id as user_id
+            FROM doctors_fts
+            JOIN doctors d ON d.id = doctors_fts.rowid
+            JOIN users u ON d.user_id = u.id
+            WHERE doctors_fts MATCH ?
+            AND d.is_verified = 1 AND u.is_active = 1
+        """
+        params = [match]
+
+        if specialization:
+            query += " AND d.specialization = ?"
+            params.append(specialization)
+
+        query += " ORDER BY bm25(doctors_fts, ?, ?, ?, ?), d.full_name"
+        params.extend(Doctor.SEARCH_WEIGHTS)
+
+        if limit:
+            query += " LIMIT ?"
+            params.append(int(limit))
+
+        cursor.execute(query, params)
+        return fetchall_records(cursor, 'Doctor')
+
+    @staticmethod
+    def rebuild_search_index(cursor):
+        """Rebuild doctors_fts from the doctors table"""
+        cursor.execute("INSERT INTO doctors_fts (doctors_fts) VALUES ('rebuild')")
+
+    @staticmethod
+    def get_schedule_version(cursor, doctor_id):
+        """Get the counter bumped by time slot and appointment changes"""
+        cursor.execute(
+            "SELECT version FROM doctor_schedule_versions WHERE doctor_id = ?",
+            (doctor_id,))
+        row = cursor.fetchone()
+        return row[0] if row else 0
 
     @staticmethod
     def update(cursor, doctor_id, **kwargs):
@@ -163,7 +538,7 @@ class Patient:
         """Get patient by user ID"""
         query = "SELECT * FROM patients WHERE user_id = ?"
         cursor.execute(query, (user_id,))
-        return cursor.fetchone()
+        return fetchone_record(cursor, 'Patient')
 
     @staticmethod
     def get_by_id(cursor, patient_id):
@@ -175,7 +550,7 @@ class Patient:
             WHERE p.id = ?
         """
         cursor.execute(query, (patient_id,))
-        return cursor.fetchone()
+        return fetchone_record(cursor, 'Patient')
 
     @staticmethod
     def update(cursor, patient_id, **kwargs):
@@ -193,6 +568,17 @@ class Patient:
             query = f"UPDATE patients SET {', '.join(fields)} WHERE id = ?"
             cursor.execute(query, values)
 
+    @staticmethod
+    def select_for_export(cursor):
+        """Run the admin export query for patients; read the rows with fetch_chunks()"""
+        cursor.execute("""
+            SELECT p.id, p.full_name, u.email, p.phone, p.blood_group, p.gender,
+                   p.date_of_birth, u.is_active, u.created_at
+            FROM patients p
+            JOIN users u ON p.user_id = u.id
+            ORDER BY p.id
+        """)
+
 
 class TimeSlot:
     """Time slot model for doctor availability"""
@@ -236,7 +622,7 @@ class TimeSlot:
                      start_time
         """
         cursor.execute(query, (doctor_id,))
-        return cursor.fetchall()
+        return fetchall_records(cursor, 'TimeSlot')
 
     @staticmethod
     def get_by_doctor_and_day(cursor, doctor_id, day_of_week):
@@ -247,7 +633,22 @@ class TimeSlot:
             ORDER BY start_time
         """
         cursor.execute(query, (doctor_id, day_of_week))
-        return cursor.fetchall()
+        return fetchall_records(cursor, 'TimeSlot')
+
+    @staticmethod
+    def get_active_for_doctors(cursor, doctor_ids):
+        """Get active weekly slots for many doctors in one query"""
+        doctor_ids = list(doctor_ids)
+        if not doctor_ids:
+            return []
+        placeholders = ', '.join('?' * len(doctor_ids))
+        query = f"""
+            SELECT doctor_id, day_of_week, start_time, end_time, slot_duration
+            FROM time_slots
+            WHERE doctor_id IN ({placeholders}) AND is_active = 1
+        """
+        cursor.execute(query, doctor_ids)
+        return fetchall_records(cursor, 'TimeSlot')
 
     @staticmethod
     def delete(cursor, slot_id):
@@ -307,7 +708,7 @@ class Appointment:
             WHERE a.id = ?
         """
         cursor.execute(query, (appointment_id,))
-        return cursor.fetchone()
+        return fetchone_record(cursor, 'Appointment')
 
     @staticmethod
     def get_by_patient(cursor, patient_id, status=None, limit=None):
@@ -322,16 +723,20 @@ class Appointment:
         params = [patient_id]
 
         if status:
-            query += " AND a.status = ?"
+            # +a.status: a patient has few appointments, so stay on
+            # idx_appointments_patient_date (which carries status) rather
+            # than walking every appointment in that status
+            query += " AND +a.status = ?"
             params.append(status)
 
         query += " ORDER BY a.appointment_date DESC, a.appointment_time DESC"
 
         if limit:
-            query += f" LIMIT {limit}"
+            query += " LIMIT ?"
+            params.append(int(limit))
 
         cursor.execute(query, params)
-        return cursor.fetchall()
+        return fetchall_records(cursor, 'Appointment')
 
     @staticmethod
     def get_by_doctor(cursor, doctor_id, status=None, date_filter=None, limit=None):
@@ -357,10 +762,144 @@ class Appointment:
         query += " ORDER BY a.appointment_date, a.appointment_time"
 
         if limit:
-            query += f" LIMIT {limit}"
+            query += " LIMIT ?"
+            params.append(int(limit))
 
         cursor.execute(query, params)
-        return cursor.fetchall()
+        return fetchall_records(cursor, 'Appointment')
+
+    @staticmethod
+    def get_page_by_doctor(cursor, doctor_id, status=None, date_filter=None,
+                           after=None, before=None, per_page=10):
+        """Get one page of a doctor's appointments, oldest first"""
+        query = """
+            SELECT a.*, 
+                   p.full_name as patient_name, p.phone as patient_phone, 
+                   p.date_of_birth, p.blood_group
+            FROM appointments a
+            JOIN patients p ON a.patient_id = p.id
+            WHERE a.doctor_id = ?
+        """
+        params = [doctor_id]
+
+        if status:
+            query += " AND a.status = ?"
+            params.append(status)
+
+        if date_filter:
+            query += " AND a.appointment_date = ?"
+            params.append(date_filter)
+
+        return keyset_page(cursor, query, params, per_page,
+                           after=after, before=before)
+
+    @staticmethod
+    def get_page(cursor, status=None, after=None, before=None, per_page=10):
+        """Get one page of all appointments (admin view), newest first"""
+        query = """
+            SELECT 
+                a.*,
+                p.full_name as patient_name,
+                d.full_name as doctor_name,
+                d.specialization,
+                pu.email as patient_email,
+                du.email as doctor_email
+            FROM appointments a
+            JOIN patients p ON a.patient_id = p.id
+            JOIN doctors d ON a.doctor_id = d.id
+            JOIN users pu ON p.user_id = pu.id
+            JOIN users du ON d.user_id = du.id
+            WHERE 1 = 1
+        """
+        params = []
+
+        if status:
+            query += " AND a.status = ?"
+            params.append(status)
+
+        return keyset_page(cursor, query, params, per_page, descending=True,
+                           after=after, before=before)
+
+    @staticmethod
+    def select_for_export(cursor, status=None):
+        """
+        Run the admin export query for appointments, newest first like the
+        admin list; read the rows with fetch_chunks()
+        """
+        query = """
+            SELECT a.id, a.appointment_date, a.appointment_time, a.duration, a.status,
+                   p.full_name as patient_name, pu.email as patient_email,
+                   d.full_name as doctor_name, du.email as doctor_email,
+                   d.specialization, a.reason_for_visit, a.cancelled_by,
+                   a.cancellation_reason, a.created_at
+            FROM appointments a
+            JOIN patients p ON a.patient_id = p.id
+            JOIN doctors d ON a.doctor_id = d.id
+            JOIN users pu ON p.user_id = pu.id
+            JOIN users du ON d.user_id = du.id
+        """
+        params = []
+        if status:
+            # idx_appointments_status_date returns the matches in date order,
+            # so rows stream at once instead of after a sort
+            query += " WHERE a.status = ?"
+            params.append(status)
+        query += " ORDER BY a.appointment_date DESC, a.appointment_time DESC, a.id DESC"
+        cursor.execute(query, params)
+
+    @staticmethod
+    def get_booked_in_range(cursor, doctor_ids, start_date, end_date):
+        """Get active bookings for many doctors between two dates (inclusive)"""
+        doctor_ids = list(doctor_ids)
+        if not doctor_ids:
+            return []
+        placeholders = ', '.join('?' * len(doctor_ids))
+        query = f"""
+            SELECT doctor_id, appointment_date, appointment_time, duration
+            FROM appointments
+            WHERE doctor_id IN ({placeholders})
+            AND appointment_date BETWEEN ? AND ?
+            AND status NOT IN ('cancelled', 'no_show')
+        """
+        cursor.execute(query, doctor_ids + [start_date, end_date])
+        return fetchall_records(cursor, 'Appointment')
+
+    @staticmethod
+    def get_due_for_reminder(cursor, reminder_type, start, end, after_id=0,
+                             limit=200, claim_timeout=900):
+        """
+        Get the next chunk (by id) of active appointments starting in
+        (start, end] that have no sent or in-progress reminder_type marker
+        """
+        query = """
+            SELECT
+                a.id, a.appointment_date, a.appointment_time,
+                p.full_name as patient_name,
+                d.full_name as doctor_name,
+                pu.email as patient_email
+            FROM appointments a
+            JOIN patients p ON a.patient_id = p.id
+            JOIN doctors d ON a.doctor_id = d.id
+            JOIN users pu ON p.user_id = pu.id
+            WHERE a.appointment_date BETWEEN ? AND ?
+            AND a.status IN ('scheduled', 'confirmed')
+            AND datetime(a.appointment_date || ' ' || a.appointment_time) > ?
+            AND datetime(a.appointment_date || ' ' || a.appointment_time) <= ?
+            AND a.id > ?
+            AND NOT EXISTS (
+                SELECT 1 FROM appointment_reminders r
+                WHERE r.appointment_id = a.id AND r.reminder_type = ?
+                AND (r.sent_at IS NOT NULL OR r.claimed_at > datetime('now', ?))
+            )
+            ORDER BY a.id
+            LIMIT ?
+        """
+        cursor.execute(query, (
+            start.date(), end.date(),
+            start.strftime('%Y-%m-%d %H:%M:%S'), end.strftime('%Y-%m-%d %H:%M:%S'),
+            after_id, reminder_type, f"-{int(claim_timeout)} seconds", limit
+        ))
+        return fetchall_records(cursor, 'Appointment')
 
     @staticmethod
     def check_conflict(cursor, doctor_id, appointment_date, appointment_time):
@@ -386,6 +925,33 @@ class Appointment:
         cursor.execute(query, (doctor_id, appt_date_str, appt_time_str))
         return cursor.fetchone() is not None
 
+    @staticmethod
+    def get_doctor_stats(cursor, doctor_id):
+        """Appointment counts for the doctor dashboard"""
+        cursor.execute("""
+            SELECT 
+                COUNT(*) as total_appointments,
+                SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as completed,
+                SUM(CASE WHEN status = 'scheduled' THEN 1 ELSE 0 END) as scheduled,
+                SUM(CASE WHEN status = 'cancelled' THEN 1 ELSE 0 END) as cancelled
+            FROM appointments 
+            WHERE doctor_id = ?
+        """, (doctor_id,))
+        return fetchone_record(cursor, 'AppointmentStats')
+
+    @staticmethod
+    def get_patient_stats(cursor, patient_id):
+        """Appointment counts for the patient dashboard"""
+        cursor.execute("""
+            SELECT 
+                COUNT(*) as total_appointments,
+                SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as completed,
+                SUM(CASE WHEN status = 'scheduled' THEN 1 ELSE 0 END) as scheduled
+            FROM appointments 
+            WHERE patient_id = ?
+        """, (patient_id,))
+        return fetchone_record(cursor, 'AppointmentStats')
+
     @staticmethod
     def update_status(cursor, appointment_id, status, **kwargs):
         """Update appointment status"""
@@ -427,9 +993,107 @@ class Appointment:
             cursor.execute(query, values)
 
 
+class AppointmentReminder:
+    """Sent markers so each reminder type goes out once per appointment"""
+
+    @staticmethod
+    def claim(cursor, appointment_id, reminder_type, claim_timeout=900):
+        """
+        Claim a reminder before sending it; False if it was already sent or
+        is being sent by another run (claims older than claim_timeout
+        seconds without sent_at are taken over)
+        """
+        cursor.execute("""
+            INSERT INTO appointment_reminders (appointment_id, reminder_type)
+            VALUES (?, ?)
+            ON CONFLICT (appointment_id, reminder_type) DO UPDATE
+            SET claimed_at = CURRENT_TIMESTAMP
+            WHERE sent_at IS NULL AND claimed_at <= datetime('now', ?)
+        """, (appointment_id, reminder_type, f"-{int(claim_timeout)} seconds"))
+        return cursor.rowcount == 1
+
+    @staticmethod
+    def mark_sent(cursor, reminder_type, appointment_ids):
+        """Record reminders as sent"""
+        cursor.executemany("""
+            UPDATE appointment_reminders SET sent_at = CURRENT_TIMESTAMP
+            WHERE appointment_id = ? AND reminder_type = ?
+        """, [(appointment_id, reminder_type) for appointment_id in appointment_ids])
+
+    @staticmethod
+    def release(cursor, reminder_type, appointment_ids):
+        """Drop claims for reminders that failed so the next run retries them"""
+        cursor.executemany("""
+            DELETE FROM appointment_reminders
+            WHERE appointment_id = ? AND reminder_type = ? AND sent_at IS NULL
+        """, [(appointment_id, reminder_type) for appointment_id in appointment_ids])
+
+
+class _TTLCache:
+    """Small thread-safe per-process cache whose entries expire after ttl seconds"""
+
+    def __init__(self, ttl, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] < monotonic():
+                return None
+            self._data.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def after_commit(cursor, callback):
+    """
+    Run callback once cursor's transaction commits (get_db_cursor runs
+    the hooks); a cursor without hooks runs it straight away
+    """
+    hooks = getattr(cursor, 'on_commit', None)
+    if hooks is None:
+        callback()
+    else:
+        hooks.append(callback)
+
+
 class Notification:
     """Notification model"""
 
+    # Read-through cache over notification_counters. Writes in this process
+    # invalidate it after they commit (invalidating earlier lets a concurrent
+    # read cache the old count again); other workers' writes show up within
+    # the TTL.
+    unread_cache = _TTLCache(ttl=10)
+
+    @staticmethod
+    def _invalidate_unread(cursor, user_ids=None):
+        """Drop cached unread counts for user_ids (None: all) once cursor commits"""
+        cache = Notification.unread_cache
+        if user_ids is None:
+            after_commit(cursor, cache.clear)
+        else:
+            after_commit(cursor, lambda: cache.invalidate(*user_ids))
+
     @staticmethod
     def create(cursor, user_id, title, message, notification_type='system'):
         """Create a notification"""
@@ -438,8 +1102,42 @@ class Notification:
             VALUES (?, ?, ?, ?)
         """
         cursor.execute(query, (user_id, title, message, notification_type))
+        Notification._invalidate_unread(cursor, [user_id])
         return cursor.lastrowid
 
+    @staticmethod
+    def bulk_create(cursor, user_ids, title, message, notification_type='system'):
+        """Create the same notification for many users in one statement"""
+        user_ids = list(user_ids)
+        query = """
+            INSERT INTO notifications (user_id, title, message, type)
+            VALUES (?, ?, ?, ?)
+        """
+        cursor.executemany(
+            query, ((user_id, title, message, notification_type) for user_id in user_ids))
+        Notification._invalidate_unread(cursor, user_ids)
+        return len(user_ids)
+
+    @staticmethod
+    def create_for_roles(cursor, roles, title, message, notification_type='system',
+                         after_id=0, through_id=None):
+        """
+        Create a notification for every active user with one of roles (INSERT ... SELECT)
+        after_id and through_id limit it to users with after_id < id <= through_id.
+        """
+        roles = list(roles)
+        placeholders = ','.join('?' * len(roles))
+        query = f"""
+            INSERT INTO notifications (user_id, title, message, type)
+            SELECT id, ?, ?, ? FROM users
+            WHERE role IN ({placeholders}) AND is_active = 1 AND id > ? AND id <= ?
+            ORDER BY id
+        """
+        through_id = (1 << 63) - 1 if through_id is None else through_id
+        cursor.execute(query, [title, message, notification_type] + roles + [after_id, through_id])
+        Notification._invalidate_unread(cursor)
+        return cursor.rowcount
+
     @staticmethod
     def get_by_user(cursor, user_id, unread_only=False, limit=20):
         """Get notifications for a user"""
@@ -449,7 +1147,7 @@ class Notification:
         if unread_only:
             query += " AND is_read = 0"
 
-        query += " ORDER BY created_at DESC LIMIT ?"
+        query += " ORDER BY created_at DESC, id DESC LIMIT ?"
         params.append(limit)
 
         cursor.execute(query, params)
@@ -458,13 +1156,335 @@ class Notification:
     @staticmethod
     def mark_as_read(cursor, notification_id):
         """Mark notification as read"""
-        query = "UPDATE notifications SET is_read = 1 WHERE id = ?"
+        query = "UPDATE notifications SET is_read = 1 WHERE id = ? RETURNING user_id"
         cursor.execute(query, (notification_id,))
+        Notification._invalidate_unread(cursor, [row['user_id'] for row in cursor.fetchall()])
 
     @staticmethod
-    def get_unread_count(cursor, user_id):
-        """Get count of unread notifications"""
-        query = "SELECT COUNT(*) as count FROM notifications WHERE user_id = ? AND is_read = 0"
+    def mark_all_read(cursor, user_id):
+        """Mark all of a user's notifications as read; returns how many changed"""
+        query = "UPDATE notifications SET is_read = 1 WHERE user_id = ? AND is_read = 0"
         cursor.execute(query, (user_id,))
-        result = cursor.fetchone()
-        return result['count'] if result else 0
+        Notification._invalidate_unread(cursor, [user_id])
+        return cursor.rowcount
+
+    @staticmethod
+    def get_unread_count(cursor, user_id):
+        """Get count of unread notifications (kept in notification_counters by triggers)"""
+        count = Notification.unread_cache.get(user_id)
+        if count is None:
+            cursor.execute(
+                "SELECT unread FROM notification_counters WHERE user_id = ?", (user_id,))
+            result = cursor.fetchone()
+            count = result['unread'] if result else 0
+            Notification.unread_cache.set(user_id, count)
+        return count
+
+    @staticmethod
+    def get_unread_counts(cursor, user_ids):
+        """Get {user_id: unread count} for many users in one query"""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        placeholders = ','.join('?' * len(user_ids))
+        cursor.execute(
+            f"SELECT user_id, unread FROM notification_counters WHERE user_id IN ({placeholders})",
+            user_ids)
+        counts = {user_id: 0 for user_id in user_ids}
+        counts.update((row['user_id'], row['unread']) for row in cursor.fetchall())
+        return counts
+
+    @staticmethod
+    def get_max_id(cursor):
+        """Get the newest notification id (0 if there are none)"""
+        cursor.execute("SELECT COALESCE(MAX(id), 0) AS max_id FROM notifications")
+        return cursor.fetchone()['max_id']
+
+    @staticmethod
+    def get_since(cursor, after_id, limit=500):
+        """Get notifications for all users with id > after_id, oldest first"""
+        query = """
+            SELECT id, user_id, title, message, type, created_at
+            FROM notifications
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+        """
+        cursor.execute(query, (after_id, limit))
+        return cursor.fetchall()
+
+    @staticmethod
+    def get_user_since(cursor, user_id, after_id, up_to, limit=50):
+        """Get a user's newest notifications in (after_id, up_to], oldest first"""
+        query = """
+            SELECT id, user_id, title, message, type, created_at
+            FROM notifications
+            WHERE user_id = ? AND id > ? AND id <= ?
+            ORDER BY id DESC
+            LIMIT ?
+        """
+        cursor.execute(query, (user_id, after_id, up_to, limit))
+        return cursor.fetchall()[::-1]
+
+    @staticmethod
+    def _expired_clause(ttl_days):
+        """SQL condition (and params) for read rows older than their type's TTL"""
+        cases = ' '.join('WHEN ? THEN datetime(\'now\', ?)' for _ in ttl_days)
+        params = []
+        for notification_type, days in ttl_days.items():
+            params += [notification_type, f"-{int(days)} days"]
+        # Types without a TTL compare against NULL and are never expired
+        return f"is_read = 1 AND created_at < CASE type {cases} END", params
+
+    @staticmethod
+    def next_expirable_id(cursor, after_id, min_days):
+        """
+        Get the first id after after_id if that row is older than min_days
+        Ids grow with created_at, so once a row is newer than the shortest
+        TTL nothing after it can have expired.
+        """
+        query = """
+            SELECT id, created_at < datetime('now', ?) AS expirable
+            FROM notifications
+            WHERE id > ?
+            ORDER BY id
+            LIMIT 1
+        """
+        cursor.execute(query, (f"-{int(min_days)} days", after_id))
+        row = cursor.fetchone()
+        return row['id'] if row and row['expirable'] else None
+
+    @staticmethod
+    def archive_expired(cursor, ttl_days, from_id, to_id):
+        """
+        Move expired read notifications with from_id <= id <= to_id to
+        notifications_archive; returns how many moved
+        ttl_days maps type -> days. Bounding each call to an id range keeps
+        it a primary-key range scan, however many unread or younger rows
+        are kept before it.
+        """
+        expired, params = Notification._expired_clause(ttl_days)
+        cursor.execute(f"""
+            INSERT INTO notifications_archive (id, user_id, type, title, message, created_at)
+            SELECT id, user_id, type, title, message, created_at
+            FROM notifications
+            WHERE id BETWEEN ? AND ? AND {expired}
+        """, [from_id, to_id] + params)
+        # Delete exactly what was archived: 'now' is re-read per statement,
+        # so repeating the TTL test could remove a row that was never copied
+        cursor.execute("""
+            DELETE FROM notifications
+            WHERE id BETWEEN ? AND ?
+              AND id IN (SELECT id FROM notifications_archive WHERE id BETWEEN ? AND ?)
+        """, (from_id, to_id, from_id, to_id))
+        return cursor.rowcount
+
+    @staticmethod
+    def purge_archive(cursor, older_than_days=365, limit=1000):
+        """Delete up to limit archived notifications older than older_than_days"""
+        query = """
+            DELETE FROM notifications_archive
+            WHERE id IN (
+                SELECT id FROM notifications_archive
+                WHERE created_at < datetime('now', ?)
+                ORDER BY id
+                LIMIT ?
+            )
+        """
+        cursor.execute(query, (f"-{int(older_than_days)} days", limit))
+        return cursor.rowcount
+
+    @staticmethod
+    def rebuild_unread_counts(cursor):
+        """Recount notification_counters from notifications (repair or backfill)"""
+        cursor.execute("DELETE FROM notification_counters")
+        cursor.execute("""
+            INSERT INTO notification_counters (user_id, unread)
+            SELECT user_id, COUNT(*) FROM notifications
+            WHERE is_read = 0
+            GROUP BY user_id
+        """)
+        Notification._invalidate_unread(cursor)
+        return cursor.rowcount
+
+
+class EmailOutbox:
+    """Email outbox model (durable queue drained by email_dispatcher.py)"""
+
+    @staticmethod
+    def enqueue(cursor, to_email, subject, html_content, text_content):
+        """Queue an email in the caller's transaction"""
+        query = """
+            INSERT INTO email_outbox (to_email, subject, html_content, text_content)
+            VALUES (?, ?, ?, ?)
+        """
+        cursor.execute(query, (to_email, subject, html_content, text_content))
+        return cursor.lastrowid
+
+    @staticmethod
+    def enqueue_many(cursor, messages):
+        """Queue (to_email, subject, html_content, text_content) tuples in one statement"""
+        query = """
+            INSERT INTO email_outbox (to_email, subject, html_content, text_content)
+            VALUES (?, ?, ?, ?)
+        """
+        cursor.executemany(query, messages)
+        return cursor.rowcount
+
+    @staticmethod
+    def claim_batch(cursor, worker, limit=50, claim_timeout=300):
+        """
+        Atomically claim up to limit due messages for worker
+        Messages left in 'sending' longer than claim_timeout seconds (a
+        dispatcher died mid-batch) are claimed again.
+        """
+        query = """
+            UPDATE email_outbox
+            SET status = 'sending', attempts = attempts + 1,
+                claimed_by = ?, claimed_at = CURRENT_TIMESTAMP
+            WHERE id IN (
+                SELECT id FROM email_outbox
+                WHERE (status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP)
+                   OR (status = 'sending' AND claimed_at <= datetime('now', ?))
+                ORDER BY next_attempt_at, id
+                LIMIT ?
+            )
+            RETURNING id, to_email, subject, html_content, text_content, attempts
+        """
+        cursor.execute(query, (worker, f"-{int(claim_timeout)} seconds", limit))
+        return fetchall_records(cursor, 'EmailOutbox')
+
+    # mark_sent / reschedule / mark_dead only touch messages worker still
+    # holds: once a claim times out another dispatcher may own the message,
+    # and the late result of the first must not overwrite the second's.
+    # Each returns how many messages it updated.
+
+    @staticmethod
+    def mark_sent(cursor, worker, message_ids):
+        """Mark messages worker claimed as delivered"""
+        cursor.executemany("""
+            UPDATE email_outbox
+            SET status = 'sent', sent_at = CURRENT_TIMESTAMP, last_error = NULL
+            WHERE id = ? AND status = 'sending' AND claimed_by = ?
+        """, [(message_id, worker) for message_id in message_ids])
+        return max(cursor.rowcount, 0)
+
+    @staticmethod
+    def reschedule(cursor, worker, retries):
+        """Put failed messages back as pending: retries is [(delay_seconds, error, id)]"""
+        cursor.executemany("""
+            UPDATE email_outbox
+            SET status = 'pending', claimed_by = NULL, last_error = ?,
+                next_attempt_at = datetime('now', '+' || ? || ' seconds')
+            WHERE id = ? AND status = 'sending' AND claimed_by = ?
+        """, [(error, int(delay), message_id, worker) for delay, error, message_id in retries])
+        return max(cursor.rowcount, 0)
+
+    @staticmethod
+    def mark_dead(cursor, worker, failures):
+        """Give up on messages: failures is [(error, id)]"""
+        cursor.executemany("""
+            UPDATE email_outbox
+            SET status = 'dead', claimed_by = NULL, last_error = ?
+            WHERE id = ? AND status = 'sending' AND claimed_by = ?
+        """, [(error, message_id, worker) for error, message_id in failures])
+        return max(cursor.rowcount, 0)
+
+    @staticmethod
+    def purge_sent(cursor, older_than_days=30, limit=500):
+        """Delete up to limit sent messages older than older_than_days"""
+        cursor.execute("""
+            DELETE FROM email_outbox
+            WHERE id IN (
+                SELECT id FROM email_outbox
+                WHERE status = 'sent' AND sent_at < datetime('now', ?)
+                LIMIT ?
+            )
+        """, (f"-{int(older_than_days)} days", limit))
+        return cursor.rowcount
+
+    @staticmethod
+    def get_status_counts(cursor):
+        """Get the number of messages in each status"""
+        cursor.execute(
+            "SELECT status, COUNT(*) FROM email_outbox GROUP BY status")
+        return {status: count for status, count in cursor.fetchall()}
+
+
+class SchedulerLock:
+    """Lease row so only one process runs the background scheduler"""
+
+    @staticmethod
+    def acquire(cursor, name, owner, lease_seconds=60):
+        """Take or renew the lease; True if owner holds it afterwards"""
+        cursor.execute("""
+            INSERT INTO scheduler_locks (name, owner, expires_at)
+            VALUES (?, ?, datetime('now', ?))
+            ON CONFLICT (name) DO UPDATE
+            SET owner = excluded.owner, expires_at = excluded.expires_at
+            WHERE scheduler_locks.owner = excluded.owner
+               OR scheduler_locks.expires_at <= CURRENT_TIMESTAMP
+        """, (name, owner, f"+{int(lease_seconds)} seconds"))
+        return cursor.rowcount == 1
+
+    @staticmethod
+    def release(cursor, name, owner):
+        """Give the lease up so another process can take over at once"""
+        cursor.execute(
+            "DELETE FROM scheduler_locks WHERE name = ? AND owner = ?",
+            (name, owner))
+
+
+class AdminStats:
+    """Precomputed admin dashboard statistics (admin_stats / appointment_stats)"""
+
+    TOTALS = ('doctors', 'patients', 'appointments', 'verified_doctors', 'pending_doctors')
+
+    @staticmethod
+    def get_totals(cursor):
+        """Get the dashboard totals as {name: value}"""
+        cursor.execute("SELECT name, value FROM admin_stats")
+        totals = dict.fromkeys(AdminStats.TOTALS, 0)
+        totals.update((row['name'], row['value']) for row in cursor.fetchall())
+        # Same names the old COUNT(*) query used in the dashboard template
+        return {
+            'total_doctors': totals['doctors'],
+            'total_patients': totals['patients'],
+            'total_appointments': totals['appointments'],
+            'verified_doctors': totals['verified_doctors'],
+            'pending_doctors': totals['pending_doctors'],
+        }
+
+    @staticmethod
+    def get_day(cursor, day, doctor_id=None):
+        """Get {status: count} of appointments on day (optionally for one doctor)"""
+        query = "SELECT status, SUM(count) AS count FROM appointment_stats WHERE day = ?"
+        params = [day]
+        if doctor_id is not None:
+            query += " AND doctor_id = ?"
+            params.append(doctor_id)
+        query += " GROUP BY status"
+        cursor.execute(query, params)
+        return {row['status']: row['count'] for row in cursor.fetchall() if row['count']}
+
+    @staticmethod
+    def rebuild(cursor):
+        """Recompute every statistic from the source tables; returns the new totals"""
+        cursor.execute("DELETE FROM admin_stats")
+        cursor.execute("""
+            INSERT INTO admin_stats (name, value)
+            SELECT 'doctors', COUNT(*) FROM users WHERE role = 'doctor'
+            UNION ALL SELECT 'patients', COUNT(*) FROM users WHERE role = 'patient'
+            UNION ALL SELECT 'appointments', COUNT(*) FROM appointments
+            UNION ALL SELECT 'verified_doctors', COUNT(*) FROM doctors WHERE is_verified = 1
+            UNION ALL SELECT 'pending_doctors', COUNT(*) FROM doctors WHERE COALESCE(is_verified, 0) != 1
+        """)
+        cursor.execute("DELETE FROM appointment_stats")
+        cursor.execute("""
+            INSERT INTO appointment_stats (day, doctor_id, status, count)
+            SELECT appointment_date, doctor_id, status, COUNT(*)
+            FROM appointments
+            GROUP BY appointment_date, doctor_id, status
+        """)
+        return AdminStats.get_totals(cursor)
+
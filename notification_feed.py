@@ -0,0 +1,253 @@
+"""
+Notification Feed
+Pushes new notifications to connected browsers over Server-Sent Events.
+
+One poller thread per process reads the notifications table past a
+high-water-mark id (a primary-key range scan, so its cost does not depend on
+how many clients are connected) and fans new rows out to that process's
+subscribers. SQLite commits one writer at a time, so ids become visible in
+order and nothing lands behind the high-water mark.
+
+Each connection has a bounded queue. A client that falls behind is
+disconnected and its browser reconnects with Last-Event-ID, which is
+backfilled from the database.
+
+Streams hold a worker for their whole lifetime: run gunicorn with threaded
+(-k gthread) or gevent workers, not the default sync worker. Under gthread
+each stream takes one of the worker's threads, so NOTIFICATION_STREAM_MAX_CLIENTS
+defaults to WEB_THREADS minus a reserve for page requests (see Procfile).
+"""
+import json
+import os
+import queue
+import threading
+import time
+
+from utils import get_db_cursor
+from models import Notification
+
+
+class FeedFull(Exception):
+    """Raised when the process already serves NOTIFICATION_STREAM_MAX_CLIENTS streams"""
+
+
+class Subscription:
+    """One connected client: a bounded queue of events for one user"""
+
+    def __init__(self, user_id, last_id, max_queue=100):
+        self.user_id = user_id
+        # Newest id handed to this client; the per-connection high-water mark
+        self.last_id = last_id
+        self.lagged = False
+        self._queue = queue.Queue(maxsize=max_queue)
+
+    def put(self, event):
+        """
+        Queue an event; returns False if it was dropped
+        A full queue marks the client as lagged instead of growing: its
+        stream ends and the browser resyncs from Last-Event-ID.
+        """
+        if self.lagged:
+            return False
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            self.lagged = True
+            return False
+
+    def get(self, timeout):
+        """Next event, or None after timeout seconds"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+def format_event(row, unread=None):
+    """Serialize one notification row as an SSE message"""
+    data = {
+        'id': row['id'],
+        'title': row['title'],
+        'message': row['message'],
+        'type': row['type'],
+        'created_at': str(row['created_at']),
+    }
+    if unread is not None:
+        data['unread'] = unread
+    return f"id: {row['id']}\nevent: notification\ndata: {json.dumps(data)}\n\n"
+
+
+class NotificationFeed:
+    """Per-process change feed over the notifications table"""
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.pid = os.getpid()
+        self.poll_interval = getattr(cfg, 'NOTIFICATION_STREAM_POLL_INTERVAL', 1.0)
+        self.max_queue = getattr(cfg, 'NOTIFICATION_STREAM_QUEUE_SIZE', 100)
+        self.max_clients = getattr(cfg, 'NOTIFICATION_STREAM_MAX_CLIENTS', 24)
+        self.backfill_limit = getattr(cfg, 'NOTIFICATION_STREAM_BACKFILL', 50)
+        self.batch_size = 500
+
+        self.high_water = None
+        self._subscribers = {}
+        self._clients = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+        # Counters for stats()
+        self.polls = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def _start(self):
+        """Start the poller thread on first use"""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name='notification-feed', daemon=True)
+            self._thread.start()
+
+    def subscribe(self, user_id, last_event_id=None):
+        """
+        Register a client; returns (subscription, backfill events)
+        With last_event_id (a reconnect) the backfill holds what the
+        client missed, up to NOTIFICATION_STREAM_BACKFILL rows.
+        """
+        with self._lock:
+            if self._clients >= self.max_clients:
+                raise FeedFull(f"{self._clients} notification streams already open")
+            idle = self._clients == 0
+        if idle or self.high_water is None:
+            # Nobody was listening, so the mark may be stale: skip old rows
+            with get_db_cursor(self.cfg) as cursor:
+                max_id = Notification.get_max_id(cursor)
+            with self._lock:
+                self.high_water = max(self.high_water or 0, max_id)
+
+        with self._lock:
+            # Rows up to up_to come from the backfill, later ones from the poller
+            up_to = self.high_water
+            last_id = up_to if last_event_id is None else min(last_event_id, up_to)
+            subscription = Subscription(user_id, up_to, self.max_queue)
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            self._clients += 1
+            self._start()
+        self._wakeup.set()
+
+        backfill = []
+        if last_id < up_to:
+            try:
+                with get_db_cursor(self.cfg) as cursor:
+                    rows = Notification.get_user_since(
+                        cursor, user_id, last_id, up_to, self.backfill_limit)
+                    unread = Notification.get_unread_count(cursor, user_id) if rows else None
+            except Exception:
+                self.unsubscribe(subscription)
+                raise
+            # Only the newest replayed event needs the current badge count
+            backfill = [format_event(row, unread if row is rows[-1] else None)
+                        for row in rows]
+        return subscription, backfill
+
+    def unsubscribe(self, subscription):
+        """Forget a client once its stream ends"""
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.user_id)
+            if subscriptions and subscription in subscriptions:
+                subscriptions.discard(subscription)
+                self._clients -= 1
+                if not subscriptions:
+                    del self._subscribers[subscription.user_id]
+
+    def poll(self):
+        """Fetch rows past the high-water mark and fan them out; returns rows read"""
+        with self._lock:
+            if not self._subscribers:
+                return 0
+            after_id = self.high_water
+        with get_db_cursor(self.cfg) as cursor:
+            rows = Notification.get_since(cursor, after_id, self.batch_size)
+            if not rows:
+                return 0
+            with self._lock:
+                listening = {row['user_id'] for row in rows} & self._subscribers.keys()
+            unread = Notification.get_unread_counts(cursor, listening)
+        self.polls += 1
+
+        with self._lock:
+            self.high_water = max(self.high_water, rows[-1]['id'])
+            for row in rows:
+                for subscription in self._subscribers.get(row['user_id'], ()):
+                    if row['id'] <= subscription.last_id:
+                        continue
+                    if subscription.put(format_event(row, unread.get(row['user_id']))):
+                        self.delivered += 1
+                    else:
+                        self.dropped += 1
+                    subscription.last_id = row['id']
+        return len(rows)
+
+    def _run(self):
+        """Poller loop: sleep while nobody listens, drain quickly after a burst"""
+        while True:
+            with self._lock:
+                idle = not self._subscribers
+            if idle:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            try:
+                read = self.poll()
+            except Exception as e:
+                print(f"⚠️  Notification feed poll failed: {e}")
+                read = 0
+            # A full batch means more rows are probably waiting
+            if read < self.batch_size:
+                time.sleep(self.poll_interval)
+
+    def stream(self, subscription, backfill, heartbeat=15, max_age=300):
+        """
+        Generate the SSE response body for one client
+        Ends after max_age seconds, or as soon as the client lags, so the
+        browser reconnects (with Last-Event-ID) and the worker is recycled.
+        """
+        try:
+            # Browsers wait this long (ms) before reconnecting
+            yield "retry: 3000\n\n"
+            yield from backfill
+            deadline = time.monotonic() + max_age
+            while time.monotonic() < deadline and not subscription.lagged:
+                event = subscription.get(timeout=heartbeat)
+                # A comment line keeps proxies open and detects closed clients
+                yield event if event is not None else ": keepalive\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+    def stats(self):
+        """Connected clients and delivery counters"""
+        with self._lock:
+            return {
+                'clients': self._clients,
+                'users': len(self._subscribers),
+                'max_clients': self.max_clients,
+                'high_water': self.high_water,
+                'polls': self.polls,
+                'delivered': self.delivered,
+                'dropped': self.dropped,
+            }
+
+
+# Per-process feed (recreated after a fork)
+_feed = None
+_feed_lock = threading.Lock()
+
+
+def get_notification_feed(cfg):
+    """Get this process's notification feed"""
+    global _feed
+    with _feed_lock:
+        if _feed is None or _feed.pid != os.getpid():
+            _feed = NotificationFeed(cfg)
+        return _feed
@@ -0,0 +1,232 @@
+"""
+Query Statistics
+Counts and times the SQL each request runs.
+
+Cursors from get_db_cursor() are InstrumentedCursors: every execute() and
+executemany() is timed and reported to the QueryStats recorders active in
+the current context. The app opens one recorder per request and reports
+it as a Server-Timing header (visible in the browser's network panel),
+logs statements a request repeats (the N+1 pattern) and keeps per-endpoint
+totals for /admin/metrics. Slow statements also go to the slow query log
+(slow_queries.py), in or out of a request.
+
+Time is measured around execute(), where SQLite prepares the statement and
+runs it up to its first row (including any sort); rows fetched afterwards
+are not timed.
+
+Tests can hold a route to a query budget:
+
+    with query_budget(6):
+        client.post('/patient/book/1', data=...)
+"""
+import heapq
+import sqlite3
+import threading
+import time
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+
+from flask import g, request
+
+# Recorders collecting in this context; a request's and any enclosing budget
+_active = ContextVar('query_stats', default=())
+
+
+def normalize_sql(sql):
+    """Collapse whitespace so one statement reads the same wherever it came from"""
+    return ' '.join(sql.split())
+
+
+class QueryStats:
+    """Statements run while this recorder is active"""
+
+    def __init__(self, slowest=3):
+        self.count = 0
+        self.total = 0.0
+        # SQL text -> [executions, seconds]
+        self.statements = {}
+        self._slowest_size = slowest
+        self._slowest = []
+
+    def record(self, sql, elapsed):
+        """Add one executed statement"""
+        self.count += 1
+        self.total += elapsed
+        entry = self.statements.get(sql)
+        if entry is None:
+            entry = self.statements[sql] = [0, 0.0]
+        entry[0] += 1
+        entry[1] += elapsed
+        if self._slowest_size:
+            item = (elapsed, self.count, sql)
+            if len(self._slowest) < self._slowest_size:
+                heapq.heappush(self._slowest, item)
+            else:
+                heapq.heappushpop(self._slowest, item)
+
+    def slowest(self):
+        """[(sql, seconds)] for the slowest statements, slowest first"""
+        return [(normalize_sql(sql), elapsed)
+                for elapsed, _, sql in sorted(self._slowest, reverse=True)]
+
+    def repeated(self, threshold):
+        """[(sql, executions)] for statements run at least threshold times"""
+        return sorted(((normalize_sql(sql), runs) for sql, (runs, _) in self.statements.items()
+                       if runs >= threshold), key=lambda item: -item[1])
+
+    def start(self):
+        """Start collecting in the current context; returns a token for stop()"""
+        return _active.set(_active.get() + (self,))
+
+    @staticmethod
+    def stop(token):
+        """Stop collecting (undo the matching start())"""
+        _active.reset(token)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor that reports each statement to the active QueryStats recorders
+    and, past its threshold, to slow_log (a slow_queries.SlowQueryLog)
+    """
+    slow_log = None
+    # Callbacks get_db_cursor runs after committing (see models.after_commit)
+    on_commit = None
+
+    def _report(self, sql, parameters, elapsed, recorders, many=False):
+        for stats in recorders:
+            stats.record(sql, elapsed)
+        slow_log = self.slow_log
+        if slow_log is not None and elapsed >= slow_log.threshold:
+            slow_log.log(self.connection, sql, parameters, elapsed, many=many)
+
+    def execute(self, sql, parameters=()):
+        recorders = _active.get()
+        if not recorders and self.slow_log is None:
+            return super().execute(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._report(sql, parameters, time.perf_counter() - started, recorders)
+
+    def executemany(self, sql, seq_of_parameters):
+        recorders = _active.get()
+        if not recorders and self.slow_log is None:
+            return super().executemany(sql, seq_of_parameters)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._report(sql, seq_of_parameters, time.perf_counter() - started,
+                         recorders, many=True)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised by query_budget when a block runs more statements than allowed"""
+
+
+class query_budget(ContextDecorator):
+    """
+    Fail when the wrapped block (or function) runs more than max_queries
+    statements; the error lists what ran, most repeated first
+    """
+
+    def __init__(self, max_queries):
+        self.max_queries = max_queries
+        self.stats = None
+        self._token = None
+
+    def __enter__(self):
+        self.stats = QueryStats(slowest=0)
+        self._token = self.stats.start()
+        return self.stats
+
+    def __exit__(self, exc_type, exc, tb):
+        QueryStats.stop(self._token)
+        if exc_type is None and self.stats.count > self.max_queries:
+            ran = '\n'.join(f"  {runs}x {sql}" for sql, runs in self.stats.repeated(1))
+            raise QueryBudgetExceeded(
+                f"{self.stats.count} queries run, budget is {self.max_queries}:\n{ran}")
+        return False
+
+
+def _header_text(text, limit=100):
+    """Make text safe for a quoted Server-Timing description"""
+    text = text.replace('\\', '').replace('"', "'")
+    return text if len(text) <= limit else text[:limit - 3] + '...'
+
+
+def server_timing(stats, include_sql=False):
+    """Server-Timing header value for one request's statements"""
+    metrics = [f'db;dur={stats.total * 1000:.2f};desc="{stats.count} queries"']
+    if include_sql:
+        for position, (sql, elapsed) in enumerate(stats.slowest(), 1):
+            metrics.append(f'sql-{position};dur={elapsed * 1000:.2f};desc="{_header_text(sql)}"')
+    return ', '.join(metrics)
+
+
+class EndpointTotals:
+    """Per-endpoint query totals for this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def add(self, endpoint, stats):
+        with self._lock:
+            entry = self._endpoints.get(endpoint)
+            if entry is None:
+                entry = self._endpoints[endpoint] = {
+                    'requests': 0, 'queries': 0, 'db_ms': 0.0, 'max_queries': 0}
+            entry['requests'] += 1
+            entry['queries'] += stats.count
+            entry['db_ms'] += stats.total * 1000
+            entry['max_queries'] = max(entry['max_queries'], stats.count)
+
+    def stats(self):
+        """{endpoint: totals}, busiest endpoints (most queries) first"""
+        with self._lock:
+            endpoints = sorted(self._endpoints.items(), key=lambda item: -item[1]['queries'])
+            return {endpoint: {
+                'requests': entry['requests'],
+                'queries': entry['queries'],
+                'avg_queries': round(entry['queries'] / entry['requests'], 1),
+                'max_queries': entry['max_queries'],
+                'avg_db_ms': round(entry['db_ms'] / entry['requests'], 3),
+            } for endpoint, entry in endpoints}
+
+
+endpoint_totals = EndpointTotals()
+
+
+def init_query_stats(app, cfg):
+    """Record every request's queries (QUERY_STATS_ENABLED)"""
+    if not getattr(cfg, 'QUERY_STATS_ENABLED', True):
+        return
+    slowest = getattr(cfg, 'QUERY_STATS_SLOWEST', 3)
+    include_sql = getattr(cfg, 'QUERY_STATS_SQL_IN_HEADERS', False)
+    repeat_warning = getattr(cfg, 'QUERY_STATS_REPEAT_WARNING', 5)
+
+    @app.before_request
+    def start_query_stats():
+        g.query_stats = QueryStats(slowest=slowest if include_sql else 0)
+        g.query_stats_token = g.query_stats.start()
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = g.get('query_stats')
+        if stats is None:
+            return response
+        response.headers['Server-Timing'] = server_timing(stats, include_sql)
+        endpoint_totals.add(request.endpoint or 'unknown', stats)
+        if repeat_warning:
+            for sql, runs in stats.repeated(repeat_warning):
+                print(f"⚠️  {request.method} {request.path} ran {runs}x: {sql[:200]}")
+        return response
+
+    @app.teardown_request
+    def stop_query_stats(error=None):
+        token = g.pop('query_stats_token', None)
+        if token is not None:
+            QueryStats.stop(token)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Notification Retention
+Moves read notifications past their type's TTL (NOTIFICATION_RETENTION_DAYS)
+into notifications_archive and deletes archived rows after
+NOTIFICATION_ARCHIVE_DAYS, so the notifications table stops growing.
+
+Work is done in small batches, each in its own short transaction, so the
+web app's writers are never blocked for long. The scheduler's maintenance
+job runs this; it can also be run by hand:
+
+    python3 retention.py
+"""
+import time
+from datetime import datetime
+
+from config import config
+from utils import get_db_cursor
+from models import Notification
+
+
+def archive_notifications(cfg):
+    """Archive expired read notifications batch by batch; returns rows moved"""
+    ttl_days = {notification_type: days for notification_type, days in
+                getattr(cfg, 'NOTIFICATION_RETENTION_DAYS', {}).items() if days}
+    if not ttl_days:
+        return 0
+    batch = getattr(cfg, 'NOTIFICATION_RETENTION_BATCH', 1000)
+    pause = getattr(cfg, 'NOTIFICATION_RETENTION_PAUSE', 0.01)
+    min_days = min(ttl_days.values())
+
+    archived = 0
+    after_id = 0
+    while True:
+        with get_db_cursor(cfg) as cursor:
+            # Jump over id gaps left by earlier runs instead of walking them
+            from_id = Notification.next_expirable_id(cursor, after_id, min_days)
+            if from_id is None:
+                break
+            to_id = from_id + batch - 1
+            archived += Notification.archive_expired(cursor, ttl_days, from_id, to_id)
+        after_id = to_id
+        time.sleep(pause)
+    return archived
+
+
+def purge_archive(cfg):
+    """Delete archived notifications past NOTIFICATION_ARCHIVE_DAYS; returns rows deleted"""
+    days = getattr(cfg, 'NOTIFICATION_ARCHIVE_DAYS', 365)
+    if not days:
+        return 0
+    batch = getattr(cfg, 'NOTIFICATION_RETENTION_BATCH', 1000)
+    pause = getattr(cfg, 'NOTIFICATION_RETENTION_PAUSE', 0.01)
+
+    purged = 0
+    while True:
+        with get_db_cursor(cfg) as cursor:
+            deleted = Notification.purge_archive(cursor, days, batch)
+        purged += deleted
+        if deleted < batch:
+            break
+        time.sleep(pause)
+    return purged
+
+
+def run_notification_retention(cfg):
+    """Archive, then purge the archive; returns counts"""
+    return {
+        'notifications_archived': archive_notifications(cfg),
+        'archive_purged': purge_archive(cfg),
+    }
+
+
+def main():
+    cfg = config['default']()
+    print(f"\n{'='*60}")
+    print(f"NOTIFICATION RETENTION - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"{'='*60}")
+    started = time.monotonic()
+    result = run_notification_retention(cfg)
+    print(f"Archived {result['notifications_archived']} notification(s), "
+          f"purged {result['archive_purged']} archived row(s) "
+          f"in {time.monotonic() - started:.1f}s\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,10 +2,18 @@
 Admin Blueprint
 Handles all admin-related routes and functionality
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from utils import admin_required, get_db_cursor
-from models import Doctor, Patient, Appointment, User
-from datetime import datetime, date
+from datetime import date
+from functools import partial
+from flask import (Blueprint, render_template, request, redirect, url_for, flash, session,
+                   jsonify, Response, stream_with_context)
+from utils import admin_required, get_db_cursor, get_pool_stats
+from email_service import get_email_service
+from notification_feed import get_notification_feed
+from broadcast import BROADCAST_AUDIENCES, broadcast
+from exports import EXPORT_FORMATS, open_export
+from query_stats import endpoint_totals
+from models import (Doctor, Patient, Appointment, User, EmailOutbox, AdminStats,
+                    fetchall_records)
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -16,16 +24,9 @@ def dashboard():
     """Admin dashboard with overview"""
     try:
         with get_db_cursor(admin_bp.config) as cursor:
-            # Get overall statistics
-            cursor.execute("""
-                SELECT 
-                    (SELECT COUNT(*) FROM users WHERE role = 'doctor') as total_doctors,
-                    (SELECT COUNT(*) FROM users WHERE role = 'patient') as total_patients,
-                    (SELECT COUNT(*) FROM appointments) as total_appointments,
-                    (SELECT COUNT(*) FROM doctors WHERE is_verified = 1) as verified_doctors,
-                    (SELECT COUNT(*) FROM doctors WHERE is_verified = 0) as pending_doctors
-            """)
-            stats = cursor.fetchone()
+            # Overall statistics, kept current by triggers (see AdminStats)
+            stats = AdminStats.get_totals(cursor)
+            today = AdminStats.get_day(cursor, date.today())
 
             # Recent appointments
             cursor.execute("""
@@ -40,16 +41,7 @@ def dashboard():
                 ORDER BY a.created_at DESC
                 LIMIT 10
             """)
-            recent_appointments = cursor.fetchall()
-            # Convert datetime strings back to objects
-            recent_appointments = [dict(row) for row in recent_appointments]
-            for appt in recent_appointments:
-                if isinstance(appt['appointment_date'], str):
-                    appt['appointment_date'] = datetime.strptime(
-                        appt['appointment_date'], '%Y-%m-%d')
-                if isinstance(appt['appointment_time'], str):
-                    appt['appointment_time'] = datetime.strptime(
-                        appt['appointment_time'], '%H:%M:%S').time()
+            recent_appointments = fetchall_records(cursor, 'Appointment')
 
             # Pending doctor verifications
             cursor.execute("""
@@ -62,17 +54,12 @@ def dashboard():
                     WHERE d.is_verified = 0
                     ORDER BY u.created_at DESC
                 """)
-            pending_doctors = cursor.fetchall()
-            # Convert datetime strings back to objects
-            pending_doctors = [dict(row) for row in pending_doctors]
-            for doctor in pending_doctors:
-                if isinstance(doctor['created_at'], str):
-                    doctor['created_at'] = datetime.strptime(
-                        doctor['created_at'], '%Y-%m-%d %H:%M:%S')
+            pending_doctors = fetchall_records(cursor, 'Doctor')
 
             return render_template(
                 'admin/dashboard.html',
                 stats=stats,
+                today=today,
                 recent_appointments=recent_appointments,
                 pending_doctors=pending_doctors,
                 title='Admin Dashboard'
@@ -93,12 +80,6 @@ def manage_doctors():
 
             if status_filter == 'verified':
                 doctors = Doctor.get_all_verified(cursor)
-                # Convert datetime strings back to objects
-                doctors = [dict(row) for row in doctors]
-                for doctor in doctors:
-                    if isinstance(doctor['created_at'], str):
-                        doctor['created_at'] = datetime.strptime(
-                            doctor['created_at'], '%Y-%m-%d %H:%M:%S')
             elif status_filter == 'pending':
                 cursor.execute("""
                     SELECT d.*, u.email, u.created_at, u.id as user_id
@@ -107,13 +88,7 @@ def manage_doctors():
                     WHERE d.is_verified = 0
                     ORDER BY u.created_at DESC
                 """)
-                doctors = cursor.fetchall()
-                # Convert datetime strings back to objects
-                doctors = [dict(row) for row in doctors]
-                for doctor in doctors:
-                    if isinstance(doctor['created_at'], str):
-                        doctor['created_at'] = datetime.strptime(
-                            doctor['created_at'], '%Y-%m-%d %H:%M:%S')
+                doctors = fetchall_records(cursor, 'Doctor')
             else:
                 cursor.execute("""
                     SELECT d.*, u.email, u.created_at, u.id as user_id
@@ -121,13 +96,7 @@ def manage_doctors():
                     JOIN users u ON d.user_id = u.id
                     ORDER BY u.created_at DESC
                 """)
-                doctors = cursor.fetchall()
-                # Convert datetime strings back to objects
-                doctors = [dict(row) for row in doctors]
-                for doctor in doctors:
-                    if isinstance(doctor['created_at'], str):
-                        doctor['created_at'] = datetime.strptime(
-                            doctor['created_at'], '%Y-%m-%d %H:%M:%S')
+                doctors = fetchall_records(cursor, 'Doctor')
 
             return render_template(
                 'admin/doctors.html',
@@ -193,13 +162,7 @@ def manage_patients():
                 JOIN users u ON p.user_id = u.id
                 ORDER BY u.created_at DESC
             """)
-            patients = cursor.fetchall()
-            # Convert datetime strings back to objects
-            patients = [dict(row) for row in patients]
-            for patient in patients:
-                if isinstance(patient['created_at'], str):
-                    patient['created_at'] = datetime.strptime(
-                        patient['created_at'], '%Y-%m-%d %H:%M:%S')
+            patients = fetchall_records(cursor, 'Patient')
 
             return render_template(
                 'admin/patients.html',
@@ -220,46 +183,18 @@ def manage_appointments():
         with get_db_cursor(admin_bp.config) as cursor:
             status_filter = request.args.get('status')
 
-            query = """
-                SELECT 
-                    a.*,
-                    p.full_name as patient_name,
-                    d.full_name as doctor_name,
-                    d.specialization,
-                    pu.email as patient_email,
-                    du.email as doctor_email
-                FROM appointments a
-                JOIN patients p ON a.patient_id = p.id
-                JOIN doctors d ON a.doctor_id = d.id
-                JOIN users pu ON p.user_id = pu.id
-                JOIN users du ON d.user_id = du.id
-            """
-
-            if status_filter:
-                query += " WHERE a.status = ?"
-                cursor.execute(
-                    query + " ORDER BY a.appointment_date DESC, a.appointment_time DESC", (status_filter,))
-            else:
-                cursor.execute(
-                    query + " ORDER BY a.appointment_date DESC, a.appointment_time DESC")
-
-            appointments = cursor.fetchall()
-            # Convert datetime strings back to objects
-            appointments = [dict(row) for row in appointments]
-            for appt in appointments:
-                if isinstance(appt['appointment_date'], str):
-                    appt['appointment_date'] = datetime.strptime(
-                        appt['appointment_date'], '%Y-%m-%d')
-                if isinstance(appt['appointment_time'], str):
-                    appt['appointment_time'] = datetime.strptime(
-                        appt['appointment_time'], '%H:%M:%S').time()
-                if isinstance(appt['created_at'], str):
-                    appt['created_at'] = datetime.strptime(
-                        appt['created_at'], '%Y-%m-%d %H:%M:%S')
+            page = Appointment.get_page(
+                cursor,
+                status=status_filter,
+                after=request.args.get('after'),
+                before=request.args.get('before'),
+                per_page=admin_bp.config.APPOINTMENTS_PER_PAGE
+            )
 
             return render_template(
                 'admin/appointments.html',
-                appointments=appointments,
+                appointments=page.items,
+                page=page,
                 status_filter=status_filter,
                 title='Manage Appointments'
             )
@@ -269,6 +204,39 @@ def manage_appointments():
         return redirect(url_for('admin.dashboard'))
 
 
+@admin_bp.route('/<any(doctors, patients, appointments):kind>/export')
+@admin_required
+def export(kind):
+    """Stream a list view (with its filters) as CSV or NDJSON"""
+    fmt = request.args.get('format', 'csv')
+    status_filter = request.args.get('status')
+    if fmt not in EXPORT_FORMATS:
+        flash(f'Unknown export format: {fmt}', 'error')
+        return redirect(url_for(f'admin.manage_{kind}', status=status_filter))
+
+    select = {
+        'doctors': partial(Doctor.select_for_export, status=status_filter),
+        'patients': Patient.select_for_export,
+        'appointments': partial(Appointment.select_for_export, status=status_filter),
+    }[kind]
+    try:
+        body = open_export(admin_bp.config, select, fmt)
+    except Exception as e:
+        flash(f'Error exporting {kind}: {str(e)}', 'error')
+        return redirect(url_for(f'admin.manage_{kind}', status=status_filter))
+
+    filename = f"{kind}-{date.today():%Y%m%d}.{fmt}"
+    return Response(
+        stream_with_context(body),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            # Let nginx pass chunks through instead of buffering the file
+            'X-Accel-Buffering': 'no',
+        }
+    )
+
+
 @admin_bp.route('/users/<int:user_id>/delete', methods=['POST'])
 @admin_required
 def delete_user(user_id):
@@ -287,7 +255,7 @@ def delete_user(user_id):
                 return redirect(url_for('admin.dashboard'))
 
             # Delete user (this will cascade to patients/doctors if FK constraints are set properly)
-            cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
+            User.delete(cursor, user_id)
 
             flash(f'{user["role"].title()} deleted successfully', 'success')
 
@@ -301,3 +269,65 @@ def delete_user(user_id):
     except Exception as e:
         flash(f'Error deleting user: {str(e)}', 'error')
         return redirect(request.referrer or url_for('admin.dashboard'))
+
+
+@admin_bp.route('/broadcast', methods=['GET', 'POST'])
+@admin_required
+def send_broadcast():
+    """Send an announcement to all patients, all doctors or everyone"""
+    if request.method == 'POST':
+        audience = request.form.get('audience')
+        title = request.form.get('title', '').strip()
+        message = request.form.get('message', '').strip()
+        send_email = bool(request.form.get('send_email'))
+
+        if audience not in BROADCAST_AUDIENCES or not title or not message:
+            flash('Please choose an audience and enter a title and message', 'error')
+            return render_template('admin/broadcast.html', audiences=BROADCAST_AUDIENCES,
+                                   form=request.form, title='Broadcast')
+
+        try:
+            result = broadcast(admin_bp.config, BROADCAST_AUDIENCES[audience],
+                               title, message, send_email=send_email)
+
+            sent = f"Announcement sent to {result['notifications']} user(s)"
+            if send_email:
+                sent += f", {result['emails']} email(s) queued"
+            flash(sent, 'success')
+            return redirect(url_for('admin.dashboard'))
+
+        except Exception as e:
+            flash(f'Error sending announcement: {str(e)}', 'error')
+            return redirect(url_for('admin.send_broadcast'))
+
+    return render_template('admin/broadcast.html', audiences=BROADCAST_AUDIENCES,
+                           form={}, title='Broadcast')
+
+
+@admin_bp.route('/stats/rebuild', methods=['POST'])
+@admin_required
+def rebuild_stats():
+    """Recompute the precomputed dashboard statistics from scratch"""
+    try:
+        with get_db_cursor(admin_bp.config) as cursor:
+            AdminStats.rebuild(cursor)
+
+        flash('Statistics rebuilt', 'success')
+    except Exception as e:
+        flash(f'Error rebuilding statistics: {str(e)}', 'error')
+    return redirect(url_for('admin.dashboard'))
+
+
+@admin_bp.route('/metrics')
+@admin_required
+def metrics():
+    """Connection pool, email queue, notification stream and query metrics for this worker process"""
+    with get_db_cursor(admin_bp.config) as cursor:
+        outbox = EmailOutbox.get_status_counts(cursor)
+    return jsonify(
+        db_pool=get_pool_stats(admin_bp.config),
+        email=get_email_service(admin_bp.config).stats(),
+        email_outbox=outbox,
+        notification_feed=get_notification_feed(admin_bp.config).stats(),
+        queries=endpoint_totals.stats()
+    )
@@ -200,7 +200,7 @@ def register_patient_post():
                 if email_service.enabled:
                     print(f"📧 Attempting to send welcome email to: {email}")
                     print(f"📧 Patient name: {full_name}")
-                    email_service.send_welcome_email(email, full_name, 'patient')
+                    email_service.send_welcome_email(email, full_name, 'patient', cursor=cursor)
                     print(f"📧 ✅ Welcome email queued successfully for: {email}")
                     print(f"📧 Check Render logs for email send status (look for '✅ Email sent' or '❌ Email failed')")
                 else:
@@ -304,7 +304,7 @@ def register_doctor_post():
                 
                 if email_service.enabled:
                     print(f"📧 Attempting to send welcome email to: {email}")
-                    email_service.send_welcome_email(email, full_name, 'doctor')
+                    email_service.send_welcome_email(email, full_name, 'doctor', cursor=cursor)
                     print(f"📧 ✅ Welcome email queued successfully for: {email}")
                 else:
                     print(f"⚠️ ❌ Email service disabled - Cannot send welcome email")
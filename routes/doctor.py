@@ -24,42 +24,14 @@ def dashboard():
             today_appointments = Appointment.get_by_doctor(
                 cursor, doctor_id, date_filter=today
             )
-            # Convert date/time strings back to objects
-            today_appointments = [dict(row) for row in today_appointments]
-            for appt in today_appointments:
-                if isinstance(appt['appointment_date'], str):
-                    appt['appointment_date'] = datetime.strptime(
-                        appt['appointment_date'], '%Y-%m-%d').date()
-                if isinstance(appt['appointment_time'], str):
-                    appt['appointment_time'] = datetime.strptime(
-                        appt['appointment_time'], '%H:%M:%S').time()
 
             # Get upcoming appointments
             upcoming_appointments = Appointment.get_by_doctor(
                 cursor, doctor_id, status='scheduled', limit=5
             )
-            # Convert date/time strings back to objects
-            upcoming_appointments = [dict(row)
-                                     for row in upcoming_appointments]
-            for appt in upcoming_appointments:
-                if isinstance(appt['appointment_date'], str):
-                    appt['appointment_date'] = datetime.strptime(
-                        appt['appointment_date'], '%Y-%m-%d').date()
-                if isinstance(appt['appointment_time'], str):
-                    appt['appointment_time'] = datetime.strptime(
-                        appt['appointment_time'], '%H:%M:%S').time()
 
             # Get statistics
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_appointments,
-                    SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as completed,
-                    SUM(CASE WHEN status = 'scheduled' THEN 1 ELSE 0 END) as scheduled,
-                    SUM(CASE WHEN status = 'cancelled' THEN 1 ELSE 0 END) as cancelled
-                FROM appointments 
-                WHERE doctor_id = ?
-            """, (doctor_id,))
-            stats = cursor.fetchone()
+            stats = Appointment.get_doctor_stats(cursor, doctor_id)
 
             # Get unread notifications count
             unread_count = Notification.get_unread_count(
@@ -89,23 +61,19 @@ def appointments():
             status_filter = request.args.get('status')
             date_filter = request.args.get('date')
 
-            appointments = Appointment.get_by_doctor(
+            page = Appointment.get_page_by_doctor(
                 cursor, doctor_id,
                 status=status_filter,
-                date_filter=date_filter
+                date_filter=date_filter,
+                after=request.args.get('after'),
+                before=request.args.get('before'),
+                per_page=doctor_bp.config.APPOINTMENTS_PER_PAGE
             )
-            # Convert date/time strings back to objects
-            for appt in appointments:
-                if isinstance(appt['appointment_date'], str):
-                    appt['appointment_date'] = datetime.strptime(
-                        appt['appointment_date'], '%Y-%m-%d').date()
-                if isinstance(appt['appointment_time'], str):
-                    appt['appointment_time'] = datetime.strptime(
-                        appt['appointment_time'], '%H:%M:%S').time()
 
             return render_template(
                 'doctor/appointments.html',
-                appointments=appointments,
+                appointments=page.items,
+                page=page,
                 status_filter=status_filter,
                 date_filter=date_filter,
                 title='My Appointments'
@@ -128,17 +96,6 @@ def appointment_detail(appointment_id):
                 flash('Appointment not found', 'error')
                 return redirect(url_for('doctor.appointments'))
 
-            # Convert date/time strings back to objects for template rendering
-            if isinstance(appointment['appointment_date'], str):
-                appointment['appointment_date'] = datetime.strptime(
-                    appointment['appointment_date'], '%Y-%m-%d').date()
-            if isinstance(appointment['appointment_time'], str):
-                appointment['appointment_time'] = datetime.strptime(
-                    appointment['appointment_time'], '%H:%M:%S').time()
-            if appointment['date_of_birth'] and isinstance(appointment['date_of_birth'], str):
-                appointment['date_of_birth'] = datetime.strptime(
-                    appointment['date_of_birth'], '%Y-%m-%d').date()
-
             return render_template(
                 'doctor/appointment_detail.html',
                 appointment=appointment,
@@ -167,14 +124,6 @@ def update_appointment(appointment_id):
                 flash('Appointment not found', 'error')
                 return redirect(url_for('doctor.appointments'))
 
-            # Convert date/time strings back to objects
-            if isinstance(appointment['appointment_date'], str):
-                appointment['appointment_date'] = datetime.strptime(
-                    appointment['appointment_date'], '%Y-%m-%d').date()
-            if isinstance(appointment['appointment_time'], str):
-                appointment['appointment_time'] = datetime.strptime(
-                    appointment['appointment_time'], '%H:%M:%S').time()
-
             # Update medical info
             if diagnosis or prescription or notes:
                 Appointment.update_medical_info(
@@ -212,7 +161,8 @@ def update_appointment(appointment_id):
                                     appointment['appointment_date'],
                                     appointment['appointment_time'],
                                     'doctor',
-                                    'Cancelled by doctor'
+                                    'Cancelled by doctor',
+                                    cursor=cursor
                                 )
                         except Exception as e:
                             print(f"Email notification error: {e}")
@@ -232,19 +182,7 @@ def schedule():
     try:
         with get_db_cursor(doctor_bp.config) as cursor:
             doctor_id = session.get('profile_id')
-            time_slots_rows = TimeSlot.get_by_doctor(cursor, doctor_id)
-            # Convert Row objects to dictionaries and parse time strings
-            time_slots = []
-            for row in time_slots_rows:
-                slot_dict = dict(row)
-                # Convert time strings back to time objects for template rendering
-                if isinstance(slot_dict['start_time'], str):
-                    slot_dict['start_time'] = datetime.strptime(
-                        slot_dict['start_time'], '%H:%M:%S').time()
-                if isinstance(slot_dict['end_time'], str):
-                    slot_dict['end_time'] = datetime.strptime(
-                        slot_dict['end_time'], '%H:%M:%S').time()
-                time_slots.append(slot_dict)
+            time_slots = TimeSlot.get_by_doctor(cursor, doctor_id)
 
             # Group by day
             slots_by_day = {}
@@ -290,13 +228,7 @@ def add_time_slot():
             end_obj = datetime.strptime(end_time, '%H:%M').time()
 
             for slot in existing_slots:
-                # Parse the slot times from the database (stored as strings)
-                slot_start = datetime.strptime(slot['start_time'], '%H:%M:%S').time(
-                ) if isinstance(slot['start_time'], str) else slot['start_time']
-                slot_end = datetime.strptime(slot['end_time'], '%H:%M:%S').time(
-                ) if isinstance(slot['end_time'], str) else slot['end_time']
-
-                if not (end_obj <= slot_start or start_obj >= slot_end):
+                if not (end_obj <= slot['start_time'] or start_obj >= slot['end_time']):
                     flash('Time slot conflicts with existing schedule', 'error')
                     return redirect(url_for('doctor.schedule'))
 
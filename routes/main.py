@@ -2,9 +2,10 @@
 Main Blueprint
 Handles home page and general routes
 """
-from flask import Blueprint, render_template, session
-from utils import get_db_cursor
-from models import Doctor
+from flask import Blueprint, Response, flash, redirect, render_template, request, session, url_for
+from utils import get_db_cursor, login_required
+from models import Doctor, Notification
+from notification_feed import FeedFull, get_notification_feed
 
 main_bp = Blueprint('main', __name__)
 
@@ -55,3 +56,46 @@ def about():
 def contact():
     """Contact page"""
     return render_template('contact.html', title='Contact Us')
+
+
+@main_bp.route('/notifications/stream')
+@login_required
+def notification_stream():
+    """Server-Sent Events stream of the current user's new notifications"""
+    cfg = main_bp.config
+    feed = get_notification_feed(cfg)
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        last_event_id = None
+
+    try:
+        subscription, backfill = feed.subscribe(session['user_id'], last_event_id)
+    except FeedFull:
+        # EventSource gives up on a 503; base.html reconnects after Retry-After
+        return Response('Too many notification streams', status=503, headers={
+            'Retry-After': str(getattr(cfg, 'NOTIFICATION_STREAM_RETRY_AFTER', 30))})
+
+    # Session data is read above: the generator runs without the request
+    # context and holds no database connection while it waits
+    response = Response(
+        feed.stream(subscription, backfill,
+                    heartbeat=getattr(cfg, 'NOTIFICATION_STREAM_HEARTBEAT', 15),
+                    max_age=getattr(cfg, 'NOTIFICATION_STREAM_MAX_AGE', 300)),
+        mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@main_bp.route('/notifications/read-all', methods=['POST'])
+@login_required
+def mark_notifications_read():
+    """Mark all of the current user's notifications as read"""
+    try:
+        with get_db_cursor(main_bp.config) as cursor:
+            Notification.mark_all_read(cursor, session['user_id'])
+    except Exception as e:
+        flash(f'Error updating notifications: {str(e)}', 'error')
+    return redirect(request.referrer or url_for('main.index'))
@@ -2,11 +2,12 @@
 Patient Blueprint
 Handles all patient-related routes and functionality
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, make_response
 from utils import patient_required, get_db_cursor
-from models import Patient, Doctor, Appointment, TimeSlot, Notification, User
-from datetime import datetime, date, time, timedelta
+from models import Patient, Doctor, Appointment, Notification, User
+from datetime import datetime, date, timedelta
 from email_service import get_email_service
+from availability import get_availability, is_available, availability_etag, to_json
 
 patient_bp = Blueprint('patient', __name__, url_prefix='/patient')
 
@@ -23,41 +24,14 @@ def dashboard():
             upcoming_appointments = Appointment.get_by_patient(
                 cursor, patient_id, status='scheduled', limit=5
             )
-            # Convert date/time strings back to objects
-            upcoming_appointments = [dict(row)
-                                     for row in upcoming_appointments]
-            for appt in upcoming_appointments:
-                if isinstance(appt['appointment_date'], str):
-                    appt['appointment_date'] = datetime.strptime(
-                        appt['appointment_date'], '%Y-%m-%d').date()
-                if isinstance(appt['appointment_time'], str):
-                    appt['appointment_time'] = datetime.strptime(
-                        appt['appointment_time'], '%H:%M:%S').time()
 
             # Get recent appointments
             recent_appointments = Appointment.get_by_patient(
                 cursor, patient_id, limit=5
             )
-            # Convert date/time strings back to objects
-            recent_appointments = [dict(row) for row in recent_appointments]
-            for appt in recent_appointments:
-                if isinstance(appt['appointment_date'], str):
-                    appt['appointment_date'] = datetime.strptime(
-                        appt['appointment_date'], '%Y-%m-%d').date()
-                if isinstance(appt['appointment_time'], str):
-                    appt['appointment_time'] = datetime.strptime(
-                        appt['appointment_time'], '%H:%M:%S').time()
 
             # Get statistics
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_appointments,
-                    SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as completed,
-                    SUM(CASE WHEN status = 'scheduled' THEN 1 ELSE 0 END) as scheduled
-                FROM appointments 
-                WHERE patient_id = ?
-            """, (patient_id,))
-            stats = cursor.fetchone()
+            stats = Appointment.get_patient_stats(cursor, patient_id)
 
             # Get unread notifications count
             unread_count = Notification.get_unread_count(
@@ -131,49 +105,17 @@ def doctor_profile(doctor_id):
                 flash('Doctor not found', 'error')
                 return redirect(url_for('patient.find_doctors'))
 
-            # Get doctor's time slots
-            time_slots_rows = TimeSlot.get_by_doctor(cursor, doctor_id)
-            # Convert Row objects to dictionaries and parse time strings
-            time_slots = []
-            for row in time_slots_rows:
-                slot_dict = dict(row)
-                # Convert time strings back to time objects
-                if isinstance(slot_dict['start_time'], str):
-                    slot_dict['start_time'] = datetime.strptime(
-                        slot_dict['start_time'], '%H:%M:%S').time()
-                if isinstance(slot_dict['end_time'], str):
-                    slot_dict['end_time'] = datetime.strptime(
-                        slot_dict['end_time'], '%H:%M:%S').time()
-                time_slots.append(slot_dict)
-
-            # Get available dates (next 30 days)
-            available_dates = []
+            # Free (unbooked) times over the booking window
             today = date.today()
-            for i in range(30):
-                check_date = today + timedelta(days=i)
-                day_name = check_date.strftime('%A')
-
-                # Check if doctor has slots on this day
-                day_slots = [
-                    slot for slot in time_slots if slot['day_of_week'] == day_name]
-                if day_slots:
-                    # Convert time objects to strings for JSON serialization
-                    serializable_slots = []
-                    for slot in day_slots:
-                        slot_copy = slot.copy()
-                        if isinstance(slot_copy['start_time'], time):
-                            slot_copy['start_time'] = slot_copy['start_time'].strftime(
-                                '%H:%M:%S')
-                        if isinstance(slot_copy['end_time'], time):
-                            slot_copy['end_time'] = slot_copy['end_time'].strftime(
-                                '%H:%M:%S')
-                        serializable_slots.append(slot_copy)
-
-                    available_dates.append({
-                        'date': check_date,
-                        'day': day_name,
-                        'slots': serializable_slots
-                    })
+            window_end = today + timedelta(
+                days=patient_bp.config.BOOKING_ADVANCE_DAYS - 1)
+            free_days = get_availability(cursor, doctor_id, today, window_end)
+
+            # Times are fetched per date from doctor_availability
+            available_dates = [
+                {'date': day, 'day': day.strftime('%A')}
+                for day in sorted(free_days)
+            ]
 
             return render_template(
                 'patient/doctor_profile.html',
@@ -187,6 +129,54 @@ def doctor_profile(doctor_id):
         return redirect(url_for('patient.find_doctors'))
 
 
+@patient_bp.route('/doctor/<int:doctor_id>/availability')
+@patient_required
+def doctor_availability(doctor_id):
+    """Free appointment times for ?start=&end= as JSON, with ETag/304 support"""
+    today = date.today()
+    window_end = today + timedelta(
+        days=patient_bp.config.BOOKING_ADVANCE_DAYS - 1)
+    try:
+        start = date.fromisoformat(request.args.get('start') or today.isoformat())
+        end = date.fromisoformat(request.args.get('end') or start.isoformat())
+    except ValueError:
+        return jsonify(error='Dates must be in YYYY-MM-DD format'), 400
+
+    # Only the booking window is ever bookable
+    start, end = max(start, today), min(end, window_end)
+
+    try:
+        with get_db_cursor(patient_bp.config) as cursor:
+            doctor = Doctor.get_by_id(cursor, doctor_id)
+            if not doctor or not doctor['is_verified']:
+                return jsonify(error='Doctor not found'), 404
+
+            # The version lookup is all a revalidation costs
+            etag = availability_etag(
+                doctor_id, Doctor.get_schedule_version(cursor, doctor_id),
+                start, end)
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                free_days = get_availability(
+                    cursor, doctor_id, start, end) if start <= end else {}
+                response = jsonify(
+                    doctor_id=doctor_id,
+                    start=start.isoformat(),
+                    end=end.isoformat(),
+                    dates=to_json(free_days)
+                )
+
+    except Exception as e:
+        return jsonify(error=f'Error loading availability: {str(e)}'), 500
+
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = patient_bp.config.AVAILABILITY_MAX_AGE
+    response.cache_control.must_revalidate = True
+    return response
+
+
 @patient_bp.route('/book-appointment', methods=['POST'])
 @patient_required
 def book_appointment():
@@ -211,8 +201,8 @@ def book_appointment():
                 flash('Invalid doctor selection', 'error')
                 return redirect(url_for('patient.find_doctors'))
 
-            # Check if slot is still available
-            if Appointment.check_conflict(cursor, doctor_id, appointment_date, appointment_time):
+            # Check the time is on the doctor's schedule and still free
+            if not is_available(cursor, int(doctor_id), appointment_date, appointment_time):
                 flash('This time slot is no longer available', 'error')
                 return redirect(url_for('patient.doctor_profile', doctor_id=doctor_id))
 
@@ -259,7 +249,8 @@ def book_appointment():
                     doctor['full_name'],
                     appt_date,
                     appt_time_obj,
-                    doctor['specialization']
+                    doctor['specialization'],
+                    cursor=cursor
                 )
 
                 # Send notification to doctor
@@ -269,7 +260,8 @@ def book_appointment():
                     patient['full_name'],
                     appt_date,
                     appt_time_obj,
-                    reason
+                    reason,
+                    cursor=cursor
                 )
             except Exception as e:
                 print(f"Email notification error: {e}")
@@ -294,15 +286,6 @@ def appointments():
             appointments = Appointment.get_by_patient(
                 cursor, patient_id, status=status_filter
             )
-            # Convert date/time strings back to objects
-            appointments = [dict(row) for row in appointments]
-            for appt in appointments:
-                if isinstance(appt['appointment_date'], str):
-                    appt['appointment_date'] = datetime.strptime(
-                        appt['appointment_date'], '%Y-%m-%d').date()
-                if isinstance(appt['appointment_time'], str):
-                    appt['appointment_time'] = datetime.strptime(
-                        appt['appointment_time'], '%H:%M:%S').time()
 
             return render_template(
                 'patient/appointments.html',
@@ -328,17 +311,6 @@ def appointment_detail(appointment_id):
                 flash('Appointment not found', 'error')
                 return redirect(url_for('patient.appointments'))
 
-            # Convert date/time strings back to objects for template rendering
-            if isinstance(appointment['appointment_date'], str):
-                appointment['appointment_date'] = datetime.strptime(
-                    appointment['appointment_date'], '%Y-%m-%d').date()
-            if isinstance(appointment['appointment_time'], str):
-                appointment['appointment_time'] = datetime.strptime(
-                    appointment['appointment_time'], '%H:%M:%S').time()
-            if appointment['date_of_birth'] and isinstance(appointment['date_of_birth'], str):
-                appointment['date_of_birth'] = datetime.strptime(
-                    appointment['date_of_birth'], '%Y-%m-%d').date()
-
             return render_template(
                 'patient/appointment_detail.html',
                 appointment=appointment,
@@ -364,14 +336,6 @@ def cancel_appointment(appointment_id):
                 flash('Appointment not found', 'error')
                 return redirect(url_for('patient.appointments'))
 
-            # Convert date/time strings back to objects
-            if isinstance(appointment['appointment_date'], str):
-                appointment['appointment_date'] = datetime.strptime(
-                    appointment['appointment_date'], '%Y-%m-%d').date()
-            if isinstance(appointment['appointment_time'], str):
-                appointment['appointment_time'] = datetime.strptime(
-                    appointment['appointment_time'], '%H:%M:%S').time()
-
             # Check if appointment can be cancelled
             if appointment['status'] in ['completed', 'cancelled']:
                 flash('This appointment cannot be cancelled', 'error')
@@ -422,7 +386,8 @@ def cancel_appointment(appointment_id):
                     appointment['appointment_date'],
                     appointment['appointment_time'],
                     'patient',
-                    reason
+                    reason,
+                    cursor=cursor
                 )
 
                 # Notify doctor
@@ -431,7 +396,8 @@ def cancel_appointment(appointment_id):
                     doctor['full_name'],
                     patient['full_name'],
                     appointment['appointment_date'],
-                    appointment['appointment_time']
+                    appointment['appointment_time'],
+                    cursor=cursor
                 )
             except Exception as e:
                 print(f"Email notification error: {e}")
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Background Scheduler
+Runs reminder sweeps, email outbox dispatch and database maintenance
+(outbox and notification retention) at the intervals in
+SCHEDULER_INTERVALS, so no cron entry is needed. Frequent small runs
+replace the old once-a-day reminder spike.
+
+Usage:
+    python3 -m scheduler        # standalone process (see Procfile)
+
+Or set SCHEDULER_IN_APP=true to start it inside every web worker (from
+gunicorn.conf.py's post_fork hook, or on a worker's first request). Workers
+compete for a lease row in scheduler_locks and only the holder runs jobs;
+if it dies, another worker takes over once the lease expires.
+"""
+import os
+import random
+import signal
+import socket
+import threading
+import time
+from datetime import datetime
+
+from config import config
+from utils import get_db_cursor
+from models import EmailOutbox, SchedulerLock
+from email_dispatcher import OutboxDispatcher
+from send_reminders import ReminderRunner
+from retention import run_notification_retention
+
+LOCK_NAME = 'scheduler'
+
+
+class Job:
+    """A function run every interval seconds"""
+    __slots__ = ('name', 'interval', 'func', 'next_run', 'runs', 'failures',
+                 'last_duration')
+
+    def __init__(self, name, interval, func, first_run):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.next_run = first_run
+        self.runs = 0
+        self.failures = 0
+        self.last_duration = 0.0
+
+
+def run_maintenance(cfg):
+    """Purge old sent emails and notifications in small batches, refresh planner stats"""
+    purged = 0
+    retention = getattr(cfg, 'MAIL_OUTBOX_RETENTION_DAYS', 30)
+    while True:
+        # One short transaction per batch keeps writers unblocked
+        with get_db_cursor(cfg) as cursor:
+            deleted = EmailOutbox.purge_sent(cursor, retention)
+        purged += deleted
+        if deleted < 500:
+            break
+    result = {'outbox_purged': purged}
+    result.update(run_notification_retention(cfg))
+    with get_db_cursor(cfg) as cursor:
+        cursor.execute("PRAGMA optimize")
+    return result
+
+
+class Scheduler:
+    """Runs jobs on one thread while this process holds the scheduler lease"""
+
+    def __init__(self, cfg, owner=None):
+        self.cfg = cfg
+        self.pid = os.getpid()
+        self.owner = owner or f"{socket.gethostname()}:{self.pid}"
+        self.tick = getattr(cfg, 'SCHEDULER_TICK', 5)
+        self.lease_seconds = getattr(cfg, 'SCHEDULER_LEASE_SECONDS', 60)
+        self.jobs = []
+        self.is_leader = False
+        self._lease_error = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._dispatcher = None
+
+    def add_job(self, name, interval, func):
+        """Schedule func every interval seconds (0 or None disables it)"""
+        if not interval:
+            return
+        # A random first run keeps restarts from lining every job up at once
+        first_run = time.monotonic() + random.uniform(0, min(interval, 60))
+        self.jobs.append(Job(name, interval, func, first_run))
+
+    def add_default_jobs(self):
+        """Reminders, outbox dispatch and maintenance from SCHEDULER_INTERVALS"""
+        intervals = getattr(self.cfg, 'SCHEDULER_INTERVALS', {})
+        self.add_job('reminders', intervals.get('reminders'), self._send_reminders)
+        self.add_job('outbox', intervals.get('outbox'), self._dispatch_outbox)
+        self.add_job('maintenance', intervals.get('maintenance'),
+                     lambda: run_maintenance(self.cfg))
+        return self
+
+    def _send_reminders(self):
+        results = ReminderRunner(self.cfg).run()
+        sent = {name: stats['sent'] for name, stats in results.items() if stats['sent']}
+        return sent or None
+
+    def _dispatch_outbox(self):
+        # One dispatcher for the scheduler's lifetime keeps SMTP sessions warm
+        if self._dispatcher is None:
+            self._dispatcher = OutboxDispatcher(self.cfg, worker_id=self.owner)
+        return self._dispatcher.run_once()
+
+    def _renew_lease(self):
+        """Take or keep leadership; any database error means not leader"""
+        try:
+            with get_db_cursor(self.cfg) as cursor:
+                leader = SchedulerLock.acquire(
+                    cursor, LOCK_NAME, self.owner, self.lease_seconds)
+            self._lease_error = None
+        except Exception as e:
+            # Report once per outage rather than every tick
+            if str(e) != self._lease_error:
+                print(f"⚠️  Scheduler lease check failed: {e}")
+            self._lease_error = str(e)
+            leader = False
+        if leader != self.is_leader:
+            print(f"🕒 [Scheduler] {self.owner} "
+                  f"{'is now running jobs' if leader else 'is standing by'}")
+            self.is_leader = leader
+        return leader
+
+    def run_pending(self):
+        """Run every job that is due, renewing the lease between jobs"""
+        for job in self.jobs:
+            if self._stop.is_set() or time.monotonic() < job.next_run:
+                continue
+            # A long job may outlive the lease; re-check before each one
+            if not self._renew_lease():
+                return
+            started = time.monotonic()
+            try:
+                result = job.func()
+                job.runs += 1
+                if result:
+                    print(f"🕒 [Scheduler] {job.name}: {result}")
+            except Exception as e:
+                job.failures += 1
+                print(f"❌ Scheduler job {job.name} failed: {e}")
+            job.last_duration = time.monotonic() - started
+            job.next_run = time.monotonic() + job.interval
+
+    def run_forever(self):
+        """Check for due jobs every tick until stop()"""
+        try:
+            while not self._stop.is_set():
+                if self._renew_lease():
+                    self.run_pending()
+                self._stop.wait(self.tick)
+        finally:
+            self._shutdown()
+
+    def start(self):
+        """Run the scheduler on a daemon thread"""
+        self._thread = threading.Thread(
+            target=self.run_forever, name='scheduler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, *args):
+        """Finish the current job, release the lease and stop"""
+        self._stop.set()
+
+    def _shutdown(self):
+        if self._dispatcher is not None:
+            self._dispatcher.close()
+        try:
+            with get_db_cursor(self.cfg) as cursor:
+                SchedulerLock.release(cursor, LOCK_NAME, self.owner)
+        except Exception as e:
+            print(f"⚠️  Could not release scheduler lease: {e}")
+        self.is_leader = False
+
+    def stats(self):
+        """Per-job run counts and timings"""
+        now = time.monotonic()
+        return {
+            'owner': self.owner,
+            'is_leader': self.is_leader,
+            'jobs': {job.name: {
+                'interval': job.interval,
+                'runs': job.runs,
+                'failures': job.failures,
+                'last_duration_ms': round(job.last_duration * 1000, 1),
+                'next_run_in': round(max(0.0, job.next_run - now), 1),
+            } for job in self.jobs},
+        }
+
+
+# Per-process scheduler started by the web app (SCHEDULER_IN_APP)
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_scheduler(cfg):
+    """
+    Start this process's in-app scheduler once. Call it in the process that
+    serves requests (gunicorn's post_fork hook, or the first request), never
+    before a fork: the child would get the scheduler but not its thread.
+    """
+    global _scheduler
+    # Every request calls this: skip the lock once this process has one
+    scheduler = _scheduler
+    if scheduler is not None and scheduler.pid == os.getpid():
+        return scheduler
+    with _scheduler_lock:
+        if _scheduler is None or _scheduler.pid != os.getpid():
+            _scheduler = Scheduler(cfg).add_default_jobs().start()
+        return _scheduler
+
+
+def main():
+    cfg = config['default']()
+    scheduler = Scheduler(cfg).add_default_jobs()
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    signal.signal(signal.SIGINT, scheduler.stop)
+
+    print(f"\n{'='*60}")
+    print(f"SCHEDULER - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"{'='*60}")
+    for job in scheduler.jobs:
+        print(f"  {job.name:<12} every {job.interval}s")
+    print()
+    scheduler.run_forever()
+
+
+if __name__ == '__main__':
+    main()
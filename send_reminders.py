@@ -1,90 +1,154 @@
 #!/usr/bin/env python3
 """
 Appointment Reminder Script
-Run this daily (e.g., via cron) to send appointment reminders
+Sends each configured reminder (REMINDER_WINDOWS, e.g. 24h and 2h before
+the visit) once per appointment. Safe to re-run at any time: sent reminders
+are recorded in appointment_reminders and skipped.
 
-Cron Example (run at 9 AM daily):
-0 9 * * * cd /path/to/project && python3 send_reminders.py
+Cron Example (every 15 minutes):
+*/15 * * * * cd /path/to/project && python3 send_reminders.py
 """
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from config import config
-from utils import get_db_connection
-from email_service import get_email_service
+from utils import get_db_cursor
+from models import Appointment, AppointmentReminder
+from email_service import EmailService, get_email_service
+
+
+class ReminderRunner:
+    """Streams due appointments in chunks and sends reminders concurrently"""
+
+    def __init__(self, cfg, windows=None, chunk_size=None, workers=None):
+        self.cfg = cfg
+        self.email_service = get_email_service(cfg)
+        self.windows = windows or getattr(cfg, 'REMINDER_WINDOWS', {'24h': 24})
+        self.chunk_size = chunk_size or getattr(cfg, 'REMINDER_CHUNK_SIZE', 200)
+        self.workers = workers or getattr(cfg, 'REMINDER_WORKERS', 4)
+        self.claim_timeout = getattr(cfg, 'REMINDER_CLAIM_TIMEOUT', 900)
+        self.stats = {}
+
+    def _render(self, claimed, today):
+        """Render reminders for a chunk of appointments in one pass"""
+        return self.email_service.render_bulk('appointment_reminder', [
+            dict(EmailService.reminder_context(
+                appt['patient_name'], appt['doctor_name'], appt['appointment_date'],
+                appt['appointment_time'], today), to_email=appt['patient_email'])
+            for appt in claimed])
+
+    def _send(self, item):
+        """Send one rendered reminder; returns (appointment, error or None)"""
+        appt, message = item
+        try:
+            self.email_service.deliver(*message)
+            return appt, None
+        except Exception as e:
+            return appt, e
+
+    def run_window(self, executor, reminder_type, start, end, today):
+        """Send reminder_type for appointments starting in (start, end]"""
+        stats = {'claimed': 0, 'sent': 0, 'failed': 0, 'skipped': 0}
+        # Without SMTP credentials nothing can be sent: leave the reminders
+        # unclaimed (skipped) for a run with email configured, instead of
+        # recording them as sent
+        enabled = self.email_service.enabled
+        after_id = 0
+        while True:
+            with get_db_cursor(self.cfg) as cursor:
+                chunk = Appointment.get_due_for_reminder(
+                    cursor, reminder_type, start, end, after_id,
+                    self.chunk_size, self.claim_timeout)
+                claimed = [appt for appt in chunk if enabled and AppointmentReminder.claim(
+                    cursor, appt['id'], reminder_type, self.claim_timeout)]
+            if not chunk:
+                break
+            after_id = chunk[-1]['id']
+            stats['claimed'] += len(claimed)
+            stats['skipped'] += len(chunk) - len(claimed)
+
+            sent, failed = [], []
+            try:
+                messages = self._render(claimed, today)
+            except Exception as e:
+                print(f"❌ Failed to render {reminder_type} reminders: {e}")
+                messages = []
+                failed = [appt['id'] for appt in claimed]
+            for appt, error in executor.map(self._send, zip(claimed, messages)):
+                if error is None:
+                    sent.append(appt['id'])
+                else:
+                    failed.append(appt['id'])
+                    print(f"❌ Failed to send {reminder_type} reminder to "
+                          f"{appt['patient_name']}: {error}")
+
+            with get_db_cursor(self.cfg) as cursor:
+                AppointmentReminder.mark_sent(cursor, reminder_type, sent)
+                AppointmentReminder.release(cursor, reminder_type, failed)
+            stats['sent'] += len(sent)
+            stats['failed'] += len(failed)
+
+            if len(chunk) < self.chunk_size:
+                break
+        if not enabled and stats['skipped']:
+            print(f"📧 [Email Service Disabled] {stats['skipped']} {reminder_type} "
+                  f"reminder(s) due, none sent")
+        return stats
+
+    def run(self, now=None):
+        """Run every window once; returns {reminder_type: stats}"""
+        now = now or datetime.now()
+        # Each appointment gets only the reminders whose window it falls in:
+        # with 24h and 2h, '24h' covers (now+2h, now+24h] and '2h' (now, now+2h]
+        ordered = sorted(self.windows.items(), key=lambda item: item[1])
+        with ThreadPoolExecutor(max_workers=self.workers,
+                                thread_name_prefix='reminder') as executor:
+            lower = now
+            for reminder_type, hours in ordered:
+                upper = now + timedelta(hours=hours)
+                started = time.monotonic()
+                stats = self.run_window(executor, reminder_type, lower, upper, now.date())
+                stats['seconds'] = time.monotonic() - started
+                self.stats[reminder_type] = stats
+                lower = upper
+        # The executor's threads have exited: log their sessions out, but
+        # leave the ones other senders (the outbox dispatcher) keep open
+        self.email_service.close_finished_sessions()
+        return self.stats
 
 
 def send_appointment_reminders():
-    """Send reminders for appointments happening tomorrow"""
+    """Send all reminders that are due now"""
 
     cfg = config['default']()
-    email_service = get_email_service(cfg)
+    runner = ReminderRunner(cfg)
 
-    # Get appointments for tomorrow
-    tomorrow = datetime.now().date() + timedelta(days=1)
+    print(f"\n{'='*60}")
+    print(
+        f"APPOINTMENT REMINDER SERVICE - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"{'='*60}")
+    print(f"Windows: {', '.join(runner.windows)} | chunk {runner.chunk_size} | "
+          f"{runner.workers} workers\n")
 
     try:
-        conn = get_db_connection(cfg)
-        cursor = conn.cursor()
-
-        # Query appointments for tomorrow with patient and doctor details
-        query = """
-            SELECT 
-                a.id,
-                a.appointment_date,
-                a.appointment_time,
-                p.full_name as patient_name,
-                p.user_id as patient_user_id,
-                d.full_name as doctor_name,
-                pu.email as patient_email
-            FROM appointments a
-            JOIN patients p ON a.patient_id = p.id
-            JOIN doctors d ON a.doctor_id = d.id
-            JOIN users pu ON p.user_id = pu.id
-            WHERE a.appointment_date = ? 
-            AND a.status = 'scheduled'
-        """
-
-        cursor.execute(query, (tomorrow,))
-        appointments = cursor.fetchall() or []
-
-        print(f"\n{'='*60}")
-        print(
-            f"APPOINTMENT REMINDER SERVICE - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"{'='*60}")
-        print(f"Checking appointments for: {tomorrow.strftime('%B %d, %Y')}")
-        print(f"Found {len(appointments)} appointment(s) to remind\n")
-
-        sent_count = 0
-        for appt in appointments:
-            try:
-                email_service.send_appointment_reminder(
-                    appt['patient_email'],
-                    appt['patient_name'],
-                    appt['doctor_name'],
-                    appt['appointment_date'],
-                    appt['appointment_time']
-                )
-                sent_count += 1
-                print(
-                    f"✅ Reminder sent to {appt['patient_name']} ({appt['patient_email']})")
-
-            except Exception as e:
-                print(
-                    f"❌ Failed to send reminder to {appt['patient_name']}: {e}")
-
-        cursor.close()
-        conn.close()
-
-        print(f"\n{'='*60}")
-        print(
-            f"Summary: {sent_count}/{len(appointments)} reminders sent successfully")
-        print(f"{'='*60}\n")
-
-        return sent_count
-
+        results = runner.run()
     except Exception as e:
         print(f"Error in reminder service: {e}")
         return 0
 
+    print(f"\n{'='*60}")
+    total_sent = 0
+    for reminder_type, stats in results.items():
+        rate = stats['sent'] / stats['seconds'] if stats['seconds'] else 0.0
+        print(f"{reminder_type:>5}: {stats['sent']}/{stats['claimed']} sent, "
+              f"{stats['failed']} failed, {stats['skipped']} skipped, "
+              f"{stats['seconds']:.2f}s ({rate:.1f}/s)")
+        total_sent += stats['sent']
+    print(f"Summary: {total_sent} reminder(s) sent")
+    print(f"{'='*60}\n")
+
+    return total_sent
+
 
 if __name__ == '__main__':
     send_appointment_reminders()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Slow Query Log
+Statements slower than SLOW_QUERY_THRESHOLD_MS are written, one JSON object
+per line, to a size-rotated log (SLOW_QUERY_LOG_PATH) with their
+EXPLAIN QUERY PLAN, so full table scans and temp sorts show up as tables
+grow. Cursors from get_db_cursor() report to it (see query_stats).
+
+The report groups the log by statement, slowest total first:
+
+    python3 slow_queries.py [--top N] [logfile ...]
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from flask import has_request_context, request
+
+# A ? placeholder outside string literals (literals are matched and kept)
+_PLACEHOLDER = re.compile(r"'(?:[^']|'')*'|\?")
+# IN (?, ?, ?) lists vary in length; one statement should group as one
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+
+
+def normalize_statement(sql):
+    """Collapse whitespace and placeholder lists so variants group together"""
+    return _IN_LIST.sub('(?...)', ' '.join(sql.split()))
+
+
+def sql_literal(value):
+    """Render a bound parameter as an SQL literal"""
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, bytes):
+        return f"X'{value.hex()}'"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def bind_parameters(sql, parameters):
+    """The statement with its parameters written in, for reading (not for running)"""
+    if isinstance(parameters, dict):
+        return re.sub(r"'(?:[^']|'')*'|[:@$](\w+)", lambda m: sql_literal(parameters[m.group(1)])
+                      if m.group(1) in parameters else m.group(0), sql)
+    values = iter(parameters or ())
+
+    def replace(match):
+        if match.group(0) != '?':
+            return match.group(0)
+        return sql_literal(next(values, None))
+    return _PLACEHOLDER.sub(replace, sql)
+
+
+def plan_warnings(plan):
+    """Flag full table scans and temp B-trees in EXPLAIN QUERY PLAN lines"""
+    warnings = []
+    for line in plan:
+        detail = line.strip()
+        # "SCAN t" reads the whole table; "SCAN t USING [COVERING] INDEX" walks
+        # an index and "SCAN t VIRTUAL TABLE" asks the module (FTS) for rows
+        if detail.startswith('SCAN ') and ' USING ' not in detail and ' VIRTUAL TABLE' not in detail:
+            warnings.append('full scan: ' + detail[5:])
+        elif detail.startswith('USE TEMP B-TREE'):
+            warnings.append('temp b-tree: ' + detail[len('USE TEMP B-TREE FOR '):])
+    return warnings
+
+
+def explain(connection, sql, parameters):
+    """EXPLAIN QUERY PLAN output as indented lines (empty if it can't be explained)"""
+    try:
+        rows = connection.execute(f"EXPLAIN QUERY PLAN {sql}", parameters or ()).fetchall()
+    except Exception:
+        return []
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node_id] + detail)
+    return lines
+
+
+class SlowQueryLog:
+    """Writes statements slower than threshold to a rotating JSON-lines log"""
+
+    def __init__(self, path, threshold_ms=100, max_bytes=5 * 1024 * 1024,
+                 backups=5, bind_params=True):
+        self.path = path
+        self.threshold = threshold_ms / 1000
+        self.bind_params = bind_params
+        self.logged = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._logger = logging.getLogger(f'slow_queries.{os.path.abspath(path)}')
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        if not self._logger.handlers:
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                          encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self._logger.addHandler(handler)
+
+        # Plans per statement text: one EXPLAIN per statement, not per execution
+        self._plans = {}
+        self._lock = threading.Lock()
+
+    def _plan(self, connection, sql, parameters):
+        plan = self._plans.get(sql)
+        if plan is None:
+            plan = explain(connection, sql, parameters)
+            with self._lock:
+                if len(self._plans) >= 1000:
+                    self._plans.clear()
+                self._plans[sql] = plan
+        return plan
+
+    def log(self, connection, sql, parameters, elapsed, many=False):
+        """Record one slow statement; never raises"""
+        try:
+            # executemany: explain with the first parameter set only
+            if many:
+                parameters = next(iter(parameters), ()) if isinstance(parameters, (list, tuple)) else ()
+            plan = self._plan(connection, sql, parameters)
+            entry = {
+                'ts': datetime.now().isoformat(timespec='milliseconds'),
+                'duration_ms': round(elapsed * 1000, 3),
+                'statement': normalize_statement(sql),
+                'plan': plan,
+                'warnings': plan_warnings(plan),
+                'pid': os.getpid(),
+            }
+            if self.bind_params:
+                entry['sql'] = ' '.join(bind_parameters(sql, parameters).split())
+            if many:
+                entry['executemany'] = True
+            if has_request_context():
+                entry['endpoint'] = request.endpoint
+                entry['path'] = request.path
+            self._logger.info(json.dumps(entry, default=str, ensure_ascii=False))
+            self.logged += 1
+        except Exception as e:
+            print(f"⚠️  Could not log slow query: {e}")
+
+
+# Slow query logs by config object (None when disabled)
+_logs = {}
+_logs_lock = threading.Lock()
+
+
+def get_slow_query_log(cfg):
+    """Get the slow query log for this config, or None if SLOW_QUERY_THRESHOLD_MS is off"""
+    try:
+        return _logs[cfg]
+    except KeyError:
+        pass
+    with _logs_lock:
+        if cfg not in _logs:
+            threshold = getattr(cfg, 'SLOW_QUERY_THRESHOLD_MS', None)
+            _logs[cfg] = SlowQueryLog(
+                getattr(cfg, 'SLOW_QUERY_LOG_PATH', 'slow_queries.log'),
+                threshold_ms=threshold,
+                max_bytes=getattr(cfg, 'SLOW_QUERY_LOG_MAX_BYTES', 5 * 1024 * 1024),
+                backups=getattr(cfg, 'SLOW_QUERY_LOG_BACKUPS', 5),
+                bind_params=getattr(cfg, 'SLOW_QUERY_LOG_BIND_PARAMS', True),
+            ) if threshold is not None else None
+        return _logs[cfg]
+
+
+# ============================================
+# OFFLINE REPORT
+# ============================================
+
+def read_entries(paths):
+    """Yield log entries from the given files, skipping lines that don't parse"""
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def summarize(entries):
+    """Group entries by statement; returns summaries, slowest total first"""
+    groups = {}
+    for entry in entries:
+        key = normalize_statement(entry['statement'])
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {'statement': key, 'durations': [], 'endpoints': {},
+                                   'slowest': entry, 'warnings': set()}
+        group['durations'].append(entry['duration_ms'])
+        if entry['duration_ms'] >= group['slowest']['duration_ms']:
+            group['slowest'] = entry
+        group['warnings'].update(plan_warnings(entry.get('plan', ())))
+        endpoint = entry.get('endpoint') or '-'
+        group['endpoints'][endpoint] = group['endpoints'].get(endpoint, 0) + 1
+
+    summaries = []
+    for group in groups.values():
+        durations = sorted(group['durations'])
+        summaries.append({
+            'statement': group['statement'],
+            'count': len(durations),
+            'total_ms': round(sum(durations), 3),
+            'avg_ms': round(sum(durations) / len(durations), 3),
+            'p95_ms': durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+            'max_ms': durations[-1],
+            'endpoints': group['endpoints'],
+            'warnings': sorted(group['warnings']),
+            'plan': group['slowest'].get('plan', []),
+            'example': group['slowest'].get('sql'),
+        })
+    summaries.sort(key=lambda summary: -summary['total_ms'])
+    return summaries
+
+
+def print_report(summaries, top=20):
+    """Print the grouped report"""
+    print(f"\n{'='*60}")
+    print(f"SLOW QUERIES - {sum(s['count'] for s in summaries)} entries, "
+          f"{len(summaries)} statements")
+    print(f"{'='*60}")
+    for rank, summary in enumerate(summaries[:top], 1):
+        print(f"\n#{rank}  {summary['count']}x  total {summary['total_ms']:.1f} ms  "
+              f"avg {summary['avg_ms']:.1f}  p95 {summary['p95_ms']:.1f}  "
+              f"max {summary['max_ms']:.1f}")
+        print(f"  {summary['statement'][:300]}")
+        endpoints = ', '.join(f"{name} ({count})" for name, count in
+                              sorted(summary['endpoints'].items(), key=lambda item: -item[1]))
+        print(f"  endpoints: {endpoints}")
+        for warning in summary['warnings']:
+            print(f"  ⚠️  {warning}")
+        if summary['plan']:
+            print("  plan:")
+            for line in summary['plan']:
+                print(f"    {line}")
+    print()
+
+
+def main(argv=None):
+    from config import config
+
+    parser = argparse.ArgumentParser(description='Summarize the slow query log')
+    parser.add_argument('logs', nargs='*', help='log files (default: the configured log and its backups)')
+    parser.add_argument('--top', type=int, default=20, help='statements to show')
+    parser.add_argument('--json', action='store_true', help='print the summaries as JSON')
+    args = parser.parse_args(argv)
+
+    paths = args.logs
+    if not paths:
+        path = getattr(config['default'], 'SLOW_QUERY_LOG_PATH', 'slow_queries.log')
+        paths = glob.glob(path + '.*') + [path]
+    paths = [path for path in paths if os.path.exists(path)]
+    if not paths:
+        print("No slow query log found")
+        return 1
+
+    started = time.monotonic()
+    summaries = summarize(read_entries(paths))
+    if args.json:
+        json.dump(summaries[:args.top], sys.stdout, indent=2)
+        print()
+    else:
+        print_report(summaries, args.top)
+        print(f"Read {len(paths)} file(s) in {time.monotonic() - started:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Admin Statistics Tests
+Changes users, doctors and appointments the ways the app does (inserts,
+verification, status and date changes, user deletes that cascade) and
+checks after each step that the trigger-maintained admin_stats and
+appointment_stats equal what AdminStats.rebuild() computes from scratch,
+with no zero-count appointment_stats rows left behind.
+
+    python -m pytest -q test_admin_stats.py
+"""
+from datetime import date
+
+import pytest
+
+from benchmarks import create_schema, open_database
+from models import AdminStats, User
+
+DAY = date(2030, 1, 7)
+NEXT_DAY = date(2030, 1, 8)
+
+
+@pytest.fixture
+def cursor(tmp_path):
+    connection = open_database(str(tmp_path / 'stats.db'))
+    create_schema(connection)
+    yield connection.cursor()
+    connection.close()
+
+
+def stats(cursor):
+    totals = AdminStats.get_totals(cursor)
+    cursor.execute("SELECT day, doctor_id, status, count FROM appointment_stats "
+                   "ORDER BY day, doctor_id, status")
+    return totals, [tuple(row) for row in cursor.fetchall()]
+
+
+def assert_matches_rebuild(cursor):
+    """The triggers' numbers equal a rebuild's; returns them"""
+    counted = stats(cursor)
+    cursor.execute("SAVEPOINT rebuild")
+    AdminStats.rebuild(cursor)
+    rebuilt = stats(cursor)
+    cursor.execute("ROLLBACK TO rebuild")
+    cursor.execute("RELEASE rebuild")
+    assert counted == rebuilt
+    assert all(count > 0 for *_, count in counted[1])
+    return counted
+
+
+def add_doctor(cursor, n, verified=0):
+    user_id = User.create(cursor, f"doctor{n}@test", 'x', 'doctor')
+    cursor.execute("""
+        INSERT INTO doctors (user_id, full_name, specialization, registration_number, is_verified)
+        VALUES (?, ?, 'Cardiology', ?, ?)
+    """, (user_id, f"Doctor {n}", f"REG-{n}", verified))
+    return user_id, cursor.lastrowid
+
+
+def add_patient(cursor, n):
+    user_id = User.create(cursor, f"patient{n}@test", 'x', 'patient')
+    cursor.execute("INSERT INTO patients (user_id, full_name) VALUES (?, ?)", (user_id, f"Patient {n}"))
+    return user_id, cursor.lastrowid
+
+
+def book(cursor, patient_id, doctor_id, day, time):
+    cursor.execute("""
+        INSERT INTO appointments (patient_id, doctor_id, appointment_date, appointment_time)
+        VALUES (?, ?, ?, ?)
+    """, (patient_id, doctor_id, day, time))
+    return cursor.lastrowid
+
+
+def test_triggers_match_rebuild(cursor):
+    assert_matches_rebuild(cursor)
+
+    doctor_user, doctor = add_doctor(cursor, 2)
+    patient_user, patient = add_patient(cursor, 2)
+    first = book(cursor, patient, doctor, DAY, '09:00:00')
+    second = book(cursor, patient, doctor, DAY, '09:30:00')
+    book(cursor, 1, doctor, NEXT_DAY, '09:00:00')
+    book(cursor, patient, 1, DAY, '10:00:00')
+    totals, _ = assert_matches_rebuild(cursor)
+    assert totals['pending_doctors'] == 1
+
+    cursor.execute("UPDATE doctors SET is_verified = 1 WHERE id = ?", (doctor,))
+    cursor.execute("UPDATE appointments SET status = 'cancelled' WHERE id = ?", (first,))
+    cursor.execute("UPDATE appointments SET status = 'completed' WHERE id = ?", (second,))
+    totals, _ = assert_matches_rebuild(cursor)
+    assert totals['pending_doctors'] == 0
+
+    # Moving the only appointment out of a (day, doctor, status) removes its row
+    cursor.execute("UPDATE appointments SET appointment_date = ? WHERE id = ?", (NEXT_DAY, second))
+    _, rows = assert_matches_rebuild(cursor)
+    assert (DAY, doctor, 'completed', 1) not in rows
+    assert (NEXT_DAY, doctor, 'completed', 1) in rows
+
+    # Cascades: patient -> appointments, doctor -> doctors -> appointments
+    User.delete(cursor, patient_user)
+    assert_matches_rebuild(cursor)
+    User.delete(cursor, doctor_user)
+    totals, rows = assert_matches_rebuild(cursor)
+    assert all(doctor_id != doctor for _, doctor_id, _, _ in rows)
+    assert totals['total_appointments'] == 0
+
+
+def test_get_day_reads_the_counts(cursor):
+    _, doctor = add_doctor(cursor, 2, verified=1)
+    first = book(cursor, 1, doctor, DAY, '09:00:00')
+    book(cursor, 1, doctor, DAY, '09:30:00')
+    book(cursor, 1, 1, DAY, '09:00:00')
+    cursor.execute("UPDATE appointments SET status = 'cancelled' WHERE id = ?", (first,))
+
+    assert AdminStats.get_day(cursor, DAY) == {'scheduled': 2, 'cancelled': 1}
+    assert AdminStats.get_day(cursor, DAY, doctor) == {'scheduled': 1, 'cancelled': 1}
+    cursor.execute("DELETE FROM appointments WHERE id = ?", (first,))
+    assert AdminStats.get_day(cursor, DAY, doctor) == {'scheduled': 1}
+    assert AdminStats.get_day(cursor, NEXT_DAY) == {}
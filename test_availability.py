@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Doctor Availability API Tests
+Checks the /patient/doctor/<id>/availability ETag contract: a repeat
+request with If-None-Match gets 304, and booking or changing the doctor's
+time slots changes the ETag, with booked times gone from the JSON.
+
+    python -m pytest -q test_availability.py
+"""
+from datetime import date, timedelta
+
+from conftest import DOCTOR, PATIENT, log_in
+from utils import get_db_cursor
+
+
+def next_weekday(name):
+    # Not today: a range including today mixes the current minute into the ETag
+    day = date.today() + timedelta(days=1)
+    while day.strftime('%A') != name:
+        day += timedelta(days=1)
+    return day
+
+
+MONDAY = next_weekday('Monday')
+TUESDAY = next_weekday('Tuesday')
+
+
+def availability(client, day, etag=None):
+    headers = {'If-None-Match': f'"{etag}"'} if etag else {}
+    return client.get(f'/patient/doctor/1/availability?start={day}&end={day}', headers=headers)
+
+
+def etag_of(response):
+    return response.get_etag()[0]
+
+
+def test_repeat_request_with_etag_is_not_modified(client):
+    log_in(client, PATIENT)
+    first = availability(client, MONDAY)
+    assert first.status_code == 200
+    assert first.json['dates'][MONDAY.isoformat()][0] == '09:00'
+
+    repeat = availability(client, MONDAY, etag_of(first))
+    assert repeat.status_code == 304
+    assert etag_of(repeat) == etag_of(first)
+    assert repeat.data == b''
+
+
+def test_booking_changes_etag_and_hides_the_time(client):
+    log_in(client, PATIENT)
+    before = availability(client, MONDAY)
+    assert '10:00' in before.json['dates'][MONDAY.isoformat()]
+
+    booked = client.post('/patient/book-appointment', data={
+        'doctor_id': '1',
+        'appointment_date': MONDAY.isoformat(),
+        'appointment_time': '10:00',
+        'reason': 'Checkup',
+    })
+    assert booked.status_code == 302
+    assert '/patient/appointment/' in booked.location
+
+    after = availability(client, MONDAY, etag_of(before))
+    assert after.status_code == 200
+    assert etag_of(after) != etag_of(before)
+    times = after.json['dates'][MONDAY.isoformat()]
+    assert '10:00' not in times
+    assert '09:30' in times and '10:30' in times
+
+
+def test_adding_and_deleting_a_slot_changes_etag(client, app_config):
+    log_in(client, PATIENT)
+    before = availability(client, TUESDAY)
+    assert before.json['dates'] == {}
+
+    log_in(client, DOCTOR)
+    client.post('/doctor/schedule/add', data={
+        'day_of_week': 'Tuesday', 'start_time': '09:00', 'end_time': '10:00', 'slot_duration': '30'})
+
+    log_in(client, PATIENT)
+    added = availability(client, TUESDAY, etag_of(before))
+    assert added.status_code == 200
+    assert etag_of(added) != etag_of(before)
+    assert added.json['dates'] == {TUESDAY.isoformat(): ['09:00', '09:30']}
+
+    with get_db_cursor(app_config) as cursor:
+        cursor.execute("SELECT id FROM time_slots WHERE doctor_id = 1 AND day_of_week = 'Tuesday'")
+        slot_id = cursor.fetchone()['id']
+    log_in(client, DOCTOR)
+    client.post(f'/doctor/schedule/delete/{slot_id}')
+
+    log_in(client, PATIENT)
+    deleted = availability(client, TUESDAY, etag_of(added))
+    assert deleted.status_code == 200
+    assert etag_of(deleted) not in (etag_of(added), etag_of(before))
+    assert deleted.json['dates'] == {}
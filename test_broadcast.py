@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Broadcast Fan-out Tests
+Runs broadcast() against a synthetic database with 100k patients and checks
+that every patient got one notification and one queued email, that the
+unread counters agree with the notifications table, and that the fan-out
+finishes in time without holding the write lock for long.
+
+    python -m pytest -q test_broadcast.py
+    BROADCAST_TEST_USERS=20000 python -m pytest -q test_broadcast.py
+"""
+import os
+import threading
+import time
+
+import pytest
+
+from benchmarks import build_synthetic_database, open_database
+from broadcast import broadcast
+from email_service import get_email_service
+
+USERS = int(os.environ.get('BROADCAST_TEST_USERS') or 100000)
+# Generous next to the ~4 s it takes here: catches a per-row regression
+TIME_LIMIT = 30
+# Longest a concurrent write may wait on a broadcast batch
+WRITE_WAIT_LIMIT = 1.5
+
+
+class BroadcastConfig:
+    MAIL_SERVER = '127.0.0.1'
+    MAIL_PORT = 25
+    MAIL_USE_TLS = False
+    MAIL_USERNAME = 'broadcast-test'
+    MAIL_PASSWORD = 'broadcast-test'
+    MAIL_DEFAULT_SENDER = 'noreply@broadcast.test'
+    BROADCAST_BATCH_SIZE = 1000
+    DB_PATH = None
+
+
+@pytest.fixture(scope='module')
+def broadcast_db(tmp_path_factory):
+    """Config pointing at a database with USERS patients and no notifications"""
+    path = str(tmp_path_factory.mktemp('broadcast') / 'broadcast.db')
+    connection = build_synthetic_database(path, doctors=10, patients=USERS, appointments=0)
+    connection.execute("DELETE FROM notifications")
+    connection.commit()
+    connection.close()
+    BroadcastConfig.DB_PATH = path
+    return BroadcastConfig
+
+
+def count(db, query):
+    connection = open_database(db.DB_PATH)
+    try:
+        return connection.execute(query).fetchone()[0]
+    finally:
+        connection.close()
+
+
+def test_broadcast_reaches_every_patient(broadcast_db, monkeypatch):
+    monkeypatch.setattr(get_email_service(broadcast_db), 'enabled', True)
+    patients = count(broadcast_db,
+                     "SELECT COUNT(*) FROM users WHERE role = 'patient' AND is_active = 1")
+    assert patients >= USERS
+
+    # A doctor keeps writing while the broadcast runs; each write may only
+    # wait for one batch to commit, never for the whole fan-out
+    waits = []
+    done = threading.Event()
+
+    def writer():
+        connection = open_database(broadcast_db.DB_PATH)
+        connection.execute("PRAGMA busy_timeout = 10000")
+        user_id = connection.execute(
+            "SELECT id FROM users WHERE role = 'doctor' LIMIT 1").fetchone()[0]
+        while not done.is_set():
+            started = time.perf_counter()
+            connection.execute(
+                "INSERT INTO notifications (user_id, title, message) VALUES (?, 'ping', 'ping')",
+                (user_id,))
+            connection.commit()
+            waits.append(time.perf_counter() - started)
+            time.sleep(0.01)
+        connection.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    started = time.perf_counter()
+    try:
+        result = broadcast(broadcast_db, ['patient'], 'Notice', 'Clinic closed Friday')
+    finally:
+        elapsed = time.perf_counter() - started
+        done.set()
+        thread.join()
+
+    assert result == {'notifications': patients, 'emails': patients}
+    assert count(broadcast_db, "SELECT COUNT(*) FROM notifications WHERE title = 'Notice'") \
+        == patients
+    assert count(broadcast_db, "SELECT COUNT(DISTINCT user_id) FROM notifications "
+                               "WHERE title = 'Notice'") == patients
+    assert count(broadcast_db, "SELECT COUNT(*) FROM email_outbox "
+                               "WHERE subject LIKE 'Notice%' AND status = 'pending'") == patients
+    assert count(broadcast_db, "SELECT SUM(unread) FROM notification_counters") \
+        == count(broadcast_db, "SELECT COUNT(*) FROM notifications WHERE is_read = 0")
+    assert elapsed < TIME_LIMIT, f"broadcast to {patients} users took {elapsed:.1f}s"
+    assert waits, "the concurrent writer never ran"
+    assert max(waits) < WRITE_WAIT_LIMIT, \
+        f"a concurrent write waited {max(waits):.2f}s for the broadcast"
+
+
+def test_broadcast_with_email_disabled_counts_no_emails(broadcast_db, monkeypatch):
+    monkeypatch.setattr(get_email_service(broadcast_db), 'enabled', False)
+    queued = count(broadcast_db, "SELECT COUNT(*) FROM email_outbox")
+    doctors = count(broadcast_db,
+                    "SELECT COUNT(*) FROM users WHERE role = 'doctor' AND is_active = 1")
+
+    result = broadcast(broadcast_db, ['doctor'], 'Staff meeting', 'Monday 9am')
+
+    assert result == {'notifications': doctors, 'emails': 0}
+    assert count(broadcast_db, "SELECT COUNT(*) FROM email_outbox") == queued
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Email Outbox Retry Tests
+Drives OutboxDispatcher against a fresh database with an SMTP stand-in
+that fails on demand: transient failures back off and retry until
+MAIL_OUTBOX_MAX_ATTEMPTS, then the message is dead; a claim older than
+MAIL_OUTBOX_CLAIM_TIMEOUT is picked up again; and a dispatcher whose claim
+was taken over cannot overwrite the new owner's result.
+
+    python -m pytest -q test_email_outbox.py
+"""
+import smtplib
+
+import pytest
+
+from benchmarks import create_schema, open_database
+from email_dispatcher import OutboxDispatcher
+from models import EmailOutbox
+from utils import get_db_cursor
+
+
+class OutboxConfig:
+    DB_PATH = None
+    MAIL_SERVER = '127.0.0.1'
+    MAIL_PORT = 25
+    MAIL_USE_TLS = False
+    MAIL_USERNAME = 'outbox-test'
+    MAIL_PASSWORD = 'outbox-test'
+    MAIL_DEFAULT_SENDER = 'noreply@outbox.test'
+    MAIL_WORKERS = 2
+    MAIL_OUTBOX_MAX_ATTEMPTS = 3
+    MAIL_OUTBOX_BACKOFF_BASE = 30
+    MAIL_OUTBOX_BACKOFF_MAX = 3600
+    MAIL_OUTBOX_CLAIM_TIMEOUT = 300
+
+
+class FakeSMTP:
+    """Records deliveries; raises error instead while it is set"""
+
+    def __init__(self):
+        self.delivered = []
+        self.error = None
+
+    def deliver(self, to_email, subject, html_content, text_content):
+        if self.error is not None:
+            raise self.error
+        self.delivered.append(to_email)
+
+    def close_finished_sessions(self):
+        pass
+
+
+@pytest.fixture
+def cfg(tmp_path):
+    connection = open_database(str(tmp_path / 'outbox.db'))
+    create_schema(connection)
+    connection.commit()
+    connection.close()
+    OutboxConfig.DB_PATH = str(tmp_path / 'outbox.db')
+    with get_db_cursor(OutboxConfig) as cursor:
+        EmailOutbox.enqueue(cursor, 'jane@example.com', 'Hello', '<p>Hi</p>', 'Hi')
+    return OutboxConfig
+
+
+@pytest.fixture
+def smtp():
+    return FakeSMTP()
+
+
+def dispatcher(cfg, smtp, worker_id):
+    dispatcher = OutboxDispatcher(cfg, worker_id=worker_id)
+    dispatcher.email_service = smtp
+    return dispatcher
+
+
+def message(cfg):
+    with get_db_cursor(cfg) as cursor:
+        cursor.execute("""
+            SELECT status, attempts, claimed_by, last_error,
+                   (julianday(next_attempt_at) - julianday('now')) * 86400 AS due_in
+            FROM email_outbox
+        """)
+        return dict(cursor.fetchone())
+
+
+def make_due(cfg):
+    """Skip the backoff wait"""
+    with get_db_cursor(cfg) as cursor:
+        cursor.execute("UPDATE email_outbox SET next_attempt_at = datetime('now', '-1 second')")
+
+
+def test_transient_failures_back_off_then_die(cfg, smtp):
+    smtp.error = smtplib.SMTPServerDisconnected('connection lost')
+    worker = dispatcher(cfg, smtp, 'worker-a')
+    try:
+        # Attempt 1 waits about BACKOFF_BASE, attempt 2 about twice that (+/-20%)
+        for attempts, delay in ((1, 30), (2, 60)):
+            assert worker.run_once() == 1
+            state = message(cfg)
+            assert state['status'] == 'pending'
+            assert state['attempts'] == attempts
+            assert state['claimed_by'] is None
+            assert 'SMTPServerDisconnected' in state['last_error']
+            assert delay * 0.8 - 2 <= state['due_in'] <= delay * 1.2 + 2
+            # Not due yet: nothing to claim
+            assert worker.run_once() == 0
+            make_due(cfg)
+
+        assert worker.run_once() == 1
+        state = message(cfg)
+        assert state['status'] == 'dead'
+        assert state['attempts'] == cfg.MAIL_OUTBOX_MAX_ATTEMPTS
+        assert (worker.retried, worker.dead, worker.sent) == (2, 1, 0)
+
+        make_due(cfg)
+        assert worker.run_once() == 0
+    finally:
+        worker.close()
+    assert smtp.delivered == []
+
+
+def test_permanent_failure_dies_at_once(cfg, smtp):
+    smtp.error = smtplib.SMTPRecipientsRefused({'jane@example.com': (550, b'no such user')})
+    worker = dispatcher(cfg, smtp, 'worker-a')
+    try:
+        assert worker.run_once() == 1
+    finally:
+        worker.close()
+    assert message(cfg)['status'] == 'dead'
+    assert message(cfg)['attempts'] == 1
+
+
+def test_stale_claim_is_picked_up_again(cfg, smtp):
+    # A dispatcher claimed the message and died before recording a result
+    with get_db_cursor(cfg) as cursor:
+        assert len(EmailOutbox.claim_batch(cursor, 'crashed', claim_timeout=300)) == 1
+
+    worker = dispatcher(cfg, smtp, 'worker-b')
+    try:
+        # Still inside the claim timeout: left alone
+        assert worker.run_once() == 0
+        with get_db_cursor(cfg) as cursor:
+            cursor.execute("UPDATE email_outbox SET claimed_at = datetime('now', '-301 seconds')")
+        assert worker.run_once() == 1
+    finally:
+        worker.close()
+
+    state = message(cfg)
+    assert state['status'] == 'sent'
+    assert state['attempts'] == 2
+    assert smtp.delivered == ['jane@example.com']
+
+
+def test_late_result_cannot_overwrite_the_new_owner(cfg, smtp):
+    with get_db_cursor(cfg) as cursor:
+        [first] = EmailOutbox.claim_batch(cursor, 'worker-a', claim_timeout=300)
+        cursor.execute("UPDATE email_outbox SET claimed_at = datetime('now', '-301 seconds')")
+
+    # worker-b takes the message over and its send fails
+    smtp.error = smtplib.SMTPServerDisconnected('connection lost')
+    worker = dispatcher(cfg, smtp, 'worker-b')
+    try:
+        assert worker.run_once() == 1
+    finally:
+        worker.close()
+    assert message(cfg)['status'] == 'pending'
+
+    # worker-a's send finally returns: its results touch nothing
+    with get_db_cursor(cfg) as cursor:
+        assert EmailOutbox.mark_sent(cursor, 'worker-a', [first['id']]) == 0
+        assert EmailOutbox.reschedule(cursor, 'worker-a', [(5, 'late', first['id'])]) == 0
+        assert EmailOutbox.mark_dead(cursor, 'worker-a', [('late', first['id'])]) == 0
+    state = message(cfg)
+    assert state['status'] == 'pending'
+    assert state['attempts'] == 2
+    assert 'SMTPServerDisconnected' in state['last_error']
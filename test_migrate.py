@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Schema Migration Tests
+Adopts a database made from the version 0 baseline, migrates it while
+another connection keeps writing, and checks that the result matches
+database_schema.sql and that the tables the migrations fill (search
+index, counters, statistics) agree with the rows they summarize.
+
+    python -m pytest -q test_migrate.py
+"""
+import sqlite3
+import threading
+
+import pytest
+
+from migrate import (BASELINE_FILE, MigrationError, load_migrations, schema_drift,
+                     schema_statements, status, upgrade)
+
+
+class MigrateConfig:
+    DB_PATH = None
+    MIGRATION_BATCH_SIZE = 100
+    MIGRATION_BATCH_PAUSE = 0
+    MIGRATION_STEP_PAUSE = 0
+
+
+def baseline_database(path, doctors=300, appointments=5000):
+    """A pre-migrations database: baseline.sql, its seed data and some volume"""
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode = WAL")
+    for statement in schema_statements(BASELINE_FILE):
+        connection.execute(statement)
+    connection.execute(f"""
+        INSERT INTO users (email, password, role)
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {doctors})
+        SELECT 'doctor' || i || '@test', 'x', 'doctor' FROM n
+    """)
+    connection.execute("""
+        INSERT INTO doctors (user_id, full_name, specialization, registration_number, is_verified)
+        SELECT id, 'Doctor ' || id, 'Cardiology', 'REG' || id, id % 2
+        FROM users WHERE email LIKE 'doctor%@test'
+    """)
+    connection.execute(f"""
+        INSERT INTO appointments (patient_id, doctor_id, appointment_date, appointment_time, status)
+        WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < {appointments - 1})
+        SELECT 1, 1 + i % {doctors + 1}, date('2025-01-01', '+' || (i / {doctors + 1}) || ' days'),
+               '09:00:00', CASE i % 3 WHEN 0 THEN 'scheduled' WHEN 1 THEN 'completed' ELSE 'cancelled' END
+        FROM n
+    """)
+    connection.execute("""
+        INSERT INTO notifications (user_id, title, message, is_read)
+        SELECT id, 'Welcome', 'Hello', id % 2 FROM users
+    """)
+    connection.commit()
+    connection.close()
+    MigrateConfig.DB_PATH = path
+    return MigrateConfig
+
+
+def mismatches(connection, query, expected):
+    """Rows of query missing from expected or the other way round"""
+    return connection.execute(
+        f"SELECT (SELECT COUNT(*) FROM ({query} EXCEPT {expected})) "
+        f"+ (SELECT COUNT(*) FROM ({expected} EXCEPT {query}))").fetchone()[0]
+
+
+def test_upgrade_adopts_a_baseline_database_under_writes(tmp_path):
+    cfg = baseline_database(str(tmp_path / 'baseline.db'))
+    done = threading.Event()
+    errors = []
+
+    def writer():
+        connection = sqlite3.connect(cfg.DB_PATH, timeout=30)
+        i = 0
+        while not done.is_set():
+            i += 1
+            try:
+                connection.execute(
+                    "INSERT INTO notifications (user_id, title, message) VALUES (?, 'ping', 'ping')",
+                    (1 + i % 50,))
+                connection.execute("UPDATE notifications SET is_read = 1 - is_read WHERE id = ?", (i,))
+                connection.execute("UPDATE doctors SET bio = 'bio ' || ?, is_verified = 1 - is_verified "
+                                   "WHERE id = ?", (i, 1 + i % 300))
+                connection.execute("UPDATE appointments SET status = 'cancelled' WHERE id = ?", (i,))
+                connection.commit()
+            except sqlite3.Error as e:
+                errors.append(e)
+                connection.rollback()
+        connection.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        applied = upgrade(cfg, report=False)
+    finally:
+        done.set()
+        thread.join()
+
+    assert not errors
+    assert applied == [migration.version for migration in load_migrations()]
+    assert status(cfg) == {'version': len(applied), 'pending': [], 'drift': []}
+
+    connection = sqlite3.connect(cfg.DB_PATH)
+    # Raises if the search index disagrees with doctors
+    connection.execute("INSERT INTO doctors_fts (doctors_fts, rank) VALUES ('integrity-check', 1)")
+    assert mismatches(
+        connection, "SELECT user_id, unread FROM notification_counters WHERE unread != 0",
+        "SELECT user_id, COUNT(*) FROM notifications WHERE is_read = 0 GROUP BY user_id") == 0
+    assert mismatches(
+        connection, "SELECT day, doctor_id, status, count FROM appointment_stats",
+        "SELECT appointment_date, doctor_id, status, COUNT(*) FROM appointments "
+        "GROUP BY appointment_date, doctor_id, status") == 0
+    assert dict(connection.execute("SELECT name, value FROM admin_stats")) == dict(connection.execute("""
+        SELECT 'doctors', COUNT(*) FROM users WHERE role = 'doctor'
+        UNION ALL SELECT 'patients', COUNT(*) FROM users WHERE role = 'patient'
+        UNION ALL SELECT 'appointments', COUNT(*) FROM appointments
+        UNION ALL SELECT 'verified_doctors', COUNT(*) FROM doctors WHERE is_verified = 1
+        UNION ALL SELECT 'pending_doctors', COUNT(*) FROM doctors WHERE COALESCE(is_verified, 0) != 1
+    """))
+    assert connection.execute("SELECT COUNT(*) FROM doctors WHERE id NOT IN "
+                              "(SELECT doctor_id FROM doctor_schedule_versions)").fetchone()[0] == 0
+    connection.close()
+
+
+def test_new_database_matches_the_schema(tmp_path):
+    MigrateConfig.DB_PATH = str(tmp_path / 'new.db')
+    assert upgrade(MigrateConfig, report=False) == []
+    connection = sqlite3.connect(MigrateConfig.DB_PATH)
+    assert schema_drift(connection) == []
+    connection.close()
+
+
+def test_adoption_refuses_an_unknown_schema(tmp_path):
+    cfg = baseline_database(str(tmp_path / 'custom.db'), doctors=1, appointments=1)
+    connection = sqlite3.connect(cfg.DB_PATH)
+    connection.execute("DROP INDEX idx_users_role")
+    connection.execute("CREATE INDEX idx_users_created ON users(created_at)")
+    connection.close()
+
+    with pytest.raises(MigrationError,
+                       match='missing index idx_users_role; unexpected index idx_users_created'):
+        upgrade(cfg, report=False)
+    assert status(cfg)['version'] is None
+
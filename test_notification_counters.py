@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Notification Counter Tests
+Creates, reads and deletes notifications through the Notification model and
+checks after every commit that notification_counters (kept by triggers)
+matches a COUNT(*) over notifications, and that Notification.get_unread_count
+serves the new value rather than one cached before the write.
+
+    python -m pytest -q test_notification_counters.py
+"""
+import pytest
+
+from benchmarks import create_schema, open_database
+from models import Notification, User
+from utils import get_db_cursor
+
+USERS = [4, 5, 6]
+
+
+class CounterConfig:
+    DB_PATH = None
+
+
+@pytest.fixture
+def cfg(tmp_path):
+    """Seed database plus USERS patients without notifications"""
+    connection = open_database(str(tmp_path / 'counters.db'))
+    create_schema(connection)
+    for user_id in USERS:
+        connection.execute("INSERT INTO users (id, email, password, role) VALUES (?, ?, 'x', 'patient')",
+                           (user_id, f"patient{user_id}@example.com"))
+    connection.commit()
+    connection.close()
+    CounterConfig.DB_PATH = str(tmp_path / 'counters.db')
+    Notification.unread_cache.clear()
+    yield CounterConfig
+    Notification.unread_cache.clear()
+
+
+def unread_counts(cfg):
+    """{user_id: (COUNT(*) of unread, notification_counters, get_unread_count)}"""
+    with get_db_cursor(cfg) as cursor:
+        cursor.execute("SELECT user_id, COUNT(*) FROM notifications WHERE is_read = 0 GROUP BY user_id")
+        counted = dict(cursor.fetchall())
+        cursor.execute("SELECT user_id, unread FROM notification_counters")
+        counters = dict(cursor.fetchall())
+        return {user_id: (counted.get(user_id, 0), counters.get(user_id, 0),
+                          Notification.get_unread_count(cursor, user_id))
+                for user_id in USERS}
+
+
+def assert_unread(cfg, expected):
+    assert unread_counts(cfg) == {user_id: (count,) * 3 for user_id, count in expected.items()}
+
+
+def test_counters_and_cache_follow_every_write(cfg):
+    # Cache a zero for everyone first, so a missed invalidation shows up
+    assert_unread(cfg, {4: 0, 5: 0, 6: 0})
+
+    with get_db_cursor(cfg) as cursor:
+        first = Notification.create(cursor, 4, 'Hello', 'One')
+        Notification.create(cursor, 4, 'Hello', 'Two')
+    assert_unread(cfg, {4: 2, 5: 0, 6: 0})
+
+    with get_db_cursor(cfg) as cursor:
+        Notification.bulk_create(cursor, USERS, 'News', 'For everyone')
+    assert_unread(cfg, {4: 3, 5: 1, 6: 1})
+
+    with get_db_cursor(cfg) as cursor:
+        Notification.mark_as_read(cursor, first)
+        # Marking it again changes nothing
+        Notification.mark_as_read(cursor, first)
+    assert_unread(cfg, {4: 2, 5: 1, 6: 1})
+
+    with get_db_cursor(cfg) as cursor:
+        assert Notification.mark_all_read(cursor, 5) == 1
+    assert_unread(cfg, {4: 2, 5: 0, 6: 1})
+
+    with get_db_cursor(cfg) as cursor:
+        assert User.delete(cursor, 4) == 1
+    assert_unread(cfg, {4: 0, 5: 0, 6: 1})
+    with get_db_cursor(cfg) as cursor:
+        cursor.execute("SELECT COUNT(*) FROM notification_counters WHERE user_id = 4")
+        assert cursor.fetchone()[0] == 0
+
+
+def test_cache_is_invalidated_only_after_commit(cfg):
+    assert_unread(cfg, {4: 0, 5: 0, 6: 0})
+
+    with get_db_cursor(cfg) as cursor:
+        Notification.create(cursor, 6, 'Hello', 'One')
+        # Until the commit other connections still read 0: so must the cache
+        assert Notification.unread_cache.get(6) == 0
+    assert Notification.unread_cache.get(6) is None
+    assert_unread(cfg, {4: 0, 5: 0, 6: 1})
+
+
+def test_rolled_back_write_leaves_the_cache_alone(cfg):
+    assert_unread(cfg, {4: 0, 5: 0, 6: 0})
+
+    with pytest.raises(RuntimeError):
+        with get_db_cursor(cfg) as cursor:
+            Notification.bulk_create(cursor, USERS, 'News', 'For everyone')
+            raise RuntimeError('abort')
+    assert Notification.unread_cache.get(5) == 0
+    assert_unread(cfg, {4: 0, 5: 0, 6: 0})
+
+
+def test_rebuild_matches_the_triggers(cfg):
+    with get_db_cursor(cfg) as cursor:
+        Notification.bulk_create(cursor, USERS * 3, 'News', 'Three each')
+        Notification.mark_all_read(cursor, 6)
+    expected = unread_counts(cfg)
+
+    with get_db_cursor(cfg) as cursor:
+        cursor.execute("UPDATE notification_counters SET unread = 99")
+        Notification.rebuild_unread_counts(cursor)
+    assert unread_counts(cfg) == expected
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Keyset Pagination Tests
+Walks the admin appointment list (Appointment.get_page, newest first) page
+by page with next/prev cursors over appointments that tie on date and
+time, and checks that every appointment shows up once, in order, both ways.
+
+    python -m pytest -q test_pagination.py
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from benchmarks import create_schema, open_database
+from models import Appointment, decode_cursor
+
+DOCTORS = 3
+DAYS = 7
+PER_PAGE = 4
+
+
+@pytest.fixture
+def cursor(tmp_path):
+    """Seed database plus DOCTORS doctors booked at 09:00 on each of DAYS days"""
+    connection = open_database(str(tmp_path / 'pages.db'))
+    create_schema(connection)
+    cursor = connection.cursor()
+    for n in range(2, DOCTORS + 1):
+        cursor.execute("INSERT INTO users (email, password, role) VALUES (?, 'x', 'doctor')",
+                       (f"doctor{n}@test",))
+        cursor.execute("""
+            INSERT INTO doctors (user_id, full_name, specialization, registration_number)
+            VALUES (?, ?, 'Cardiology', ?)
+        """, (cursor.lastrowid, f"Doctor {n}", f"REG-{n}"))
+    start = date.today() + timedelta(days=30)
+    # Day-major, so ids don't follow the (date, time) order
+    for doctor_id in range(1, DOCTORS + 1):
+        for day in range(DAYS):
+            cursor.execute("""
+                INSERT INTO appointments (patient_id, doctor_id, appointment_date, appointment_time)
+                VALUES (1, ?, ?, '09:00:00')
+            """, (doctor_id, start + timedelta(days=day)))
+    connection.commit()
+    yield cursor
+    connection.close()
+
+
+def expected_order(cursor):
+    cursor.execute("SELECT id FROM appointments "
+                   "ORDER BY appointment_date DESC, appointment_time DESC, id DESC")
+    return [row['id'] for row in cursor.fetchall()]
+
+
+def ids(page):
+    return [appointment['id'] for appointment in page]
+
+
+def test_walk_forward_then_back_over_ties(cursor):
+    expected = expected_order(cursor)
+
+    pages = [Appointment.get_page(cursor, per_page=PER_PAGE)]
+    while pages[-1].has_next:
+        pages.append(Appointment.get_page(cursor, after=pages[-1].next_cursor, per_page=PER_PAGE))
+    assert [i for page in pages for i in ids(page)] == expected
+    assert len(pages) == -(-DOCTORS * DAYS // PER_PAGE)
+    assert not pages[-1].has_next
+
+    # Back from the last page, one prev cursor at a time
+    page = pages[-1]
+    for previous in reversed(pages[:-1]):
+        page = Appointment.get_page(cursor, before=page.prev_cursor, per_page=PER_PAGE)
+        assert ids(page) == ids(previous)
+    assert not page.has_prev
+    assert page.has_next
+
+
+def test_first_page_has_no_prev(cursor):
+    page = Appointment.get_page(cursor, per_page=PER_PAGE)
+    assert not page.has_prev
+    assert page.prev_cursor is None
+    assert page.has_next
+
+
+@pytest.mark.parametrize('token', ['garbage', 'MjAyNS0wMS0wMXwwOTowMA', '!!!'])
+def test_invalid_cursor_falls_back_to_first_page(cursor, token):
+    assert decode_cursor(token) is None
+    first = Appointment.get_page(cursor, per_page=PER_PAGE)
+    page = Appointment.get_page(cursor, after=token, per_page=PER_PAGE)
+    assert ids(page) == ids(first)
+    assert not page.has_prev
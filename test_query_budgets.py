@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Route Query Budget Tests
+Drives the busiest write routes through the Flask test client under
+query_budget(), so a change that adds a query per row (an N+1) or another
+lookup to the request fails here. Budgets are the statement counts the
+routes run today; lower them when a route gets cheaper.
+
+    python -m pytest -q test_query_budgets.py
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import DOCTOR, PATIENT, log_in
+from email_service import get_email_service
+from query_stats import QueryBudgetExceeded, query_budget
+from utils import get_db_cursor
+
+# Statements each route may run (see the route for the chain), with email
+# enabled: each email is one email_outbox insert in the route's transaction
+BOOK_APPOINTMENT_BUDGET = 10
+UPDATE_APPOINTMENT_BUDGET = 5
+CANCEL_APPOINTMENT_BUDGET = 7
+
+
+@pytest.fixture(autouse=True)
+def email_enabled(app_config, monkeypatch):
+    """Send as a configured server would: into the outbox (nothing reaches SMTP)"""
+    monkeypatch.setattr(get_email_service(app_config), 'enabled', True)
+
+
+def outbox(app_config):
+    with get_db_cursor(app_config) as cursor:
+        cursor.execute("SELECT to_email, subject FROM email_outbox ORDER BY id")
+        return [tuple(row) for row in cursor.fetchall()]
+
+
+def next_weekday(name):
+    day = date.today() + timedelta(days=1)
+    while day.strftime('%A') != name:
+        day += timedelta(days=1)
+    return day
+
+
+def book(client, appointment_time):
+    return client.post('/patient/book-appointment', data={
+        'doctor_id': '1',
+        'appointment_date': next_weekday('Monday').isoformat(),
+        'appointment_time': appointment_time,
+        'reason': 'Checkup',
+    })
+
+
+def test_book_appointment_query_budget(client, app_config):
+    log_in(client, PATIENT)
+    queued = len(outbox(app_config))
+    with query_budget(BOOK_APPOINTMENT_BUDGET) as stats:
+        response = book(client, '09:30')
+
+    assert response.status_code == 302
+    assert '/patient/appointment/' in response.location
+    assert stats.count == BOOK_APPOINTMENT_BUDGET
+    # The request's own recorder saw the same statements
+    assert f'desc="{stats.count} queries"' in response.headers['Server-Timing']
+    # Confirmation to the patient, notice to the doctor
+    assert [to for to, _ in outbox(app_config)[queued:]] == [
+        PATIENT['email'], DOCTOR['email']]
+
+
+def test_update_appointment_query_budget(client):
+    log_in(client, PATIENT)
+    appointment_id = int(book(client, '10:00').location.rstrip('/').split('/')[-1])
+
+    log_in(client, DOCTOR)
+    with query_budget(UPDATE_APPOINTMENT_BUDGET) as stats:
+        response = client.post(f'/doctor/appointment/{appointment_id}/update',
+                               data={'status': 'confirmed', 'notes': 'Bring reports'})
+
+    assert response.status_code == 302
+    assert f'/doctor/appointment/{appointment_id}' in response.location
+    assert stats.count == UPDATE_APPOINTMENT_BUDGET
+
+
+def test_cancel_appointment_query_budget(client, app_config):
+    log_in(client, PATIENT)
+    appointment_id = int(book(client, '11:00').location.rstrip('/').split('/')[-1])
+    queued = len(outbox(app_config))
+
+    log_in(client, DOCTOR)
+    with query_budget(CANCEL_APPOINTMENT_BUDGET) as stats:
+        response = client.post(f'/doctor/appointment/{appointment_id}/update',
+                               data={'status': 'cancelled'})
+
+    assert response.status_code == 302
+    assert stats.count == CANCEL_APPOINTMENT_BUDGET
+    assert [to for to, _ in outbox(app_config)[queued:]] == [PATIENT['email']]
+
+
+def test_query_budget_fails_an_extra_query(client):
+    log_in(client, PATIENT)
+    with pytest.raises(QueryBudgetExceeded, match=f'budget is {BOOK_APPOINTMENT_BUDGET - 1}'):
+        with query_budget(BOOK_APPOINTMENT_BUDGET - 1):
+            book(client, '10:30')
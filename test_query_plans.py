@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Query Plan Regression Tests
+Runs the model queries against a synthetic database and checks each
+statement's EXPLAIN QUERY PLAN against the access path pinned for it below,
+so a schema or query change that loses an index fails here instead of
+showing up as a slow page in production.
+
+Every case runs twice: on a database with ANALYZE statistics (what
+PRAGMA optimize in the scheduler maintains) and on the same data without
+them (a fresh install). Write cases run inside a transaction that is rolled
+back.
+
+    python -m pytest -q test_query_plans.py
+    QUERY_PLAN_SCALE=5 python -m pytest -q test_query_plans.py   # 5x the rows
+
+When a plan change is intended, update the pin in PLAN_CASES.
+"""
+import os
+import re
+import shutil
+import sqlite3
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from benchmarks import build_synthetic_database, open_database
+from models import (User, Doctor, Patient, TimeSlot, Appointment, AppointmentReminder,
+                    Notification, EmailOutbox, SchedulerLock, AdminStats)
+
+SCALE = float(os.environ.get('QUERY_PLAN_SCALE') or 1)
+
+
+class PlanCursor(sqlite3.Cursor):
+    """Cursor that records each statement's EXPLAIN QUERY PLAN, then runs it"""
+    plans = None
+
+    def _explain(self, sql, parameters):
+        rows = self.connection.execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+        self.plans.append((' '.join(sql.split()), [row[3] for row in rows]))
+
+    def execute(self, sql, parameters=()):
+        self._explain(sql, parameters)
+        return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        if seq_of_parameters:
+            self._explain(sql, seq_of_parameters[0])
+        return super().executemany(sql, seq_of_parameters)
+
+
+# SCAN/SEARCH lines name the table (or its alias) and how it is read
+_ACCESS = re.compile(
+    r'^(?P<op>SCAN|SEARCH) (?P<table>\S+)'
+    r'(?: USING (?:(?:COVERING )?INDEX (?P<index>\S+)|(?:INTEGER )?PRIMARY KEY)'
+    r'| (?P<virtual>VIRTUAL TABLE))?')
+
+# Access paths in pins: an index name, or one of these
+PK = 'PK'            # rowid / primary key lookup
+SCAN = 'SCAN'        # full table scan: pin only where reading everything is the point
+VIRTUAL = 'VIRTUAL'  # FTS virtual table
+
+
+def table_accesses(plan):
+    """[(table, access)] for each table read in a plan"""
+    accesses = []
+    for line in plan:
+        match = _ACCESS.match(line)
+        if not match or match['table'] == 'CONSTANT':
+            continue
+        if match['index']:
+            access = match['index']
+        elif match['virtual']:
+            access = VIRTUAL
+        elif 'PRIMARY KEY' in line or (match['op'] == 'SEARCH' and line == f"SEARCH {match['table']}"):
+            # A bare "SEARCH t" is the MIN()/MAX() seek to one end of the rowid
+            access = PK
+        else:
+            access = SCAN
+        accesses.append((match['table'], access))
+    return accesses
+
+
+# name: test id; run(cursor, data): calls the model; expect: {table: access or
+# (accesses,)} covering every table the statements read; sorts: whether a
+# temp B-tree for ORDER BY / GROUP BY is expected
+PlanCase = namedtuple('PlanCase', ('name', 'run', 'expect', 'sorts'), defaults=(False,))
+
+PLAN_CASES = [
+    # Users
+    # Inserting a row compiles the ON DELETE CASCADE programs of its child
+    # tables too: each needs an index on the child's foreign key
+    PlanCase('User.create', lambda c, d: User.create(c, 'new@plan.test', 'x', 'patient'),
+             {'doctors': 'sqlite_autoindex_doctors_1', 'patients': 'sqlite_autoindex_patients_1',
+              'notifications': 'idx_notifications_user_read', 'notification_counters': PK,
+              'notifications_archive': 'idx_notifications_archive_user'}),
+    PlanCase('User.get_by_email', lambda c, d: User.get_by_email(c, d['patient_email']),
+             {'users': 'sqlite_autoindex_users_1'}),
+    PlanCase('User.get_by_id', lambda c, d: User.get_by_id(c, d['patient_user_id']), {'users': PK}),
+    PlanCase('User.update_password', lambda c, d: User.update_password(c, d['patient_user_id'], 'y'),
+             {'users': PK}),
+    PlanCase('User.delete', lambda c, d: User.delete(c, d['patient_user_id']),
+             {'users': PK, 'doctors': 'sqlite_autoindex_doctors_1',
+              'patients': 'sqlite_autoindex_patients_1',
+              'notifications': 'idx_notifications_user_read', 'notification_counters': PK,
+              'notifications_archive': 'idx_notifications_archive_user'}),
+    PlanCase('User.get_recipients', lambda c, d: User.get_recipients(c, ['patient'], 1000, 500),
+             {'u': 'idx_users_role', 'p': 'sqlite_autoindex_patients_1',
+              'd': 'sqlite_autoindex_doctors_1'}),
+
+    # Doctors
+    PlanCase('Doctor.create', lambda c, d: Doctor.create(
+        c, d['patient_user_id'], 'Dr. Plan', 'Cardiologist', 'PLAN0001'),
+             {'appointments': 'sqlite_autoindex_appointments_1', 'time_slots': 'idx_time_slots_doctor_day',
+              'doctor_schedule_versions': PK, 'reviews': 'idx_reviews_doctor'}),
+    PlanCase('Doctor.get_by_user_id', lambda c, d: Doctor.get_by_user_id(c, d['doctor_user_id']),
+             {'doctors': 'sqlite_autoindex_doctors_1'}),
+    PlanCase('Doctor.get_by_id', lambda c, d: Doctor.get_by_id(c, d['doctor_id']), {'d': PK, 'u': PK}),
+    # A few hundred doctors, read whole and sorted by rating
+    PlanCase('Doctor.get_all_verified', lambda c, d: Doctor.get_all_verified(c, limit=20),
+             {'d': SCAN, 'u': PK}, sorts=True),
+    PlanCase('Doctor.select_for_export', lambda c, d: Doctor.select_for_export(c, 'pending'),
+             {'d': SCAN, 'u': PK}),
+    PlanCase('Doctor.search[term]', lambda c, d: Doctor.search(c, 'smith cardio'),
+             {'doctors_fts': VIRTUAL, 'd': PK, 'u': PK}, sorts=True),
+    PlanCase('Doctor.search[specialization]', lambda c, d: Doctor.search(
+        c, specialization='Neurologist'),
+             {'d': 'idx_doctors_specialization', 'u': PK}, sorts=True),
+    PlanCase('Doctor.rebuild_search_index', lambda c, d: Doctor.rebuild_search_index(c), {}),
+    PlanCase('Doctor.get_schedule_version', lambda c, d: Doctor.get_schedule_version(c, d['doctor_id']),
+             {'doctor_schedule_versions': PK}),
+    PlanCase('Doctor.update', lambda c, d: Doctor.update(c, d['doctor_id'], phone='+1-000'),
+             {'doctors': PK}),
+
+    # Patients
+    PlanCase('Patient.create', lambda c, d: Patient.create(c, d['doctor_user_id'], 'Plan Patient'), {}),
+    PlanCase('Patient.get_by_user_id', lambda c, d: Patient.get_by_user_id(c, d['patient_user_id']),
+             {'patients': 'sqlite_autoindex_patients_1'}),
+    PlanCase('Patient.get_by_id', lambda c, d: Patient.get_by_id(c, d['patient_id']), {'p': PK, 'u': PK}),
+    PlanCase('Patient.update', lambda c, d: Patient.update(c, d['patient_id'], phone='+1-000'),
+             {'patients': PK}),
+    PlanCase('Patient.select_for_export', lambda c, d: Patient.select_for_export(c),
+             {'p': SCAN, 'u': PK}),
+
+    # Time slots
+    PlanCase('TimeSlot.create', lambda c, d: TimeSlot.create(
+        c, d['doctor_id'], 'Sunday', '08:00', '09:00'), {}),
+    PlanCase('TimeSlot.get_by_doctor', lambda c, d: TimeSlot.get_by_doctor(c, d['doctor_id']),
+             {'time_slots': 'idx_time_slots_doctor_day'}, sorts=True),
+    PlanCase('TimeSlot.get_by_doctor_and_day', lambda c, d: TimeSlot.get_by_doctor_and_day(
+        c, d['doctor_id'], 'Monday'),
+             {'time_slots': 'sqlite_autoindex_time_slots_1'}),
+    PlanCase('TimeSlot.get_active_for_doctors', lambda c, d: TimeSlot.get_active_for_doctors(
+        c, d['doctor_ids']),
+             {'time_slots': 'idx_time_slots_doctor_day'}),
+    PlanCase('TimeSlot.delete', lambda c, d: TimeSlot.delete(c, 1), {'time_slots': PK}),
+    PlanCase('TimeSlot.toggle_active', lambda c, d: TimeSlot.toggle_active(c, 1), {'time_slots': PK}),
+
+    # Appointments
+    PlanCase('Appointment.create', lambda c, d: Appointment.create(
+        c, d['patient_id'], d['doctor_id'], date.today() + timedelta(days=800), '09:00'),
+             {'appointment_reminders': 'sqlite_autoindex_appointment_reminders_1',
+              'reviews': 'sqlite_autoindex_reviews_1'}),
+    PlanCase('Appointment.get_by_id', lambda c, d: Appointment.get_by_id(c, d['id']),
+             {'a': PK, 'd': PK, 'p': PK, 'u': PK}),
+    PlanCase('Appointment.get_by_patient', lambda c, d: Appointment.get_by_patient(
+        c, d['patient_id']),
+             {'a': 'idx_appointments_patient_date', 'd': PK}),
+    PlanCase('Appointment.get_by_patient[status]', lambda c, d: Appointment.get_by_patient(
+        c, d['patient_id'], status='scheduled', limit=5),
+             {'a': 'idx_appointments_patient_date', 'd': PK}),
+    PlanCase('Appointment.get_by_doctor', lambda c, d: Appointment.get_by_doctor(
+        c, d['doctor_id'], limit=20),
+             {'a': 'sqlite_autoindex_appointments_1', 'p': PK}),
+    PlanCase('Appointment.get_by_doctor[status]', lambda c, d: Appointment.get_by_doctor(
+        c, d['doctor_id'], status='scheduled', limit=5),
+             {'a': 'idx_appointments_doctor_status', 'p': PK}),
+    PlanCase('Appointment.get_by_doctor[date]', lambda c, d: Appointment.get_by_doctor(
+        c, d['doctor_id'], date_filter=d['appointment_date']),
+             {'a': 'sqlite_autoindex_appointments_1', 'p': PK}),
+    PlanCase('Appointment.get_page_by_doctor', lambda c, d: Appointment.get_page_by_doctor(
+        c, d['doctor_id']),
+             {'a': 'sqlite_autoindex_appointments_1', 'p': PK}),
+    PlanCase('Appointment.get_page_by_doctor[status]', lambda c, d: Appointment.get_page_by_doctor(
+        c, d['doctor_id'], status='confirmed'),
+             {'a': 'idx_appointments_doctor_status', 'p': PK}),
+    PlanCase('Appointment.get_page', lambda c, d: Appointment.get_page(c),
+             {'a': 'idx_appointments_date', 'd': PK, 'p': PK, 'du': PK, 'pu': PK}),
+    PlanCase('Appointment.get_page[status]', lambda c, d: Appointment.get_page(c, status='cancelled'),
+             {'a': 'idx_appointments_status_date', 'd': PK, 'p': PK, 'du': PK, 'pu': PK}),
+    PlanCase('Appointment.select_for_export', lambda c, d: Appointment.select_for_export(
+        c, 'completed'),
+             {'a': 'idx_appointments_status_date', 'd': PK, 'p': PK, 'du': PK, 'pu': PK}),
+    PlanCase('Appointment.get_booked_in_range', lambda c, d: Appointment.get_booked_in_range(
+        c, d['doctor_ids'], date.today(), date.today() + timedelta(days=30)),
+             {'appointments': 'sqlite_autoindex_appointments_1'}),
+    # Chunks are taken in id order, so the window's matches are sorted
+    PlanCase('Appointment.get_due_for_reminder', lambda c, d: Appointment.get_due_for_reminder(
+        c, '24h', datetime.now(), datetime.now() + timedelta(days=1)),
+             {'a': 'idx_appointments_status_date', 'd': PK, 'p': PK, 'pu': PK,
+              'r': 'sqlite_autoindex_appointment_reminders_1'}, sorts=True),
+    PlanCase('Appointment.check_conflict', lambda c, d: Appointment.check_conflict(
+        c, d['doctor_id'], d['appointment_date'], d['appointment_time']),
+             {'appointments': 'sqlite_autoindex_appointments_1'}),
+    PlanCase('Appointment.get_doctor_stats', lambda c, d: Appointment.get_doctor_stats(
+        c, d['doctor_id']),
+             {'appointments': 'idx_appointments_doctor_status'}),
+    PlanCase('Appointment.get_patient_stats', lambda c, d: Appointment.get_patient_stats(
+        c, d['patient_id']),
+             {'appointments': 'idx_appointments_patient_date'}),
+    PlanCase('Appointment.update_status', lambda c, d: Appointment.update_status(
+        c, d['id'], 'cancelled', cancelled_by='admin'),
+             {'appointments': PK}),
+    PlanCase('Appointment.update_medical_info', lambda c, d: Appointment.update_medical_info(
+        c, d['id'], diagnosis='Fine'),
+             {'appointments': PK}),
+
+    # Reminders
+    PlanCase('AppointmentReminder.claim', lambda c, d: AppointmentReminder.claim(c, d['id'], '1h'), {}),
+    PlanCase('AppointmentReminder.mark_sent', lambda c, d: AppointmentReminder.mark_sent(
+        c, '24h', [d['id']]),
+             {'appointment_reminders': 'sqlite_autoindex_appointment_reminders_1'}),
+    PlanCase('AppointmentReminder.release', lambda c, d: AppointmentReminder.release(
+        c, '24h', [d['id']]),
+             {'appointment_reminders': 'sqlite_autoindex_appointment_reminders_1'}),
+
+    # Notifications
+    PlanCase('Notification.create', lambda c, d: Notification.create(
+        c, d['patient_user_id'], 'Hi', 'Hello'), {}),
+    PlanCase('Notification.bulk_create', lambda c, d: Notification.bulk_create(
+        c, [d['patient_user_id'], d['doctor_user_id']], 'Hi', 'Hello'), {}),
+    PlanCase('Notification.create_for_roles', lambda c, d: Notification.create_for_roles(
+        c, ['doctor'], 'Hi', 'Hello'),
+             {'users': 'idx_users_role'}),
+    PlanCase('Notification.create_for_roles[range]', lambda c, d: Notification.create_for_roles(
+        c, ['patient'], 'Hi', 'Hello', after_id=1000, through_id=2000),
+             {'users': 'idx_users_role'}),
+    PlanCase('Notification.get_by_user', lambda c, d: Notification.get_by_user(
+        c, d['patient_user_id']),
+             {'notifications': 'idx_notifications_user_created'}),
+    PlanCase('Notification.get_by_user[unread]', lambda c, d: Notification.get_by_user(
+        c, d['patient_user_id'], unread_only=True),
+             {'notifications': 'idx_notifications_user_read'}),
+    PlanCase('Notification.mark_as_read', lambda c, d: Notification.mark_as_read(
+        c, d['notification_id']),
+             {'notifications': PK}),
+    PlanCase('Notification.mark_all_read', lambda c, d: Notification.mark_all_read(
+        c, d['patient_user_id']),
+             {'notifications': 'idx_notifications_user_read'}),
+    PlanCase('Notification.get_unread_count', lambda c, d: (
+        Notification.unread_cache.clear(), Notification.get_unread_count(c, d['patient_user_id'])),
+             {'notification_counters': PK}),
+    PlanCase('Notification.get_unread_counts', lambda c, d: Notification.get_unread_counts(
+        c, [d['patient_user_id'], d['doctor_user_id']]),
+             {'notification_counters': PK}),
+    PlanCase('Notification.get_max_id', lambda c, d: Notification.get_max_id(c), {'notifications': PK}),
+    PlanCase('Notification.get_since', lambda c, d: Notification.get_since(
+        c, d['notification_id'] - 100),
+             {'notifications': PK}),
+    PlanCase('Notification.get_user_since', lambda c, d: Notification.get_user_since(
+        c, d['patient_user_id'], 0, d['notification_id']),
+             {'notifications': 'idx_notifications_user_read'}, sorts=True),
+    PlanCase('Notification.next_expirable_id', lambda c, d: Notification.next_expirable_id(
+        c, 0, 30),
+             {'notifications': PK}),
+    PlanCase('Notification.archive_expired', lambda c, d: Notification.archive_expired(
+        c, {'reminder': 30, 'system': 180}, 1, 1000),
+             {'notifications': PK, 'notifications_archive': PK}),
+    # Oldest first in id order, stopping at the batch size
+    PlanCase('Notification.purge_archive', lambda c, d: Notification.purge_archive(c, 0, 100),
+             {'notifications_archive': (PK, SCAN)}),
+    PlanCase('Notification.rebuild_unread_counts', lambda c, d: Notification.rebuild_unread_counts(c),
+             {'notifications': 'idx_notifications_user_read', 'notification_counters': SCAN}),
+
+    # Email outbox
+    PlanCase('EmailOutbox.enqueue', lambda c, d: EmailOutbox.enqueue(
+        c, d['patient_email'], 'Hi', '<p>Hi</p>', 'Hi'), {}),
+    PlanCase('EmailOutbox.enqueue_many', lambda c, d: EmailOutbox.enqueue_many(
+        c, [(d['patient_email'], 'Hi', '<p>Hi</p>', 'Hi')]), {}),
+    PlanCase('EmailOutbox.claim_batch', lambda c, d: EmailOutbox.claim_batch(c, 'plan-test'),
+             {'email_outbox': (PK, 'idx_email_outbox_due')}, sorts=True),
+    PlanCase('EmailOutbox.mark_sent', lambda c, d: EmailOutbox.mark_sent(c, 'plan-test', [1, 2]),
+             {'email_outbox': PK}),
+    PlanCase('EmailOutbox.reschedule', lambda c, d: EmailOutbox.reschedule(
+        c, 'plan-test', [(60, 'timeout', 1)]), {'email_outbox': PK}),
+    PlanCase('EmailOutbox.mark_dead', lambda c, d: EmailOutbox.mark_dead(
+        c, 'plan-test', [('bounced', 1)]), {'email_outbox': PK}),
+    PlanCase('EmailOutbox.purge_sent', lambda c, d: EmailOutbox.purge_sent(c),
+             {'email_outbox': (PK, 'idx_email_outbox_due')}),
+    PlanCase('EmailOutbox.get_status_counts', lambda c, d: EmailOutbox.get_status_counts(c),
+             {'email_outbox': 'idx_email_outbox_due'}),
+
+    # Scheduler lock
+    PlanCase('SchedulerLock.acquire', lambda c, d: SchedulerLock.acquire(c, 'plan', 'me'), {}),
+    PlanCase('SchedulerLock.release', lambda c, d: SchedulerLock.release(c, 'plan', 'me'),
+             {'scheduler_locks': 'sqlite_autoindex_scheduler_locks_1'}),
+
+    # Admin statistics (admin_stats holds a handful of rows)
+    PlanCase('AdminStats.get_totals', lambda c, d: AdminStats.get_totals(c), {'admin_stats': SCAN}),
+    PlanCase('AdminStats.get_day', lambda c, d: AdminStats.get_day(c, d['appointment_date']),
+             {'appointment_stats': PK}, sorts=True),
+    PlanCase('AdminStats.get_day[doctor]', lambda c, d: AdminStats.get_day(
+        c, d['appointment_date'], d['doctor_id']),
+             {'appointment_stats': PK}),
+    PlanCase('AdminStats.rebuild', lambda c, d: AdminStats.rebuild(c),
+             {'admin_stats': SCAN, 'users': 'idx_users_role', 'doctors': SCAN,
+              'appointments': ('idx_appointments_created', 'idx_appointments_doctor_status')},
+             sorts=True),
+]
+
+
+# ============================================
+# FIXTURES
+# ============================================
+
+def _add_activity(connection):
+    """Notifications, queued emails and reminders on top of the benchmark data"""
+    cursor = connection.cursor()
+    cursor.execute("""
+        INSERT INTO notifications (user_id, title, message, type, is_read, created_at)
+        SELECT u.id, 'Reminder', 'Appointment tomorrow',
+               CASE u.id % 4 WHEN 0 THEN 'reminder' WHEN 1 THEN 'appointment'
+                             WHEN 2 THEN 'cancellation' ELSE 'system' END,
+               (u.id + n.value) % 3 != 0,
+               datetime('now', '-' || ((u.id * 7 + n.value * 13) % 400) || ' days')
+        FROM users u, (SELECT 1 AS value UNION ALL SELECT 2 UNION ALL SELECT 3
+                       UNION ALL SELECT 4 UNION ALL SELECT 5) n
+        ORDER BY 6
+    """)
+    cursor.execute("""
+        INSERT INTO email_outbox (to_email, subject, html_content, text_content,
+                                  status, next_attempt_at, created_at)
+        SELECT email, 'Reminder', '<p>Reminder</p>', 'Reminder',
+               CASE id % 10 WHEN 0 THEN 'pending' WHEN 1 THEN 'dead' ELSE 'sent' END,
+               datetime('now', '-' || (id % 60) || ' days'),
+               datetime('now', '-' || (id % 60) || ' days')
+        FROM users
+    """)
+    cursor.execute("""
+        INSERT INTO appointment_reminders (appointment_id, reminder_type, sent_at)
+        SELECT id, '24h', created_at FROM appointments WHERE id % 2 = 0
+    """)
+    connection.commit()
+    cursor.execute("ANALYZE")
+    connection.commit()
+
+
+@pytest.fixture(scope='module')
+def synthetic_db(tmp_path_factory):
+    """Path of a database with ANALYZE statistics and one without"""
+    directory = tmp_path_factory.mktemp('query_plans')
+    analyzed = str(directory / 'analyzed.db')
+    connection = build_synthetic_database(
+        analyzed, doctors=int(200 * SCALE), patients=int(5000 * SCALE),
+        appointments=int(50000 * SCALE))
+    _add_activity(connection)
+    connection.close()
+
+    fresh = str(directory / 'fresh.db')
+    shutil.copyfile(analyzed, fresh)
+    connection = sqlite3.connect(fresh)
+    connection.execute("DELETE FROM sqlite_stat1")
+    connection.commit()
+    connection.close()
+    return {'analyzed': analyzed, 'fresh': fresh}
+
+
+@pytest.fixture(scope='module', params=['analyzed', 'fresh'])
+def plan_db(request, synthetic_db):
+    """An open connection plus ids that exist in the data"""
+    connection = open_database(synthetic_db[request.param])
+    row = connection.execute("""
+        SELECT a.id, a.patient_id, a.doctor_id, a.appointment_date, a.appointment_time,
+               p.user_id AS patient_user_id, d.user_id AS doctor_user_id
+        FROM appointments a
+        JOIN patients p ON a.patient_id = p.id
+        JOIN doctors d ON a.doctor_id = d.id
+        ORDER BY a.id LIMIT 1 OFFSET 1000
+    """).fetchone()
+    data = dict(row)
+    data['doctor_ids'] = [r[0] for r in connection.execute("SELECT id FROM doctors LIMIT 20")]
+    data['patient_email'] = connection.execute(
+        "SELECT email FROM users WHERE id = ?", (data['patient_user_id'],)).fetchone()[0]
+    data['notification_id'] = connection.execute(
+        "SELECT MAX(id) FROM notifications WHERE user_id = ?",
+        (data['patient_user_id'],)).fetchone()[0]
+    yield connection, data
+    connection.close()
+
+
+def capture_plans(connection, case, data):
+    """Run one case in a rolled-back transaction; returns [(sql, plan)]"""
+    cursor = connection.cursor(PlanCursor)
+    cursor.plans = []
+    try:
+        case.run(cursor, data)
+    finally:
+        connection.rollback()
+    return cursor.plans
+
+
+# ============================================
+# TESTS
+# ============================================
+
+@pytest.mark.parametrize('case', PLAN_CASES, ids=[case.name for case in PLAN_CASES])
+def test_query_plan(plan_db, case):
+    connection, data = plan_db
+    plans = capture_plans(connection, case, data)
+    assert plans, f"{case.name} ran no statements"
+
+    problems = []
+    for sql, plan in plans:
+        for table, access in table_accesses(plan):
+            allowed = case.expect.get(table)
+            allowed = (allowed,) if isinstance(allowed, str) else (allowed or ())
+            if access not in allowed:
+                problems.append(f"{table} read by {access}, pinned to "
+                                f"{' or '.join(allowed) or 'nothing'}")
+        if not case.sorts and any(line.startswith('USE TEMP B-TREE') for line in plan):
+            problems.append("unexpected temp B-tree sort")
+        if problems:
+            plan_text = '\n    '.join(plan)
+            pytest.fail(f"{case.name}: {'; '.join(problems)}\n  {sql}\n    {plan_text}")
+
+
+def test_every_model_query_is_pinned():
+    """Each model method that runs SQL has at least one plan case"""
+    pinned = {case.name.split('[')[0] for case in PLAN_CASES}
+    models = (User, Doctor, Patient, TimeSlot, Appointment, AppointmentReminder,
+              Notification, EmailOutbox, SchedulerLock, AdminStats)
+    missing = []
+    for model in models:
+        for name, member in vars(model).items():
+            function = getattr(member, '__func__', None)
+            if function is None or name.startswith('_'):
+                continue
+            if 'cursor' in function.__code__.co_varnames[:1]:
+                if f"{model.__name__}.{name}" not in pinned:
+                    missing.append(f"{model.__name__}.{name}")
+    assert not missing, f"no plan pinned for: {', '.join(missing)}"
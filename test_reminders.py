@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Appointment Reminder Tests
+Runs ReminderRunner against a fresh database with a mail stand-in: each
+reminder says when the visit is (today, tomorrow or the weekday) from the
+appointment's own date, every appointment gets its 24h and 2h reminder
+exactly once however often the runner runs, and a failed send or an
+abandoned claim is retried by a later run.
+
+    python -m pytest -q test_reminders.py
+"""
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from benchmarks import create_schema, open_database
+from email_service import EmailService
+from email_templates import get_email_templates
+from models import AppointmentReminder
+from send_reminders import ReminderRunner
+from utils import get_db_cursor
+
+# A Monday morning
+NOW = datetime(2030, 1, 7, 8, 0)
+
+
+class ReminderConfig:
+    DB_PATH = None
+    MAIL_SERVER = '127.0.0.1'
+    MAIL_PORT = 25
+    MAIL_USE_TLS = False
+    MAIL_USERNAME = 'reminder-test'
+    MAIL_PASSWORD = 'reminder-test'
+    MAIL_DEFAULT_SENDER = 'noreply@reminder.test'
+    REMINDER_WINDOWS = {'24h': 24, '2h': 2}
+    REMINDER_CHUNK_SIZE = 2
+    REMINDER_WORKERS = 2
+    REMINDER_CLAIM_TIMEOUT = 900
+
+
+class FakeMail:
+    """Renders with the real templates; records deliveries, failing for addresses in failing"""
+
+    enabled = True
+
+    def __init__(self):
+        self.delivered = []
+        self.failing = set()
+
+    def render_bulk(self, template, recipients):
+        return get_email_templates().render_many(template, recipients)
+
+    def deliver(self, to_email, subject, html_content, text_content):
+        if to_email in self.failing:
+            raise ConnectionError('connection lost')
+        self.delivered.append((to_email, subject))
+
+    def close_finished_sessions(self):
+        pass
+
+
+@pytest.fixture
+def cfg(tmp_path):
+    """Seed database plus two more patients"""
+    connection = open_database(str(tmp_path / 'reminders.db'))
+    create_schema(connection)
+    for n in (2, 3):
+        cursor = connection.execute("INSERT INTO users (email, password, role) VALUES (?, 'x', 'patient')",
+                                    (f"patient{n}@example.com",))
+        connection.execute("INSERT INTO patients (id, user_id, full_name) VALUES (?, ?, ?)",
+                           (n, cursor.lastrowid, f"Patient {n}"))
+    connection.commit()
+    connection.close()
+    ReminderConfig.DB_PATH = str(tmp_path / 'reminders.db')
+    return ReminderConfig
+
+
+@pytest.fixture
+def mail():
+    return FakeMail()
+
+
+def runner(cfg, mail):
+    runner = ReminderRunner(cfg)
+    runner.email_service = mail
+    return runner
+
+
+def book(cfg, patient_id, starts_at):
+    with get_db_cursor(cfg) as cursor:
+        cursor.execute("""
+            INSERT INTO appointments (patient_id, doctor_id, appointment_date, appointment_time)
+            VALUES (?, 1, ?, ?)
+        """, (patient_id, starts_at.date(), starts_at.strftime('%H:%M:%S')))
+
+
+def test_reminder_names_the_day_of_the_appointment(cfg, mail):
+    book(cfg, 1, NOW + timedelta(hours=1))                  # 09:00 today, 2h window
+    book(cfg, 2, NOW + timedelta(hours=12))                 # 20:00 today, 24h window
+    book(cfg, 3, NOW + timedelta(hours=23))                 # 07:00 tomorrow
+    runner(cfg, mail).run(NOW)
+
+    assert sorted(mail.delivered) == [
+        ('patient2@example.com', 'Appointment Reminder - Today'),
+        ('patient3@example.com', 'Appointment Reminder - Tomorrow'),
+        ('patient@example.com', 'Appointment Reminder - Today'),
+    ]
+
+
+def test_reminder_context_names_the_weekday_further_out():
+    context = EmailService.reminder_context('Jane Doe', 'John Smith', date(2030, 1, 10),
+                                            time(9, 30), today=NOW.date())
+    assert context['when'] == 'on Thursday'
+    subject, html, text = get_email_templates().render('appointment_reminder', **context)
+    assert subject == 'Appointment Reminder - On Thursday'
+    assert 'See you on Thursday!' in text
+
+
+def test_second_run_sends_nothing(cfg, mail):
+    for patient_id, hours in ((1, 1), (2, 5), (3, 20)):
+        book(cfg, patient_id, NOW + timedelta(hours=hours))
+    first = runner(cfg, mail).run(NOW)
+    assert first['24h']['sent'] == 2
+    assert first['2h']['sent'] == 1
+    assert len(mail.delivered) == 3
+
+    second = runner(cfg, mail).run(NOW + timedelta(minutes=15))
+    assert all(stats['claimed'] == 0 and stats['sent'] == 0 for stats in second.values())
+    assert len(mail.delivered) == 3
+
+
+def test_failed_send_is_released_and_retried(cfg, mail):
+    book(cfg, 1, NOW + timedelta(hours=5))
+    book(cfg, 2, NOW + timedelta(hours=6))
+    mail.failing.add('patient2@example.com')
+    stats = runner(cfg, mail).run(NOW)['24h']
+    assert (stats['sent'], stats['failed']) == (1, 1)
+
+    mail.failing.clear()
+    stats = runner(cfg, mail).run(NOW + timedelta(minutes=15))['24h']
+    assert (stats['claimed'], stats['sent']) == (1, 1)
+    assert [to for to, _ in mail.delivered] == ['patient@example.com', 'patient2@example.com']
+
+
+def test_abandoned_claim_is_retried_after_the_timeout(cfg, mail):
+    book(cfg, 1, NOW + timedelta(hours=5))
+    # A run claimed the reminder and died before sending it
+    with get_db_cursor(cfg) as cursor:
+        cursor.execute("SELECT id FROM appointments")
+        appointment_id = cursor.fetchone()['id']
+        assert AppointmentReminder.claim(cursor, appointment_id, '24h')
+
+    assert runner(cfg, mail).run(NOW)['24h']['claimed'] == 0
+    with get_db_cursor(cfg) as cursor:
+        cursor.execute("UPDATE appointment_reminders SET claimed_at = datetime('now', '-901 seconds')")
+    assert runner(cfg, mail).run(NOW)['24h']['sent'] == 1
+    assert mail.delivered == [('patient@example.com', 'Appointment Reminder - Today')]
+
+
+def test_each_reminder_goes_out_exactly_once(cfg, mail):
+    starts_at = NOW + timedelta(hours=26)
+    book(cfg, 1, starts_at)
+    # Every 15 minutes from 26 hours before the visit until it starts
+    for quarter in range(26 * 4 + 1):
+        runner(cfg, mail).run(NOW + timedelta(minutes=15 * quarter))
+
+    with get_db_cursor(cfg) as cursor:
+        cursor.execute("SELECT reminder_type FROM appointment_reminders "
+                       "WHERE sent_at IS NOT NULL ORDER BY reminder_type")
+        assert [row['reminder_type'] for row in cursor.fetchall()] == ['24h', '2h']
+    assert mail.delivered == [('patient@example.com', 'Appointment Reminder - Tomorrow'),
+                              ('patient@example.com', 'Appointment Reminder - Today')]
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Notification Retention Tests
+Runs retention.run_notification_retention over notifications of every
+type, age and read state: read ones past their type's TTL move to
+notifications_archive, unread ones and types kept forever stay, archived
+rows past NOTIFICATION_ARCHIVE_DAYS are deleted, and the unread counters
+are left alone.
+
+    python -m pytest -q test_retention.py
+"""
+import pytest
+
+from benchmarks import create_schema, open_database
+from retention import run_notification_retention
+from utils import get_db_cursor
+
+# (type, is_read, age in days), oldest first like real ids
+NOTIFICATIONS = {
+    1: ('reminder', 1, 400),       # archived, then purged from the archive
+    2: ('system', 1, 300),         # TTL 0: kept forever
+    3: ('appointment', 1, 200),    # archived
+    4: ('reminder', 0, 100),       # unread: kept
+    5: ('cancellation', 1, 95),    # no TTL: kept forever
+    6: ('appointment', 1, 60),     # within its TTL
+    7: ('reminder', 1, 40),        # archived
+    8: ('reminder', 0, 35),        # unread: kept
+    9: ('reminder', 1, 1),         # within its TTL
+}
+# Archived by an earlier run: (id, age in days)
+ARCHIVED = {501: 500, 502: 100}
+
+
+class RetentionConfig:
+    DB_PATH = None
+    NOTIFICATION_RETENTION_DAYS = {'reminder': 30, 'appointment': 90, 'system': 0}
+    NOTIFICATION_ARCHIVE_DAYS = 365
+    # Several batches over a handful of rows
+    NOTIFICATION_RETENTION_BATCH = 2
+    NOTIFICATION_RETENTION_PAUSE = 0
+
+
+@pytest.fixture
+def cfg(tmp_path):
+    connection = open_database(str(tmp_path / 'retention.db'))
+    create_schema(connection)
+    connection.executemany("""
+        INSERT INTO notifications (id, user_id, type, title, message, is_read, created_at)
+        VALUES (?, 3, ?, 'Title', 'Message', ?, datetime('now', ?))
+    """, [(id, type, is_read, f"-{days} days")
+          for id, (type, is_read, days) in NOTIFICATIONS.items()])
+    connection.executemany("""
+        INSERT INTO notifications_archive (id, user_id, type, title, message, created_at)
+        VALUES (?, 3, 'reminder', 'Title', 'Message', datetime('now', ?))
+    """, [(id, f"-{days} days") for id, days in ARCHIVED.items()])
+    connection.commit()
+    connection.close()
+    RetentionConfig.DB_PATH = str(tmp_path / 'retention.db')
+    return RetentionConfig
+
+
+def ids(cfg, table):
+    with get_db_cursor(cfg) as cursor:
+        cursor.execute(f"SELECT id FROM {table} ORDER BY id")
+        return [row['id'] for row in cursor.fetchall()]
+
+
+def unread(cfg):
+    with get_db_cursor(cfg) as cursor:
+        cursor.execute("SELECT user_id, unread FROM notification_counters")
+        return dict(cursor.fetchall())
+
+
+def test_retention_archives_expired_read_notifications(cfg):
+    counters = unread(cfg)
+    assert counters == {3: 2}
+
+    assert run_notification_retention(cfg) == {'notifications_archived': 3, 'archive_purged': 2}
+    assert ids(cfg, 'notifications') == [2, 4, 5, 6, 8, 9]
+    assert ids(cfg, 'notifications_archive') == [3, 7, 502]
+    assert unread(cfg) == counters
+
+    # Nothing left to do
+    assert run_notification_retention(cfg) == {'notifications_archived': 0, 'archive_purged': 0}
+
+
+def test_archived_rows_keep_their_content(cfg):
+    run_notification_retention(cfg)
+    with get_db_cursor(cfg) as cursor:
+        cursor.execute("""
+            SELECT type, user_id, julianday('now') - julianday(created_at) AS age
+            FROM notifications_archive WHERE id = 3
+        """)
+        row = cursor.fetchone()
+    assert (row['type'], row['user_id']) == ('appointment', 3)
+    assert round(row['age']) == 200
+
+
+def test_zero_archive_days_keeps_the_archive(cfg, monkeypatch):
+    monkeypatch.setattr(cfg, 'NOTIFICATION_ARCHIVE_DAYS', 0)
+    assert run_notification_retention(cfg) == {'notifications_archived': 3, 'archive_purged': 0}
+    assert ids(cfg, 'notifications_archive') == [1, 3, 7, 501, 502]
@@ -1,11 +1,51 @@
 """
 Database connection and utility functions
 """
+import os
+import re
 import sqlite3
+import threading
+import time
+from collections import deque
 from contextlib import contextmanager
 import hashlib
 from functools import wraps
 from flask import session, redirect, url_for, flash
+from models import register_sqlite_types
+from query_stats import InstrumentedCursor
+from slow_queries import get_slow_query_log
+
+# Decode DATE/TIME/DATETIME columns for every connection opened here
+register_sqlite_types()
+
+
+# Fallback profile for config objects without DB_PRAGMAS
+DEFAULT_PRAGMAS = {'foreign_keys': 'ON'}
+
+# Read-back values SQLite reports for symbolic PRAGMA settings
+_PRAGMA_SYMBOLS = {
+    'synchronous': {'OFF': 0, 'NORMAL': 1, 'FULL': 2, 'EXTRA': 3},
+    'temp_store': {'DEFAULT': 0, 'FILE': 1, 'MEMORY': 2},
+    'foreign_keys': {'OFF': 0, 'ON': 1},
+}
+
+_PRAGMA_NAME = re.compile(r'^[a-z_]+$')
+_PRAGMA_VALUE = re.compile(r'^-?[A-Za-z0-9_]+$')
+
+
+def _pragma_statement(name, value):
+    """Build a PRAGMA statement, rejecting anything that isn't a plain setting"""
+    value = str(value)
+    if not _PRAGMA_NAME.match(name) or not _PRAGMA_VALUE.match(value):
+        raise ValueError(f"Invalid PRAGMA setting: {name} = {value}")
+    return f"PRAGMA {name} = {value}"
+
+
+def apply_db_pragmas(connection, config):
+    """Apply the configured PRAGMA profile to a connection"""
+    pragmas = getattr(config, "DB_PRAGMAS", None) or DEFAULT_PRAGMAS
+    for name, value in pragmas.items():
+        connection.execute(_pragma_statement(name, value)).fetchall()
 
 
 def get_db_connection(config):
@@ -17,16 +57,286 @@ def get_db_connection(config):
         check_same_thread=False
     )
     connection.row_factory = sqlite3.Row
-    # Enforce FK constraints for SQLite
-    connection.execute("PRAGMA foreign_keys = ON")
+    apply_db_pragmas(connection, config)
     return connection
 
 
+def check_db_settings(config, report=True):
+    """
+    Read back the PRAGMA settings actually in effect
+    Returns {name: (expected, actual, ok)} and optionally prints a report
+    """
+    pragmas = getattr(config, "DB_PRAGMAS", None) or DEFAULT_PRAGMAS
+    results = {}
+    connection = get_db_connection(config)
+    try:
+        for name, expected in pragmas.items():
+            row = connection.execute(f"PRAGMA {name}").fetchone()
+            actual = row[0] if row else None
+            wanted = _PRAGMA_SYMBOLS.get(name, {}).get(
+                str(expected).upper(), expected)
+            if isinstance(actual, str):
+                ok = actual.lower() == str(wanted).lower()
+            else:
+                ok = str(actual) == str(wanted)
+            results[name] = (expected, actual, ok)
+    finally:
+        connection.close()
+
+    if report:
+        db_path = getattr(config, "DB_PATH", "hospital.db")
+        print(f"SQLite settings for {db_path} (SQLite {sqlite3.sqlite_version}):")
+        for name, (expected, actual, ok) in results.items():
+            marker = 'OK' if ok else 'MISMATCH'
+            print(f"  {name:<20} {str(actual):<12} (wanted {expected}) {marker}")
+    return results
+
+
+def checkpoint_wal(connection, mode='PASSIVE'):
+    """Run a WAL checkpoint, returning (busy, wal_pages, checkpointed_pages)"""
+    mode = str(mode).upper()
+    if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+        raise ValueError(f"Invalid checkpoint mode: {mode}")
+    row = connection.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+    return tuple(row) if row else None
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """Raised when no pooled connection becomes free within the timeout"""
+
+
+class _PooledConnection:
+    """Bookkeeping for a connection owned by the pool"""
+    __slots__ = ('connection', 'uses')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.uses = 0
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of SQLite connections
+    Connections are health-checked on checkout and recycled after max_uses
+    """
+
+    def __init__(self, config, size=5, timeout=30, max_uses=1000):
+        self.config = config
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self.max_uses = max_uses
+        self.pid = os.getpid()
+        self.checkpoint_mode = getattr(config, "DB_WAL_CHECKPOINT_MODE", None)
+        self.checkpoint_interval = getattr(
+            config, "DB_WAL_CHECKPOINT_INTERVAL", 0)
+        self._last_checkpoint = time.monotonic()
+
+        self._idle = deque()
+        self._in_use = {}
+        self._opened = 0
+        self._cond = threading.Condition()
+
+        # Counters for stats()
+        self._checkouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._discarded = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._checkpoints = 0
+
+    def _open(self):
+        """Open a new connection for the pool"""
+        entry = _PooledConnection(get_db_connection(self.config))
+        with self._cond:
+            self._created += 1
+        return entry
+
+    @staticmethod
+    def _is_healthy(entry):
+        """Cheap liveness probe run before handing a connection out"""
+        try:
+            entry.connection.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    @staticmethod
+    def _close_quietly(entry):
+        try:
+            entry.connection.close()
+        except sqlite3.Error:
+            pass
+
+    def acquire(self):
+        """Check a connection out of the pool, waiting up to timeout seconds"""
+        started = time.monotonic()
+        deadline = started + self.timeout if self.timeout is not None else None
+
+        with self._cond:
+            while not self._idle and self._opened >= self.size:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f"No database connection available after {self.timeout}s "
+                        f"(pool size {self.size})")
+                self._cond.wait(remaining)
+
+            entry = self._idle.pop() if self._idle else None
+            if entry is None:
+                # Reserve the slot before connecting outside the lock
+                self._opened += 1
+
+        try:
+            if entry is None:
+                entry = self._open()
+            elif not self._is_healthy(entry):
+                self._close_quietly(entry)
+                with self._cond:
+                    self._discarded += 1
+                entry = self._open()
+        except Exception:
+            with self._cond:
+                self._opened -= 1
+                self._cond.notify()
+            raise
+
+        waited = time.monotonic() - started
+        with self._cond:
+            entry.uses += 1
+            self._in_use[id(entry.connection)] = entry
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return entry.connection
+
+    def release(self, connection):
+        """Return a connection to the pool, recycling it when worn out"""
+        with self._cond:
+            entry = self._in_use.pop(id(connection), None)
+        if entry is None:
+            connection.close()
+            return
+
+        reusable = True
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except sqlite3.Error:
+            reusable = False
+
+        if reusable and self._checkpoint_due():
+            try:
+                checkpoint_wal(connection, self.checkpoint_mode)
+            except sqlite3.Error:
+                pass
+
+        if self.max_uses and entry.uses >= self.max_uses:
+            reusable = False
+            with self._cond:
+                self._recycled += 1
+
+        if not reusable:
+            self._close_quietly(entry)
+
+        with self._cond:
+            if reusable:
+                self._idle.append(entry)
+            else:
+                self._opened -= 1
+            self._cond.notify()
+
+    def _checkpoint_due(self):
+        """Claim the next periodic WAL checkpoint if its interval has passed"""
+        if not self.checkpoint_mode or not self.checkpoint_interval:
+            return False
+        now = time.monotonic()
+        with self._cond:
+            if now - self._last_checkpoint < self.checkpoint_interval:
+                return False
+            self._last_checkpoint = now
+            self._checkpoints += 1
+            return True
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and back in"""
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def stats(self):
+        """Snapshot of pool usage for sizing against real load"""
+        with self._cond:
+            checkouts = self._checkouts
+            return {
+                'size': self.size,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'opened': self._opened,
+                'checkouts': checkouts,
+                'created': self._created,
+                'recycled': self._recycled,
+                'discarded': self._discarded,
+                'timeouts': self._timeouts,
+                'checkpoints': self._checkpoints,
+                'wait_total_ms': round(self._wait_total * 1000, 3),
+                'wait_avg_ms': round(self._wait_total * 1000 / checkouts, 3) if checkouts else 0.0,
+                'wait_max_ms': round(self._wait_max * 1000, 3),
+            }
+
+    def close(self):
+        """Close all idle connections"""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._opened -= len(idle)
+        for entry in idle:
+            self._close_quietly(entry)
+
+
+# Per-process pools keyed by database path
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(config):
+    """Get the connection pool for this process and database"""
+    db_path = getattr(config, "DB_PATH", "hospital.db")
+    pid = os.getpid()
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        # A pool inherited across fork (gunicorn preload) must not be shared
+        if pool is None or pool.pid != pid:
+            pool = ConnectionPool(
+                config,
+                size=getattr(config, "DB_POOL_SIZE", 5),
+                timeout=getattr(config, "DB_POOL_TIMEOUT", 30),
+                max_uses=getattr(config, "DB_POOL_MAX_USES", 1000)
+            )
+            _pools[db_path] = pool
+        return pool
+
+
+def get_pool_stats(config):
+    """Get usage statistics for this process's connection pool"""
+    return get_connection_pool(config).stats()
+
+
 @contextmanager
 def get_db_cursor(config):
     """Context manager for database operations"""
-    connection = get_db_connection(config)
-    cursor = connection.cursor()
+    pool = get_connection_pool(config)
+    connection = pool.acquire()
+    # Reports each statement to the request's QueryStats (see query_stats)
+    # and slow ones to the slow query log
+    cursor = connection.cursor(InstrumentedCursor)
+    cursor.slow_log = get_slow_query_log(config)
+    cursor.on_commit = []
     try:
         yield cursor
         connection.commit()
@@ -35,7 +345,10 @@ def get_db_cursor(config):
         raise e
     finally:
         cursor.close()
-        connection.close()
+        pool.release(connection)
+    # Only now can other connections read what was written
+    for callback in cursor.on_commit:
+        callback()
 
 
 def hash_password(password):